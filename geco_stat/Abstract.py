@@ -3,6 +3,8 @@
 import os
 import h5py             # >=2.5.0
 import abc
+import json
+import warnings
 import numpy as np      # >=1.10.4
 from geco_stat._version import __version__
 from geco_stat._constants import __default_bitrate__
@@ -189,6 +191,46 @@ class AbstUnionable(AbstTimeSeriesDerivable):
         self.assert_unionable(other)
         return self.__union__(other)
 
+    @classmethod
+    def union_all(cls, instances):
+        """
+        Combine any number of instances into a single instance covering all
+        of their time spans. The result is the same as unioning them one by
+        one, but each instance is only checked for self-consistency once, and
+        subclasses can provide a fast path (by overriding ``__union_all__``)
+        that accumulates everything into a single output buffer instead of
+        creating a new intermediate instance for every pairwise union.
+        """
+        instances = list(instances)
+        if len(instances) == 0:
+            raise ValueError('Need at least one instance to union.')
+        for instance in instances:
+            instance.assert_self_consistent()
+        return cls.__union_all__(instances)
+
+    @classmethod
+    def __union_all__(cls, instances):
+        """
+        Union a list of self-consistent instances without checking them for
+        self-consistency first. This is part of the implementation of the
+        union_all method.
+
+        This default implementation unions the instances pairwise,
+        tournament-style, so that each instance takes part in only log2(N)
+        unions.
+        """
+        if len(instances) == 1:
+            return instances[0].clone()
+        while len(instances) > 1:
+            paired = []
+            for i in range(0, len(instances) - 1, 2):
+                instances[i].assert_unionable(instances[i+1])
+                paired.append(instances[i].__union__(instances[i+1]))
+            if len(instances) % 2 == 1:
+                paired.append(instances[-1])
+            instances = paired
+        return instances[0]
+
     # There is no reason to check for consistency every time; too much
     # abstraction with no clarifying purpose.
     # FIXME deprecated
@@ -292,10 +334,106 @@ class AbstractDictRepresentable(object):
         instance, but which shares no object pointers (even in sub-properties)
         and can hence be modified with impunity without fear of side-effects.
         """
-        # If this implementation makes you nervous (for anything besides
-        # performance reasons, then you are not properly implementing the
-        # to_dict and from_dict methods.
-        return self.from_dict(self.to_dict())
+        return self.__clone__()
+
+    def __clone__(self):
+        """
+        Copy this instance structurally: every NumPy array it holds, even in
+        sub-properties, is copied exactly once, and the copies are wrapped in
+        new instances without calling any constructors, since an instance
+        that was valid to begin with needs no validation. Subclasses only
+        need to override this if they hold mutable state other than NumPy
+        arrays, AbstractDictRepresentable instances, and dicts, lists and
+        tuples of these. The result is the same as
+        ``self.from_dict(self.to_dict())``.
+        """
+        return _copy_structure(self, True, {})
+
+    def __clone_with__(self, **arrays):
+        """
+        Clone this instance like __clone__, except for the given array
+        attributes, which are set to the given arrays rather than copied.
+        This is for building the result of a computation that replaces some
+        of the arrays anyway (like the counts of a union) without copying
+        them first. The given arrays are used as they are, so they must not
+        be referenced anywhere else.
+        """
+        memo = dict()
+        for key, array in arrays.items():
+            if not isinstance(getattr(self, key), np.ndarray):
+                raise ValueError('%s is not an array attribute' % key)
+            memo[id(getattr(self, key))] = array
+        return _copy_structure(self, True, memo)
+
+    def share(self):
+        """
+        Return a copy-on-write clone of this instance: an instance that is
+        equal to this one and that shares its NumPy arrays with it rather
+        than copying them. The shared arrays are made read-only, and each
+        instance takes its own copy of them (with __copy_on_write__) before
+        modifying them in place, so that, just like with clone, changes to
+        one instance are never seen by the other. Clones that are only ever
+        read, or whose data get replaced rather than modified, therefore cost
+        next to nothing.
+
+        Note that this instance's arrays are made read-only too: its own
+        methods keep working (they copy before writing), but writing
+        directly into one of its arrays, e.g. ``h.hist[0, 0] = 1``, raises a
+        ValueError from then on. Take a clone first to get writeable arrays.
+        """
+        return _copy_structure(self, False, {})
+
+    def __copy_on_write__(self):
+        """
+        Replace each read-only array attribute of this instance, e.g. one
+        shared with a clone made by share, with a writeable copy. Must be
+        called before modifying this instance's arrays in place.
+        """
+        for key, value in list(self.__dict__.items()):
+            if isinstance(value, np.ndarray) and not value.flags.writeable:
+                self.__dict__[key] = value.copy(order='C')
+
+    def to_buffer(self):
+        """
+        Serialize this instance into a single contiguous buffer (a
+        bytearray), a faster alternative to HDF5 for passing instances
+        between processes or for memory-mapped files. The buffer holds the
+        same dictionary as to_dict: a small JSON header describing the
+        dictionary, with each array replaced by its type, shape and offset,
+        followed by the raw bytes of every array, each aligned to
+        BUFFER_ALIGNMENT bytes. Reconstruct the instance with from_buffer.
+        """
+        return _dict_to_buffer(self.to_dict())
+
+    @staticmethod
+    def from_buffer(buffer):
+        """
+        Reconstruct an instance from a buffer made by to_buffer (anything
+        supporting the buffer protocol, e.g. bytes, a bytearray, an mmap or
+        a numpy.memmap). The arrays are read-only views into the buffer made
+        with numpy.frombuffer rather than copies, and the instances built
+        from them keep them as they are, copying them only when they are
+        modified (see __copy_on_write__), so the buffer must not be
+        modified while they are in use.
+        """
+        return AbstractDictRepresentable.from_dict(_dict_from_buffer(buffer))
+
+    def save_buffer(self, filename):
+        """Save this instance to a file in the format of to_buffer."""
+        if os.path.exists(filename):
+            raise ValueError('File %s exists, will not overwrite.' % filename)
+        with open(filename, 'wb') as f:
+            f.write(self.to_buffer())
+
+    @staticmethod
+    def load_buffer(filename):
+        """
+        Load an instance saved with save_buffer. The file is memory-mapped
+        read-only, so that arrays are only read from disk as they are used;
+        the file must not be modified while the instance is in use.
+        """
+        return AbstractDictRepresentable.from_buffer(
+            np.memmap(filename, dtype=np.uint8, mode='r'))
 
     @abc.abstractmethod
     def __to_dict__(self):
@@ -316,6 +454,145 @@ class AbstractDictRepresentable(object):
         output by self.to_dict. Should generally be a class method.
         """
 
+def _stored_array(array, dtype=None):
+    """
+    Return array, converted to dtype, in a form that an instance can hold on
+    to: a C-contiguous copy, unless array is already a read-only,
+    C-contiguous ndarray of the right type, which can be kept as is since
+    in-place writers copy it first (see
+    AbstractDictRepresentable.__copy_on_write__). This is what lets
+    instances built from memory-mapped files, or from the arrays of
+    instances made by share, avoid reading or copying their arrays. A
+    LazyDataset is read, but the array read is not copied again.
+    """
+    if isinstance(array, LazyDataset):
+        array = array.read()
+        if dtype is None or array.dtype == dtype:
+            return array
+    if (isinstance(array, np.ndarray) and not array.flags.writeable and
+            array.flags.c_contiguous and
+            (dtype is None or array.dtype == dtype)):
+        return array
+    # C order, since counts are updated through flat views of the arrays
+    return np.array(array, dtype=dtype, copy=True, order='C')
+
+def _copy_structure(value, copy, memo):
+    """
+    Copy value, which can be a NumPy array, an AbstractDictRepresentable
+    instance, or a dict, list or tuple of these, recursively; anything else
+    is taken to be immutable and is returned as is. Arrays are copied if
+    copy is True; otherwise they are made read-only and shared. memo maps the
+    ids of the objects copied so far to their copies, so that an object
+    referenced more than once (like the report data of an AbstReport, which
+    are also its attributes) is only copied once, and is still referenced
+    more than once in the copy.
+    """
+    if id(value) in memo:
+        return memo[id(value)]
+    if isinstance(value, np.ndarray):
+        if copy:
+            ans = value.copy()
+        else:
+            value.flags.writeable = False
+            ans = value
+    elif isinstance(value, AbstractDictRepresentable):
+        ans = type(value).__new__(type(value))
+        memo[id(value)] = ans
+        for key, item in value.__dict__.items():
+            ans.__dict__[key] = _copy_structure(item, copy, memo)
+    elif isinstance(value, dict):
+        ans = dict()
+        memo[id(value)] = ans
+        for key, item in value.items():
+            ans[key] = _copy_structure(item, copy, memo)
+    elif isinstance(value, (list, tuple)):
+        ans = type(value)([_copy_structure(item, copy, memo)
+                           for item in value])
+    else:
+        ans = value
+    memo[id(value)] = ans
+    return ans
+
+# magic bytes identifying the to_buffer format, and the alignment of arrays
+BUFFER_MAGIC = b'GECOBUF1'
+BUFFER_ALIGNMENT = 64
+
+def _align(offset):
+    """Round offset up to a multiple of BUFFER_ALIGNMENT."""
+    return -(-offset // BUFFER_ALIGNMENT) * BUFFER_ALIGNMENT
+
+def _dict_to_buffer(dic):
+    """
+    Serialize a to_dict dictionary into a bytearray laid out as: the
+    BUFFER_MAGIC bytes, the length of the header as a little-endian uint64,
+    the JSON header itself, and then the data, which starts at the first
+    multiple of BUFFER_ALIGNMENT after the header and holds the bytes of each
+    array, every one starting at a multiple of BUFFER_ALIGNMENT. In the
+    header, arrays become {'__array__': [offset into the data, dtype,
+    shape]} and numpy scalars become {'__scalar__': [dtype, value]}.
+    """
+    arrays = []
+
+    def describe(value, offset):
+        if isinstance(value, dict):
+            items = {}
+            for key, item in value.items():
+                items[key], offset = describe(item, offset)
+            return items, offset
+        if isinstance(value, np.ndarray):
+            if value.dtype.hasobject:
+                raise ValueError('Cannot serialize arrays of objects')
+            arrays.append((offset, np.ascontiguousarray(value)))
+            return ({'__array__': [offset, value.dtype.str,
+                                   list(value.shape)]},
+                    _align(offset + value.nbytes))
+        if isinstance(value, np.generic):
+            return {'__scalar__': [value.dtype.str, value.item()]}, offset
+        if isinstance(value, (str, int, float, list)):
+            return value, offset
+        raise ValueError('Cannot serialize %s type.' % type(value))
+
+    header, size = describe(dic, 0)
+    header = json.dumps(header).encode()
+    start = _align(16 + len(header))
+    buffer = bytearray(start + size)
+    buffer[:8] = BUFFER_MAGIC
+    buffer[8:16] = np.array(len(header), dtype='<u8').tobytes()
+    buffer[16:16 + len(header)] = header
+    for offset, array in arrays:
+        np.frombuffer(buffer, dtype=np.uint8, count=array.nbytes,
+                      offset=start + offset)[:] = array.reshape(-1).view(
+                          np.uint8)
+    return buffer
+
+def _dict_from_buffer(buffer):
+    """
+    Rebuild a to_dict dictionary from a buffer made by _dict_to_buffer, with
+    arrays as read-only views into the buffer.
+    """
+    if bytes(buffer[:8]) != BUFFER_MAGIC:
+        raise ValueError('Not a geco_stat buffer')
+    length = int(np.frombuffer(buffer, dtype='<u8', count=1, offset=8)[0])
+    header = json.loads(bytes(buffer[16:16 + length]).decode())
+    start = _align(16 + length)
+
+    def rebuild(value):
+        if not isinstance(value, dict):
+            return value
+        if '__array__' in value:
+            offset, dtype, shape = value['__array__']
+            array = np.frombuffer(buffer, dtype=np.dtype(str(dtype)),
+                                  count=int(np.prod(shape)),
+                                  offset=start + offset).reshape(shape)
+            array.flags.writeable = False
+            return array
+        if '__scalar__' in value:
+            dtype, item = value['__scalar__']
+            return np.dtype(str(dtype)).type(item)
+        return dict([(str(key), rebuild(item))
+                     for key, item in value.items()])
+    return rebuild(header)
+
 class HDF5_IO(AbstractDictRepresentable):
     """
     Uses the ``to_dict`` methods of AbstractDictRepresentable to save and load
@@ -324,20 +601,74 @@ class HDF5_IO(AbstractDictRepresentable):
     __metaclass__  = abc.ABCMeta
     __version__ = __version__
 
-    def save_hdf5(self, filename):
-        """Save this instance to an hdf5 file."""
-        self.__save_dict_to_hdf5__(self.to_dict(), filename)
+    def save_hdf5(self, filename, compression=None, compression_opts=None,
+                  shuffle=False, fletcher32=False, chunks=None):
+        """
+        Save this instance to an hdf5 file. Each array is written once, with
+        the given storage options, which are passed on to h5py's
+        create_dataset for every array (scalars and strings are always
+        stored as is):
+
+        compression         the compression filter, e.g. 'gzip' or 'lzf'.
+                            defaults to no compression.
+
+        compression_opts    options for the compression filter, e.g. the
+                            gzip compression level from 0 to 9.
+
+        shuffle             whether to apply the byte shuffle filter before
+                            compressing, which usually helps a lot with
+                            arrays of counts. defaults to False.
+
+        fletcher32          whether to store a Fletcher32 checksum of each
+                            chunk, which HDF5 checks every time the data is
+                            read back. defaults to False.
+
+        chunks              the chunk shape, which is clipped to the shape of
+                            each array with as many dimensions, or True to
+                            let h5py choose. defaults to contiguous storage
+                            unless a filter is used, in which case h5py
+                            chooses the chunk shape. empty arrays are always
+                            stored contiguously, without filters.
+        """
+        self.__save_dict_to_hdf5__(self.to_dict(), filename,
+                                   compression=compression,
+                                   compression_opts=compression_opts,
+                                   shuffle=shuffle, fletcher32=fletcher32,
+                                   chunks=chunks)
 
     @classmethod
-    def load_hdf5(cls, filename):
-        """Load an instance saved in an hdf5 file."""
+    def load_hdf5(cls, filename, path='/', lazy=False):
+        """
+        Load an instance saved in an hdf5 file. To load an instance nested
+        inside of the saved one, give the path of its group within the file,
+        e.g. 'report/data/statistics' or 'missing_times' for a ReportSet;
+        nothing outside of that group is read. Files left partly updated by
+        an interrupted update_hdf5 are refused with a ValueError.
+
+        With lazy=True, arrays stored contiguously and uncompressed (the
+        default for save_hdf5) are memory-mapped read-only instead of being
+        read, so that only the parts of them actually used are ever read
+        from disk. The instances loaded this way are modified copy-on-write,
+        like the ones made by share, so the file itself is never modified.
+        The file must not be modified or deleted while they are in use.
+        Chunked or compressed arrays (see save_hdf5) cannot be memory-mapped,
+        and are read in full as the instance is built; a warning is issued
+        when there are any.
+        """
         # TODO: Make this a AbstReport-defined staticmethod that only
         # needs class information that is already provided in the saved
         # dictionary.
-        return cls.from_dict(cls.__load_dict_from_hdf5__(filename))
+        dic = cls.__load_dict_from_hdf5__(filename, path, lazy)
+        if lazy:
+            unmapped = cls.__lazy_dataset_names__(dic)
+            if unmapped:
+                warnings.warn('Chunked or compressed datasets in %s are read '
+                              'in full rather than lazily: %s'
+                              % (filename, ', '.join(unmapped)))
+        return cls.from_dict(dic)
 
     @classmethod
-    def __save_dict_to_hdf5__(cls, dic, filename):
+    def __save_dict_to_hdf5__(cls, dic, filename, **dataset_options):
         """
         Save a dictionary whose contents are only strings, np.float64,
         np.int64, np.ndarray, and other dictionaries following this structure
@@ -345,19 +676,48 @@ class HDF5_IO(AbstractDictRepresentable):
         to be produced by the AbstractDictRepresentable.to_dict() method. The saved
         dictionary can then be loaded using __load_dict_to_hdf5__(), and the
         contents of the loaded dictionary will be the same as those of the
-        original.
+        original. See save_hdf5 for the dataset_options used for arrays.
         """
         if os.path.exists(filename):
             raise ValueError('File %s exists, will not overwrite.' % filename)
         with h5py.File(filename, 'w') as h5file:
-            cls.__recursively_save_dict_contents_to_group__(h5file, '/', dic)
+            cls.__recursively_save_dict_contents_to_group__(h5file, '/', dic,
+                                                            **dataset_options)
+
+    @staticmethod
+    def __array_dataset_options__(array, compression=None,
+                                  compression_opts=None, shuffle=False,
+                                  fletcher32=False, chunks=None):
+        """
+        Return the keyword arguments for h5py's create_dataset to store array
+        with the options described in save_hdf5. Arrays stored as is get no
+        options at all, so that they are written contiguously.
+        """
+        options = dict()
+        if compression is not None:
+            options['compression'] = compression
+            if compression_opts is not None:
+                options['compression_opts'] = compression_opts
+        if shuffle:
+            options['shuffle'] = True
+        if fletcher32:
+            options['fletcher32'] = True
+        if chunks is True:
+            options['chunks'] = True
+        elif chunks is not None and len(chunks) == array.ndim:
+            options['chunks'] = tuple([max(min(int(c), s), 1)
+                                       for c, s in zip(chunks, array.shape)])
+        return options
 
     @classmethod
-    def __recursively_save_dict_contents_to_group__(cls, h5file, path, dic):
+    def __recursively_save_dict_contents_to_group__(cls, h5file, path, dic,
+                                                    **dataset_options):
         """
         Take an already open HDF5 file and insert the contents of a dictionary
         at the current path location. Can call itself recursively to fill
-        out HDF5 files with the contents of a dictionary.
+        out HDF5 files with the contents of a dictionary. Each item is written
+        exactly once; nothing is read back, since HDF5 can check the data on
+        reading instead if the fletcher32 dataset option is used.
         """
         # argument type checking
         if not isinstance(dic, dict):
@@ -373,38 +733,255 @@ class HDF5_IO(AbstractDictRepresentable):
             # save strings, numpy.int64, and numpy.float64 types
             if isinstance(item, (np.int64, np.float64, str)):
                 h5file[path + key] = item
-                if not h5file[path + key].value == item:
-                    raise ValueError('The data representation in the HDF5 file '
-                                     'does not match the original dict.')
-            # save numpy arrays
+            # save numpy arrays; zero-dimensional and empty ones can't be
+            # chunked, nor so filtered
             elif isinstance(item, np.ndarray):
-                h5file[path + key] = item
-                if not np.array_equal(h5file[path + key].value, item):
-                    raise ValueError('The data representation in the HDF5 file '
-                                     'does not match the original dict.')
+                options = dict()
+                if item.size != 0 and item.ndim != 0:
+                    options = cls.__array_dataset_options__(item,
+                                                            **dataset_options)
+                h5file.create_dataset(path + key, data=item, **options)
             # save dictionaries
             elif isinstance(item, dict):
                 cls.__recursively_save_dict_contents_to_group__(
-                    h5file, path + key + '/', item)
+                    h5file, path + key + '/', item, **dataset_options)
             # other types cannot be saved and will result in an error
             else:
                 raise ValueError('Cannot save %s type.' % type(item))
 
     @classmethod
-    def __load_dict_from_hdf5__(cls, filename):
+    def update_hdf5(cls, filename, other, path='/'):
+        """
+        Union other into the instance saved in an hdf5 file (or in the group
+        at path within it, see load_hdf5), modifying the file in place rather
+        than loading the saved instance, unioning it and saving it to a new
+        file. Before anything is written, other checks that it can be
+        unioned with the saved instance (e.g. that their time intervals
+        don't overlap) with __assert_hdf5_unionable__, which only reads what
+        it needs for that, and not the saved counts.
+
+        Large arrays of counts, like those of a Histogram, are added to the
+        file in place one block of rows at a time, so that the memory used
+        does not depend on their size; everything else, like time intervals
+        and statistics, is read, unioned and written back. Datasets keep
+        their storage options. Datasets whose shape changes have to be
+        recreated, and HDF5 does not reclaim the space of the old ones, so
+        repack the file (e.g. with h5repack) if its size matters.
+
+        The update is not atomic: if it is interrupted (by an error or a
+        crash) the file is left partly updated, e.g. with counts added but
+        not the time intervals they cover, and can't be repaired. The file
+        is marked as being updated until the update finishes, and
+        load_hdf5 and update_hdf5 refuse to read files so marked. Keep a
+        copy of files that can't be recomputed, or save the union to a new
+        file instead.
+        """
+        path = cls.__group_path__(path)
+        other.assert_self_consistent()
+        with h5py.File(filename, 'r+') as h5file:
+            cls.__assert_hdf5_not_updating__(h5file)
+            other.__assert_hdf5_unionable__(h5file[path])
+            h5file.attrs[cls.__updating_attribute__] = path
+            h5file.flush()
+            other.__update_hdf5_group__(h5file[path])
+            del h5file.attrs[cls.__updating_attribute__]
+
+    # attribute of the root group of files being modified by update_hdf5,
+    # holding the path of the group being updated
+    __updating_attribute__ = 'update_in_progress'
+
+    @classmethod
+    def __assert_hdf5_not_updating__(cls, h5file):
+        """
+        Make sure that an open HDF5 file was not left partly updated by an
+        interrupted update_hdf5.
+        """
+        if cls.__updating_attribute__ in h5file.attrs:
+            raise ValueError(
+                'The update of %s in %s was interrupted, leaving it '
+                'inconsistent' % (cls.__decode_strings__(
+                    h5file.attrs[cls.__updating_attribute__]),
+                    h5file.filename))
+
+    def __assert_hdf5_unionable__(self, group):
+        """
+        Make sure that this instance can be unioned into the one saved in an
+        open HDF5 group. This is part of the implementation of update_hdf5.
+
+        This default implementation loads the saved instance and checks it
+        with assert_unionable. Subclasses holding large arrays should
+        override it to only read what the check needs (see
+        __assert_hdf5_metadata__).
+        """
+        stored = self.from_dict(
+            self.__recursively_load_dict_contents_from_group__(
+                group.file, self.__group_path__(group.name)))
+        stored.assert_self_consistent()
+        stored.assert_unionable(self)
+
+    def __assert_hdf5_metadata__(self, group, keys):
+        """
+        Make sure that the instance saved in an open HDF5 group has the same
+        class and version as this one, and the same values for each of keys
+        (e.g. 'bitrate'), reading nothing else from the group.
+        """
+        stored_class = self.__decode_strings__(group['class'][()])
+        if stored_class != type(self).__name__:
+            raise ValueError('Type mismatch: cannot union %s into saved %s'
+                             % (type(self).__name__, stored_class))
+        if self.__decode_strings__(group['version'][()]) != self.__version__:
+            raise ValueError('Saved %s has a different version'
+                             % stored_class)
+        for key in keys:
+            if not np.array_equal(
+                    self.__decode_strings__(group[key][()]),
+                    getattr(self, key)):
+                raise ValueError('Saved %s has a different %s'
+                                 % (stored_class, key))
+
+    def __update_hdf5_group__(self, group):
+        """
+        Union this instance into the one saved in an open HDF5 group, in
+        place. This is part of the implementation of update_hdf5, which has
+        already checked that the two can be unioned.
+
+        This default implementation loads the saved instance, unions it with
+        this one and writes the result back over it, dataset by dataset.
+        Subclasses holding large arrays should override it to update those
+        arrays in place (see __add_to_dataset__).
+        """
+        stored = self.from_dict(
+            self.__recursively_load_dict_contents_from_group__(
+                group.file, self.__group_path__(group.name)))
+        self.__write_dict_to_group__(group, stored.__union__(self).to_dict())
+
+    @classmethod
+    def __write_dict_to_group__(cls, group, dic):
+        """
+        Overwrite the contents of an open HDF5 group with those of a dict,
+        writing arrays into the existing datasets where their shape and type
+        haven't changed, and recreating them with the same storage options
+        otherwise.
+        """
+        for key, item in dic.items():
+            if isinstance(item, dict):
+                if key not in group:
+                    group.create_group(key)
+                cls.__write_dict_to_group__(group[key], item)
+            else:
+                cls.__replace_dataset__(group, key, item)
+
+    @staticmethod
+    def __storage_options__(dataset, shape):
+        """
+        Return the storage options of an existing HDF5 dataset, to create a
+        new dataset of the given shape with. The chunk shape is clipped to
+        the new shape; empty datasets are stored as is, since they can't be
+        chunked.
+        """
+        if not dataset.shape or dataset.chunks is None or 0 in shape:
+            return dict()
+        chunks = True
+        if len(shape) == len(dataset.chunks):
+            chunks = tuple([max(min(c, s), 1)
+                            for c, s in zip(dataset.chunks, shape)])
+        options = {'chunks': chunks, 'shuffle': dataset.shuffle,
+                   'fletcher32': dataset.fletcher32}
+        if dataset.compression is not None:
+            options['compression'] = dataset.compression
+            options['compression_opts'] = dataset.compression_opts
+        return options
+
+    @classmethod
+    def __replace_dataset__(cls, group, key, value):
+        """
+        Write value to the dataset key of an open HDF5 group, in place if it
+        has the same shape and type as the existing dataset, and otherwise by
+        recreating the dataset with the same storage options.
+        """
+        options = dict()
+        if key in group:
+            dataset = group[key]
+            value_array = np.asarray(value)
+            if (dataset.shape and dataset.shape == value_array.shape and
+                    dataset.dtype == value_array.dtype):
+                dataset[...] = value_array
+                return
+            if value_array.ndim != 0:
+                options = cls.__storage_options__(dataset,
+                                                  value_array.shape)
+            del group[key]
+        if options:
+            group.create_dataset(key, data=value, **options)
+        else:
+            group[key] = value
+
+    @classmethod
+    def __add_to_dataset__(cls, group, key, array, dtype=None):
+        """
+        Add array to the dataset key of an open HDF5 group in place, reading
+        and writing one block of rows (one chunk, for chunked datasets) at a
+        time. If dtype is given and differs from the type of the dataset,
+        the dataset is replaced with one of that type, with the same storage
+        options, as it is added to.
+        """
+        dataset = group[key]
+        if dataset.shape != array.shape:
+            raise ValueError('Cannot add arrays of different shapes to %s'
+                             % dataset.name)
+        target = dataset
+        if dtype is not None and dataset.dtype != dtype:
+            if key + '.widened' in group:
+                # left behind by an interrupted update
+                del group[key + '.widened']
+            target = group.create_dataset(
+                key + '.widened', shape=dataset.shape, dtype=dtype,
+                **cls.__storage_options__(dataset, dataset.shape))
+        if dataset.chunks is not None:
+            step = dataset.chunks[0]
+        else:
+            # rows of about 1 MB, in the widest of the types involved
+            row_bytes = int(np.prod(dataset.shape[1:])) * max(
+                dataset.dtype.itemsize, target.dtype.itemsize,
+                array.dtype.itemsize)
+            step = max(1, (2**20) // max(1, row_bytes))
+        for start in range(0, max(1, dataset.shape[0]), step):
+            rows = slice(start, start + step)
+            target[rows] = np.add(dataset[rows], array[rows],
+                                  dtype=target.dtype)
+        if target is not dataset:
+            del group[key]
+            group.move(key + '.widened', key)
+
+    @classmethod
+    def __load_dict_from_hdf5__(cls, filename, path='/', lazy=False):
         """
         Load a dictionary whose contents are only strings, floats, ints,
         numpy arrays, and other dictionaries following this structure
         from an HDF5 file. These dictionaries can then be used to reconstruct
         AbstractDictRepresentable subclass instances using the
-        AbstractDictRepresentable.from_dict() method.
+        AbstractDictRepresentable.from_dict() method. Only the group at path
+        is loaded.
+
+        With lazy=True, arrays are not read right away: contiguous,
+        uncompressed ones are memory-mapped read-only, and the others are
+        loaded as LazyDataset proxies, which read them on first access.
+        Scalars and strings are always read.
         """
         with h5py.File(filename, 'r') as h5file:
-            return cls.__recursively_load_dict_contents_from_group__(h5file,
-                                                                     '/')
+            cls.__assert_hdf5_not_updating__(h5file)
+            return cls.__recursively_load_dict_contents_from_group__(
+                h5file, cls.__group_path__(path), lazy)
+
+    @staticmethod
+    def __group_path__(path):
+        'Normalize the path of an HDF5 group to start and end with a slash.'
+        path = '/' + path.strip('/') + '/'
+        return '/' if path == '//' else path
 
     @classmethod
-    def __recursively_load_dict_contents_from_group__(cls, h5file, path):
+    def __recursively_load_dict_contents_from_group__(cls, h5file, path,
+                                                      lazy=False):
         """
         Load contents of an HDF5 group. If further groups are encountered,
         treat them like dicts and continue to load them recursively.
@@ -412,12 +989,104 @@ class HDF5_IO(AbstractDictRepresentable):
         ans = {}
         for key, item in h5file[path].items():
             if isinstance(item, h5py._hl.dataset.Dataset):
-                ans[key] = item.value
+                if lazy and item.shape:
+                    ans[key] = cls.__lazy_dataset__(item)
+                else:
+                    ans[key] = cls.__decode_strings__(item[()])
             elif isinstance(item, h5py._hl.group.Group):
                 ans[key] = cls.__recursively_load_dict_contents_from_group__(
-                    h5file, path + key + '/')
+                    h5file, path + key + '/', lazy)
         return ans
 
+    @staticmethod
+    def __decode_strings__(value):
+        """
+        h5py 3 reads strings back as bytes; turn them back into str, along
+        with arrays of them.
+        """
+        if isinstance(value, bytes):
+            return value.decode()
+        if isinstance(value, np.ndarray) and (
+                value.dtype.kind == 'S' or value.dtype.kind == 'O' and
+                value.size and isinstance(value.flat[0], bytes)):
+            return np.array([v.decode() for v in value.flat]).reshape(
+                value.shape)
+        return value
+
+    @classmethod
+    def __lazy_dataset_names__(cls, dic):
+        """
+        Return the names of the datasets loaded as LazyDataset proxies in a
+        dict loaded with __load_dict_from_hdf5__, sorted.
+        """
+        names = []
+        for item in dic.values():
+            if isinstance(item, dict):
+                names += cls.__lazy_dataset_names__(item)
+            elif isinstance(item, LazyDataset):
+                names.append(item.name)
+        return sorted(names)
+
+    @staticmethod
+    def __lazy_dataset__(dataset):
+        """
+        Return a read-only memory map of an HDF5 dataset if it is stored
+        contiguously and uncompressed, and a LazyDataset proxy if it is
+        chunked or compressed. Empty datasets, which have no storage in the
+        file, and contiguous ones that cannot be mapped (e.g. strings) are
+        simply read.
+        """
+        if dataset.chunks is not None or dataset.compression is not None:
+            return LazyDataset(dataset.file.filename, dataset.name,
+                               dataset.shape, dataset.dtype)
+        offset = dataset.id.get_offset()
+        if (dataset.size == 0 or offset is None or
+                dataset.dtype.kind not in 'biuf'):
+            return HDF5_IO.__decode_strings__(dataset[()])
+        return np.memmap(dataset.file.filename, dtype=dataset.dtype,
+                         mode='r', offset=offset, shape=dataset.shape)
+
+
+class LazyDataset(object):
+    """
+    A placeholder for an array stored in an HDF5 file, which is read from
+    the file the first time its contents are used (through numpy.asarray,
+    indexing, or read) and cached afterwards.
+    """
+
+    def __init__(self, filename, name, shape, dtype):
+        self.filename   = filename
+        self.name       = name
+        self.shape      = tuple(shape)
+        self.dtype      = np.dtype(dtype)
+        self._array     = None
+
+    def read(self):
+        'Read the array from the file if needed and return it.'
+        if self._array is None:
+            with h5py.File(self.filename, 'r') as h5file:
+                self._array = HDF5_IO.__decode_strings__(h5file[self.name][()])
+        return self._array
+
+    @property
+    def ndim(self):
+        return len(self.shape)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, index):
+        return self.read()[index]
+
+    def __array__(self, dtype=None, copy=None):
+        if dtype is None:
+            return self.read()
+        return self.read().astype(dtype)
+
+    def __repr__(self):
+        return 'LazyDataset(%r, %r, shape=%r, dtype=%s)' % (
+            self.filename, self.name, self.shape, self.dtype)
+
 class AbstractPlottable(object):
     """
     An interface for generating matplotlib figures that can be used in
@@ -8,8 +8,56 @@ from geco_stat.Abstract import Factory
 from geco_stat.Abstract import AbstUnionable
 from geco_stat.Abstract import AbstractPlottable
 from geco_stat.Abstract import HDF5_IO
+from geco_stat.Abstract import _stored_array
 from geco_stat.Time import TimeIntervalSet
 
+def _uniform_bin_indices(values, bins):
+    """
+    Find the bin that each of the values falls into, given uniformly spaced
+    bin edges, using the same arithmetic and edge correction as
+    np.histogram's fast path for uniform bins. Returns the array of bin
+    indices along with a boolean array that is False wherever a value lies
+    outside of the bins (or is NaN); the bin indices there are meaningless.
+    """
+    num_bins = len(bins) - 1
+    inside = (values >= bins[0]) & (values <= bins[-1])
+    indices = (values - bins[0]) * (num_bins / (bins[-1] - bins[0]))
+    indices[~inside] = 0
+    indices = indices.astype(np.intp)
+    indices[indices == num_bins] -= 1
+    indices[values < bins[indices]] -= 1
+    indices[(values >= bins[indices + 1]) &
+            (indices != num_bins - 1)] += 1
+    return indices, inside
+
+def _out_of_range_counts(values, inside, bins):
+    """
+    Given a (num_sec, num_slots) array of values and the boolean array
+    returned for it by _uniform_bin_indices, return a (3, num_slots) array
+    with the number of values in each slot that fall below the bins, above
+    them, and that are NaN, in that order. Only the samples that are not
+    inside the bins are looked at again.
+    """
+    num_slots = values.shape[1]
+    if np.all(inside):
+        return np.zeros((3, num_slots), dtype=np.int64)
+    rows, columns = np.nonzero(~inside)
+    outside = values[rows, columns]
+    return np.array([
+        np.bincount(columns[outside < bins[0]], minlength=num_slots),
+        np.bincount(columns[outside > bins[-1]], minlength=num_slots),
+        np.bincount(columns[np.isnan(outside)], minlength=num_slots)],
+        dtype=np.int64)
+
+def _nan_equal(a, b):
+    """
+    Compare two arrays like np.array_equal, but treating NaNs in the same
+    places as equal, as for unknown extrema or times of extrema.
+    """
+    a, b = np.asarray(a), np.asarray(b)
+    return a.shape == b.shape and bool(np.all((a == b) |
+                                              (np.isnan(a) & np.isnan(b))))
+
 # Inherit from HDF5_IO first in order to get an implemented clone method
 class AbstData(HDF5_IO,
                          # AbstractPlottable, TODO Make AbstractPlottable
@@ -27,6 +75,20 @@ class AbstData(HDF5_IO,
     __metaclass__  = abc.ABCMeta
     __version__ = __version__
 
+    def accumulate(self, timeseries):
+        """
+        Fold the data in timeseries into this instance, modifying it in place,
+        and return it. The result is the same as unioning this instance with
+        one made from the timeseries.
+
+        This default implementation actually does just that, and then takes
+        on the state of the union; subclasses should override it to update
+        their buffers in place without allocating a new instance.
+        """
+        ans = self.union(self.from_timeseries(timeseries))
+        self.__dict__.update(ans.__dict__)
+        return self
+
 # TODO: Make AbstractPlottable
 class Histogram(AbstData):
     """
@@ -39,17 +101,35 @@ class Histogram(AbstData):
     This class DOES NOT contain information about the time ranges
     included in the data; that information should go into some containing
     class. This class is intended as a diagnostic report primitive.
+
+    Since each second of data adds at most one count to any bin, the counts
+    are stored in the narrowest unsigned integer type that can hold
+    ``max_count``, an upper bound on the count in any bin that grows with
+    the number of seconds binned (uint8 for a single frame file, uint16 for
+    up to 18 hours, and so on, up to int64). The counts are promoted to a
+    wider type automatically when unions or accumulation could overflow
+    them.
+
+    Samples that do not fall in any bin are not lost without a trace: the
+    number of samples in each slot that fell below hist_range, above it, or
+    were NaN are kept in ``underflow``, ``overflow`` and ``nans``
+    respectively, which are tallied while binning and merged in unions.
     """
 
     def __init__(self,
                  hist            = None,
                  hist_range      = (-1e3, 1e3),
                  hist_num_bins   = 256,
-                 bitrate         = __default_bitrate__):
+                 bitrate         = __default_bitrate__,
+                 max_count       = None,
+                 underflow       = None,
+                 overflow        = None,
+                 nans            = None):
         """
         Initialize an instance of the class. All properties have default
         values corresponding to an empty statistics set; they can be
-        individually overridden.
+        individually overridden. max_count defaults to the largest count in
+        hist.
         """
         # make sure hist_range is an ordered pair of numbers
         if not len(hist_range) == 2:
@@ -57,42 +137,150 @@ class Histogram(AbstData):
         elif hist_range[0] >= hist_range[1]:
             raise ValueError('min val of hist bin range must be less than max')
 
-        # set values to "empty" histograms
-        if hist is None:
-            hist = np.zeros((hist_num_bins, bitrate), dtype=np.int64)
-
         assert np.int64(hist_num_bins) == hist_num_bins, \
             'hist_num_bins must be an integer'
         self.hist_num_bins  = np.int64(hist_num_bins)
         assert len(hist_range) == 2
         self.hist_range     = np.array(hist_range)
-        # Make sure this is a copy of the data
-        self.hist           = np.array(hist, copy=True)
         self.hist_bins      = np.linspace(hist_range[0], hist_range[1],
                                           hist_num_bins+1)
         self.t_ticks        = np.linspace(0,1,bitrate+1)
         assert np.int64(bitrate) == bitrate, 'bitrate must be an integer'
         self.bitrate        = np.int64(bitrate)
+        self.__set_hist__(hist, max_count)
+        self.__set_out_of_range__(underflow, overflow, nans)
+
+    def __set_out_of_range__(self, underflow=None, overflow=None, nans=None):
+        """
+        Store copies of the per-slot underflow, overflow and NaN counts,
+        which default to zero.
+        """
+        counts = []
+        for count in underflow, overflow, nans:
+            if count is None:
+                count = np.zeros(self.bitrate, dtype=np.int64)
+            counts.append(np.array(count, dtype=np.int64,
+                                   copy=True).reshape((self.bitrate,)))
+        self.underflow, self.overflow, self.nans = counts
+
+    def __add_out_of_range__(self, counts):
+        """
+        Add a (3, bitrate) array of underflow, overflow and NaN counts to
+        this histogram's in place.
+        """
+        self.__copy_on_write__()
+        self.underflow += counts[0]
+        self.overflow += counts[1]
+        self.nans += counts[2]
+
+    def __out_of_range_equal__(self, other):
+        return (np.array_equal(self.underflow, other.underflow) and
+                np.array_equal(self.overflow, other.overflow) and
+                np.array_equal(self.nans, other.nans))
+
+    def __set_hist__(self, hist, max_count=None):
+        """
+        Store a copy of the dense histogram array hist, or an empty histogram
+        if hist is None, using the narrowest type that can hold max_count.
+        """
+        # set values to "empty" histograms
+        if hist is None:
+            hist = np.zeros(self.shape, dtype=np.uint8)
+        hist = np.asarray(hist)
+        if max_count is None:
+            max_count = hist.max() if hist.size != 0 else 0
+        self.max_count      = np.int64(max_count)
+        # Make sure this is a copy of the data
+        self.hist           = _stored_array(
+            hist, dtype=self.__count_dtype__(self.max_count))
+
+    @staticmethod
+    def __count_dtype__(max_count):
+        """
+        Return the narrowest integer type that can hold counts up to
+        max_count. int64 is used rather than uint64 for the largest counts,
+        since numpy casts mixed uint64 and int64 arithmetic to float64.
+        """
+        for dtype in (np.uint8, np.uint16, np.uint32):
+            if max_count <= np.iinfo(dtype).max:
+                return dtype
+        return np.int64
+
+    def __reserve__(self, num_sec):
+        """
+        Make room in the counts for num_sec more seconds of data, promoting
+        them to a wider type if needed.
+        """
+        self.max_count = np.int64(self.max_count + num_sec)
+        dtype = self.__count_dtype__(self.max_count)
+        if self.hist.dtype != dtype:
+            self.hist = self.hist.astype(dtype, order='C')
+
+    @property
+    def shape(self):
+        'The shape of the histogram array, (hist_num_bins, bitrate).'
+        return (int(self.hist_num_bins), int(self.bitrate))
 
     def __union__(self, other):
         """
         Take the union of these two histograms, representing the histogram of
         the union of the two histograms' respective datasets.
         """
-        ans         = self.clone()
-        ans.hist    = self.hist + other.hist
-        return ans
-
-    def __clone__(self):
+        max_count   = self.max_count + other.max_count
         return type(self)(
-            hist            = self.hist,
+            hist            = np.add(self.hist, other.hist,
+                                     dtype=self.__count_dtype__(max_count)),
             hist_range      = self.hist_range,
             hist_num_bins   = self.hist_num_bins,
-            bitrate         = self.bitrate
-        )
+            bitrate         = self.bitrate,
+            max_count       = max_count,
+            underflow       = self.underflow + other.underflow,
+            overflow        = self.overflow + other.overflow,
+            nans            = self.nans + other.nans)
+
+    @classmethod
+    def __union_all__(cls, instances):
+        """
+        Sum all of the histograms into a single output buffer.
+        """
+        first = instances[0]
+        for other in instances[1:]:
+            first.assert_unionable(other)
+        ans = first.clone()
+        ans.__reserve__(sum([int(i.max_count) for i in instances[1:]]))
+        for other in instances[1:]:
+            ans.hist += other.hist
+            ans.__add_out_of_range__(
+                (other.underflow, other.overflow, other.nans))
+        return ans
+
+    def __update_hdf5_group__(self, group):
+        """
+        Add this histogram's counts to the ones saved in an open HDF5 group
+        in place, one block of rows at a time, widening their type if the
+        combined max_count calls for it.
+        """
+        if 'max_count' not in group:
+            # older files don't record max_count
+            return super(Histogram, self).__update_hdf5_group__(group)
+        max_count = np.int64(group['max_count'][()] + self.max_count)
+        self.__add_to_dataset__(group, 'hist', self.hist,
+                                self.__count_dtype__(max_count))
+        for key, counts in (('underflow', self.underflow),
+                            ('overflow', self.overflow),
+                            ('nans', self.nans)):
+            if key in group:
+                counts = counts + group[key][()]
+            self.__replace_dataset__(group, key, counts)
+        self.__replace_dataset__(group, 'max_count', max_count)
+
+    def __assert_hdf5_unionable__(self, group):
+        'Check the bins of the saved histogram without reading its counts.'
+        self.__assert_hdf5_metadata__(
+            group, ('hist_range', 'hist_num_bins', 'bitrate'))
 
     def assert_unionable(self, other):
-        if (self.hist_range != other.hist_range or
+        if (not np.array_equal(self.hist_range, other.hist_range) or
                 self.hist_num_bins != other.hist_num_bins):
             raise ValueError('Histograms have different bin edges')
         if self.bitrate != other.bitrate:
@@ -110,20 +298,30 @@ class Histogram(AbstData):
                 'Histogram version ' +
                 self.__version__ +
                 ' does not match lib version')
-        assert self.hist_bins == np.linspace(
-            self.hist_range[0], self.hist_range[1], self.hist_num_bins+1)
-        assert self.t_ticks == np.linspace(0,1,self.bitrate+1)
+        assert np.array_equal(self.hist_bins, np.linspace(
+            self.hist_range[0], self.hist_range[1], self.hist_num_bins+1))
+        assert np.array_equal(self.t_ticks, np.linspace(0,1,self.bitrate+1))
+        assert (self.underflow.shape == self.overflow.shape ==
+                self.nans.shape == (self.bitrate,)), \
+            'out of range counts should be vectors with length equal to ' \
+            'bitrate'
         assert np.int64(
             self.bitrate) == self.bitrate, 'bitrate must be an integer'
         return True
 
     @classmethod
     def __from_dict__(cls, d):
+        # older files have int64 counts, no max_count and no out of range
+        # counts
         return cls(
             hist            = d['hist'],
             hist_range      = d['hist_range'],
             hist_num_bins   = d['hist_num_bins'],
-            bitrate         = d['bitrate']
+            bitrate         = d['bitrate'],
+            max_count       = d.get('max_count'),
+            underflow       = d.get('underflow'),
+            overflow        = d.get('overflow'),
+            nans            = d.get('nans')
         )
 
     def __to_dict__(self):
@@ -132,31 +330,323 @@ class Histogram(AbstData):
             'hist_range': np.array(self.hist_range),
             'hist_num_bins': self.hist_num_bins,
             'bitrate': self.bitrate,
+            'max_count': np.int64(self.max_count),
+            'underflow': np.array(self.underflow),
+            'overflow': np.array(self.overflow),
+            'nans': np.array(self.nans),
             'version': self.__version__,
             'class': 'Histogram'
         }
 
     def from_timeseries(self, timeseries):
-        num_sec = timeseries.get_num_seconds()
-        hist, xedges, yedges = np.histogram2d(
-            timeseries.flatten(),
-            np.tile(self.t_ticks, num_sec),
-            bins = [self.hist_bins, self.t_ticks])
-        assert xedges == self.hist_bins, \
-            'xedges should be the histogram bins'
-        assert yedges == self.t_ticks, \
-            'yedges should be the t_ticks'
         assert self.bitrate == timeseries.bitrate, \
             'timeseries and histogram must have same bitrate'
         self.assert_self_consistent()
-        return type(self)(
-            hist            = hist,
+        ans = type(self)(
             hist_range      = self.hist_range,
             hist_num_bins   = self.hist_num_bins,
             bitrate         = self.bitrate)
+        ans.__add_counts__(np.asarray(timeseries))
+        return ans
+
+    def accumulate(self, timeseries):
+        """
+        Add the samples in timeseries to this histogram in place, without
+        allocating a new histogram, and return it.
+        """
+        assert self.bitrate == timeseries.bitrate, \
+            'timeseries and histogram must have same bitrate'
+        self.__add_counts__(np.asarray(timeseries))
+        return self
+
+    def __add_counts__(self, values):
+        """
+        Add the samples in values, an array of shape (num_sec, bitrate), to
+        this histogram in place. Each sample is binned by its value and by its
+        offset within its second; since the time bins are just the columns of
+        values and the value bins are uniform, both indices are computed
+        arithmetically and every sample is added to hist in a single
+        unbuffered np.add.at over the flattened bin indices, so that no
+        temporary array the size of the histogram is needed.
+
+        The result is exactly what np.histogram2d would give: values falling
+        on a bin edge go in the bin to the right of it (except for the last
+        edge, which is included in the last bin), and values outside of
+        hist_range, as well as NaNs, are left out of hist and tallied in
+        underflow, overflow and nans instead.
+        """
+        values = np.asarray(values).reshape((-1, self.bitrate))
+        self.__copy_on_write__()
+        self.__reserve__(values.shape[0])
+        indices, out_of_range = self.__flat_bin_indices__(values)
+        # the increment must match the type of hist to get numpy's fast path
+        np.add.at(self.hist.reshape(-1), indices, self.hist.dtype.type(1))
+        self.__add_out_of_range__(out_of_range)
+
+    def __flat_bin_indices__(self, values):
+        """
+        Return the index into the flattened histogram array of the bin that
+        each in-range sample in values falls into, along with a (3, bitrate)
+        array of the number of samples in each slot that fell below
+        hist_range, above it, or were NaN. See __add_counts__.
+        """
+        values = np.asarray(values, dtype=np.float64).reshape(
+            (-1, self.bitrate))
+        indices, inside = _uniform_bin_indices(values, self.hist_bins)
+        # flat index into the (hist_num_bins, bitrate) histogram
+        indices *= self.bitrate
+        indices += np.arange(self.bitrate)
+        indices = indices.reshape(-1)
+        if not np.all(inside):
+            indices = indices[inside.reshape(-1)]
+        return indices, _out_of_range_counts(values, inside, self.hist_bins)
+
+    def to_sparse(self):
+        'Return a SparseHistogram holding the same counts as this histogram.'
+        return SparseHistogram(
+            hist            = self.hist,
+            hist_range      = self.hist_range,
+            hist_num_bins   = self.hist_num_bins,
+            bitrate         = self.bitrate,
+            max_count       = self.max_count,
+            underflow       = self.underflow,
+            overflow        = self.overflow,
+            nans            = self.nans)
+
+    def __eq__(self, other):
+        if (not np.array_equal(self.hist_range, other.hist_range) or
+                self.hist_num_bins != other.hist_num_bins):
+            return False
+        if self.bitrate != other.bitrate:
+            return False
+        if self.__version__ != other.__version__:
+            return False
+        if not isinstance(self, type(other)):
+            return False
+        return (np.array_equal(self.hist, other.hist) and
+                self.__out_of_range_equal__(other))
+
+class SparseHistogram(Histogram):
+    """
+    A Histogram that only stores its nonzero bins, in coordinate (COO)
+    format: ``indices`` holds the sorted indices of the nonzero bins in the
+    flattened (hist_num_bins, bitrate) histogram array, and ``counts`` holds
+    the counts in those bins. Since a timing signal only ever fills a handful
+    of value bins in each time column, this takes a small fraction of the
+    memory (and HDF5 file space) of the dense histogram.
+
+    Counts are stored as int64; max_count is kept up to date all the same,
+    so that conversion to a dense Histogram picks the right type.
+
+    A SparseHistogram can be used anywhere a Histogram can. Its ``hist``
+    property builds the dense array on demand, e.g. for plotting, and
+    assigning to it stores the nonzero bins of the new dense array; use
+    to_dense to get an equivalent Histogram. Unions, accumulation and
+    equality tests all work on the nonzero bins directly.
+    """
+
+    def __init__(self,
+                 hist            = None,
+                 hist_range      = (-1e3, 1e3),
+                 hist_num_bins   = 256,
+                 bitrate         = __default_bitrate__,
+                 max_count       = None,
+                 underflow       = None,
+                 overflow        = None,
+                 nans            = None,
+                 indices         = None,
+                 counts          = None):
+        """
+        Initialize the histogram either from a dense histogram array, hist,
+        or from the indices and counts of its nonzero bins. With neither, the
+        histogram starts out empty.
+        """
+        if hist is not None and (indices is not None or counts is not None):
+            raise ValueError('Provide either hist or indices and counts')
+        super(SparseHistogram, self).__init__(
+            hist            = hist,
+            hist_range      = hist_range,
+            hist_num_bins   = hist_num_bins,
+            bitrate         = bitrate,
+            max_count       = max_count,
+            underflow       = underflow,
+            overflow        = overflow,
+            nans            = nans)
+        if indices is not None or counts is not None:
+            self.indices    = _stored_array(
+                indices, dtype=self.__index_dtype__()).reshape(-1)
+            self.counts     = _stored_array(
+                counts, dtype=np.int64).reshape(-1)
+            if max_count is None:
+                max_count   = self.counts.max() if len(self.counts) else 0
+            self.max_count  = np.int64(max_count)
+        self.assert_self_consistent()
+
+    def __index_dtype__(self):
+        'The narrowest signed integer type that can index every bin.'
+        if self.hist_num_bins * self.bitrate <= np.iinfo(np.int32).max:
+            return np.int32
+        return np.int64
+
+    def __set_hist__(self, hist, max_count=None):
+        if hist is None:
+            hist = np.array([], dtype=np.int64)
+            self.indices    = np.array([], dtype=self.__index_dtype__())
+        else:
+            hist = np.asarray(hist).reshape(-1)
+            if hist.size != self.shape[0] * self.shape[1]:
+                raise ValueError('hist must have shape (hist_num_bins, '
+                                 'bitrate)')
+            self.indices    = np.flatnonzero(hist).astype(
+                self.__index_dtype__())
+        self.counts     = hist[self.indices].astype(np.int64)
+        if max_count is None:
+            max_count   = self.counts.max() if len(self.counts) else 0
+        self.max_count  = np.int64(max_count)
+
+    @property
+    def hist(self):
+        """
+        The dense (hist_num_bins, bitrate) histogram array. This is built
+        anew every time it is accessed, so modifying it in place has no
+        effect; assign a new array to it instead.
+        """
+        hist = np.zeros(self.shape, dtype=self.__count_dtype__(self.max_count))
+        hist.reshape(-1)[self.indices] = self.counts
+        return hist
+
+    @hist.setter
+    def hist(self, hist):
+        self.__set_hist__(hist)
+
+    def to_dense(self):
+        'Return a Histogram holding the same counts as this histogram.'
+        return Histogram(
+            hist            = self.hist,
+            hist_range      = self.hist_range,
+            hist_num_bins   = self.hist_num_bins,
+            bitrate         = self.bitrate,
+            max_count       = self.max_count,
+            underflow       = self.underflow,
+            overflow        = self.overflow,
+            nans            = self.nans)
+
+    def to_sparse(self):
+        return self.clone()
+
+    @staticmethod
+    def __sum_duplicates__(indices, counts):
+        """
+        Given possibly repeated bin indices and their counts, return the
+        sorted unique indices and the total count for each.
+        """
+        order = np.argsort(indices, kind='mergesort')
+        indices = indices[order]
+        counts = counts[order]
+        if len(indices) == 0:
+            return indices, counts
+        firsts = np.flatnonzero(np.concatenate(
+            ([True], indices[1:] != indices[:-1])))
+        return indices[firsts], np.add.reduceat(counts, firsts)
+
+    def __merge_bins__(self, others):
+        """
+        Add the bins of the histograms in others (sparse or dense) to this
+        histogram's in place.
+        """
+        others = [o if isinstance(o, SparseHistogram) else o.to_sparse()
+                  for o in others]
+        self.indices, self.counts = self.__sum_duplicates__(
+            np.concatenate([self.indices] + [o.indices for o in others]),
+            np.concatenate([self.counts] + [o.counts for o in others]))
+        self.max_count = np.int64(self.max_count +
+                                  sum([int(o.max_count) for o in others]))
+        for other in others:
+            self.__add_out_of_range__(
+                (other.underflow, other.overflow, other.nans))
+
+    def __union__(self, other):
+        ans = self.clone()
+        ans.__merge_bins__([other])
+        return ans
+
+    @classmethod
+    def __union_all__(cls, instances):
+        """
+        Add up the bins of all of the histograms with a single sort.
+        """
+        first = instances[0]
+        for other in instances[1:]:
+            first.assert_unionable(other)
+        ans = first.clone()
+        ans.__merge_bins__(instances[1:])
+        return ans
+
+    def __add_counts__(self, values):
+        values = np.asarray(values).reshape((-1, self.bitrate))
+        self.max_count = np.int64(self.max_count + values.shape[0])
+        indices, out_of_range = self.__flat_bin_indices__(values)
+        indices = indices.astype(self.indices.dtype)
+        self.indices, self.counts = self.__sum_duplicates__(
+            np.concatenate((self.indices, indices)),
+            np.concatenate((self.counts,
+                            np.ones(len(indices), dtype=np.int64))))
+        self.__add_out_of_range__(out_of_range)
+
+    def __update_hdf5_group__(self, group):
+        """
+        The nonzero bins of the two histograms have to be merged, so the
+        saved histogram is loaded and rewritten in full.
+        """
+        return HDF5_IO.__update_hdf5_group__(self, group)
+
+    def __assert_hdf5_unionable__(self, group):
+        'The saved histogram is loaded in full anyway, so check all of it.'
+        return HDF5_IO.__assert_hdf5_unionable__(self, group)
+
+    def assert_self_consistent(self):
+        super(SparseHistogram, self).assert_self_consistent()
+        assert self.indices.shape == self.counts.shape, \
+            'indices and counts must have the same length'
+        assert np.all(self.indices[1:] > self.indices[:-1]), \
+            'indices must be sorted and unique'
+        assert len(self.indices) == 0 or (
+            self.indices[0] >= 0 and
+            self.indices[-1] < self.hist_num_bins * self.bitrate), \
+            'indices out of range'
+        return True
+
+    @classmethod
+    def __from_dict__(cls, d):
+        return cls(
+            hist_range      = d['hist_range'],
+            hist_num_bins   = d['hist_num_bins'],
+            bitrate         = d['bitrate'],
+            max_count       = d['max_count'],
+            underflow       = d.get('underflow'),
+            overflow        = d.get('overflow'),
+            nans            = d.get('nans'),
+            indices         = d['indices'],
+            counts          = d['counts']
+        )
+
+    def __to_dict__(self):
+        return {
+            'indices': np.array(self.indices),
+            'counts': np.array(self.counts),
+            'hist_range': np.array(self.hist_range),
+            'hist_num_bins': self.hist_num_bins,
+            'bitrate': self.bitrate,
+            'max_count': np.int64(self.max_count),
+            'underflow': np.array(self.underflow),
+            'overflow': np.array(self.overflow),
+            'nans': np.array(self.nans)
+        }
 
     def __eq__(self, other):
-        if (self.hist_range != other.hist_range or
+        if not isinstance(other, SparseHistogram):
+            return False
+        if (not np.array_equal(self.hist_range, other.hist_range) or
                 self.hist_num_bins != other.hist_num_bins):
             return False
         if self.bitrate != other.bitrate:
@@ -165,6 +655,293 @@ class Histogram(AbstData):
             return False
         if not isinstance(self, type(other)):
             return False
+        return (np.array_equal(self.indices, other.indices) and
+                np.array_equal(self.counts, other.counts) and
+                self.__out_of_range_equal__(other))
+
+# TODO: Make AbstractPlottable
+class MultiResolutionHistogram(AbstData):
+    """
+    A stack of histograms of a (quasi) periodic timeseries at several "zoom
+    levels", like the ones in a Histogram, filled in a single pass over the
+    data. Level 0 covers hist_range; each following level covers a range
+    ``zoom`` times narrower, centered on the same value, with the same number
+    of bins (so that its bins are ``zoom`` times narrower as well). The bins
+    of every level line up with those of the level around it, so each bin of
+    a coarser level is the sum of ``zoom`` bins of the next finer level
+    wherever the two overlap.
+
+    Each sample is therefore only counted once, in the finest level whose
+    range contains it, and the full histogram of each level is derived on
+    demand by adding the counts of the finer levels inside it (see
+    get_level). ``hist`` holds those per-level counts, with shape
+    (num_levels, hist_num_bins, bitrate), in the narrowest integer type that
+    can hold max_count, just like a Histogram.
+
+    The bins of a level are half-open, except for the last bin of level 0,
+    which also includes the upper end of hist_range. Samples outside of
+    hist_range, as well as NaNs, are dropped.
+    """
+
+    def __init__(self,
+                 hist            = None,
+                 hist_range      = (-1e3, 1e3),
+                 hist_num_bins   = 256,
+                 num_levels      = 4,
+                 zoom            = 4,
+                 bitrate         = __default_bitrate__,
+                 max_count       = None):
+        """
+        Initialize an instance of the class. All properties have default
+        values corresponding to an empty histogram; they can be individually
+        overridden. hist_num_bins must be a multiple of zoom, and the finer
+        levels must start on a bin edge of the coarser ones, i.e.
+        hist_num_bins * (zoom - 1) / zoom must be even.
+        """
+        if not len(hist_range) == 2:
+            raise ValueError('second argument (hist_range) must have length 2')
+        elif hist_range[0] >= hist_range[1]:
+            raise ValueError('min val of hist bin range must be less than max')
+        assert np.int64(hist_num_bins) == hist_num_bins, \
+            'hist_num_bins must be an integer'
+        assert np.int64(num_levels) == num_levels and num_levels >= 1, \
+            'num_levels must be a positive integer'
+        assert np.int64(zoom) == zoom and zoom >= 2, \
+            'zoom must be an integer greater than one'
+        if (hist_num_bins % zoom != 0 or
+                (hist_num_bins // zoom * (zoom - 1)) % 2 != 0):
+            raise ValueError('bins of neighboring zoom levels do not line up; '
+                             'hist_num_bins must be a multiple of zoom and '
+                             'hist_num_bins * (zoom - 1) / zoom must be even')
+        assert np.int64(bitrate) == bitrate, 'bitrate must be an integer'
+        self.hist_range     = np.array(hist_range)
+        self.hist_num_bins  = np.int64(hist_num_bins)
+        self.num_levels     = np.int64(num_levels)
+        self.zoom           = np.int64(zoom)
+        self.bitrate        = np.int64(bitrate)
+        shape = (int(num_levels), int(hist_num_bins), int(bitrate))
+        if hist is None:
+            hist = np.zeros(shape, dtype=np.uint8)
+        hist = np.asarray(hist)
+        if max_count is None:
+            max_count = hist.max() if hist.size != 0 else 0
+        self.max_count      = np.int64(max_count)
+        self.hist           = _stored_array(
+            hist, dtype=Histogram.__count_dtype__(self.max_count)).reshape(
+            shape)
+        # the edges of the bins of the finest level, extended to cover all of
+        # hist_range
+        self.fine_bins      = np.linspace(
+            hist_range[0], hist_range[1],
+            int(hist_num_bins * zoom**(num_levels - 1)) + 1)
+
+    def level_range(self, level):
+        'Return the range of values covered by the given zoom level.'
+        center = self.hist_range.mean()
+        half_width = (self.hist_range[1] - self.hist_range[0]) / 2.
+        half_width /= self.zoom**level
+        return np.array([center - half_width, center + half_width])
+
+    def level_bins(self, level):
+        'Return the bin edges of the given zoom level.'
+        step = self.zoom**(self.num_levels - 1 - level)
+        return self.fine_bins[self.__level_offset__(level)::step][
+            :self.hist_num_bins + 1]
+
+    def __level_offset__(self, level):
+        """
+        Return the index, in bins of the finest level, of the first bin of the
+        given level.
+        """
+        num_fine = len(self.fine_bins) - 1
+        return (num_fine - num_fine // self.zoom**level) // 2
+
+    def get_level(self, level):
+        """
+        Return the full (hist_num_bins, bitrate) histogram of the given zoom
+        level, i.e. the counts of the level itself plus those of all finer
+        levels, which are summed in groups of zoom bins to match its bins.
+        """
+        ans = self.hist[level].astype(np.int64)
+        if level < self.num_levels - 1:
+            finer = self.get_level(level + 1)
+            num_bins = int(self.hist_num_bins // self.zoom)
+            start = (int(self.hist_num_bins) - num_bins) // 2
+            ans[start:start+num_bins] += finer.reshape(
+                (num_bins, int(self.zoom), int(self.bitrate))).sum(1)
+        return ans
+
+    def to_histograms(self):
+        'Return a list of one Histogram per zoom level.'
+        return [Histogram(
+            hist            = self.get_level(level),
+            hist_range      = self.level_range(level),
+            hist_num_bins   = self.hist_num_bins,
+            bitrate         = self.bitrate,
+            max_count       = self.max_count)
+            for level in range(int(self.num_levels))]
+
+    def __add_counts__(self, values):
+        """
+        Add the samples in values, an array of shape (num_sec, bitrate), to
+        the finest level containing each of them, in place. The index of
+        each sample's bin on a grid as fine as the finest level but covering
+        all of hist_range is computed once; its level and its bin within that
+        level follow from it with integer arithmetic, and all of the samples
+        are then added to hist in a single np.add.at.
+        """
+        values = np.asarray(values, dtype=np.float64).reshape(
+            (-1, self.bitrate))
+        self.__copy_on_write__()
+        fine, inside = _uniform_bin_indices(values, self.fine_bins)
+        fine = fine[inside]
+        columns = np.broadcast_to(np.arange(self.bitrate), values.shape)[
+            inside]
+        num_levels = int(self.num_levels)
+        offsets = np.array([self.__level_offset__(level)
+                            for level in range(num_levels)])
+        steps = self.zoom**np.arange(num_levels - 1, -1, -1)
+        # nested levels: the finest level containing a sample is one less
+        # than the number of levels containing it
+        level = np.zeros(fine.shape, dtype=np.intp)
+        for i in range(1, num_levels):
+            level += ((fine >= offsets[i]) &
+                      (fine < len(self.fine_bins) - 1 - offsets[i]))
+        indices = (fine - offsets[level]) // steps[level]
+        indices += level * self.hist_num_bins
+        indices *= self.bitrate
+        indices += columns
+        self.max_count = np.int64(self.max_count + values.shape[0])
+        dtype = Histogram.__count_dtype__(self.max_count)
+        if self.hist.dtype != dtype:
+            self.hist = self.hist.astype(dtype, order='C')
+        np.add.at(self.hist.reshape(-1), indices, self.hist.dtype.type(1))
+
+    def from_timeseries(self, timeseries):
+        assert self.bitrate == timeseries.bitrate, \
+            'timeseries and histogram must have same bitrate'
+        ans = type(self)(
+            hist_range      = self.hist_range,
+            hist_num_bins   = self.hist_num_bins,
+            num_levels      = self.num_levels,
+            zoom            = self.zoom,
+            bitrate         = self.bitrate)
+        ans.__add_counts__(np.asarray(timeseries))
+        return ans
+
+    def accumulate(self, timeseries):
+        """
+        Add the samples in timeseries to this histogram in place and return
+        it.
+        """
+        assert self.bitrate == timeseries.bitrate, \
+            'timeseries and histogram must have same bitrate'
+        self.__add_counts__(np.asarray(timeseries))
+        return self
+
+    def __union__(self, other):
+        max_count = np.int64(self.max_count + other.max_count)
+        ans = self.__clone_with__(hist=np.add(
+            self.hist, other.hist, dtype=Histogram.__count_dtype__(max_count),
+            order='C'))
+        ans.max_count = max_count
+        return ans
+
+    @classmethod
+    def __union_all__(cls, instances):
+        """
+        Sum all of the histograms into a single output buffer.
+        """
+        first = instances[0]
+        for other in instances[1:]:
+            first.assert_unionable(other)
+        max_count = np.int64(sum([int(i.max_count) for i in instances]))
+        # the only copy made: the first histogram's counts, in the final type
+        hist = first.hist.astype(Histogram.__count_dtype__(max_count),
+                                 order='C')
+        for other in instances[1:]:
+            hist += other.hist
+        ans = first.__clone_with__(hist=hist)
+        ans.max_count = max_count
+        return ans
+
+    def __update_hdf5_group__(self, group):
+        """
+        Add this histogram's counts to the ones saved in an open HDF5 group
+        in place, one block of rows at a time.
+        """
+        max_count = np.int64(group['max_count'][()] + self.max_count)
+        self.__add_to_dataset__(group, 'hist', self.hist,
+                                Histogram.__count_dtype__(max_count))
+        self.__replace_dataset__(group, 'max_count', max_count)
+
+    def __assert_hdf5_unionable__(self, group):
+        'Check the bins of the saved histogram without reading its counts.'
+        self.__assert_hdf5_metadata__(
+            group, ('hist_range', 'hist_num_bins', 'num_levels', 'zoom',
+                    'bitrate'))
+
+    def __same_bins__(self, other):
+        return (np.array_equal(self.hist_range, other.hist_range) and
+                self.hist_num_bins == other.hist_num_bins and
+                self.num_levels == other.num_levels and
+                self.zoom == other.zoom)
+
+    def assert_unionable(self, other):
+        if not isinstance(self, type(other)):
+            raise ValueError('Type mismatch: cannot union ' +
+                             str(type(self)) + ' with ' + str(type(other)))
+        if not self.__same_bins__(other):
+            raise ValueError('Histograms have different bin edges')
+        if self.bitrate != other.bitrate:
+            raise ValueError('Histograms have different bitrates')
+        if self.__version__ != other.__version__:
+            raise ValueError('Histograms have different versions')
+        return True
+
+    def assert_self_consistent(self):
+        if self.__version__ != __version__:
+            raise ValueError(
+                'MultiResolutionHistogram version ' +
+                self.__version__ +
+                ' does not match lib version')
+        assert self.hist.shape == (self.num_levels, self.hist_num_bins,
+                                   self.bitrate), \
+            'hist should have shape (num_levels, hist_num_bins, bitrate)'
+        assert np.int64(
+            self.bitrate) == self.bitrate, 'bitrate must be an integer'
+        return True
+
+    @classmethod
+    def __from_dict__(cls, d):
+        return cls(
+            hist            = d['hist'],
+            hist_range      = d['hist_range'],
+            hist_num_bins   = d['hist_num_bins'],
+            num_levels      = d['num_levels'],
+            zoom            = d['zoom'],
+            bitrate         = d['bitrate'],
+            max_count       = d['max_count']
+        )
+
+    def __to_dict__(self):
+        return {
+            'hist': np.array(self.hist),
+            'hist_range': np.array(self.hist_range),
+            'hist_num_bins': self.hist_num_bins,
+            'num_levels': self.num_levels,
+            'zoom': self.zoom,
+            'bitrate': self.bitrate,
+            'max_count': np.int64(self.max_count)
+        }
+
+    def __eq__(self, other):
+        if not isinstance(self, type(other)) or not self.__same_bins__(other):
+            return False
+        if self.bitrate != other.bitrate:
+            return False
+        if self.__version__ != other.__version__:
+            return False
         return np.array_equal(self.hist, other.hist)
 
 # TODO: Make AbstractPlottable
@@ -174,39 +951,72 @@ class Statistics(AbstData):
     Includes methods for iteratively generating, amalgamating, and
     displaying statistics.
 
+    For each sample slot within a second, the mean (``avg``) and the sum of
+    squared deviations from the mean (``m2``) are stored rather than raw sums
+    of the samples and their squares, which lose all precision to
+    cancellation when the variance is small compared to the mean. Statistics
+    over disjoint datasets are merged with Chan et al.'s parallel formula,
+    which is exact in any order.
+
+    The maximum and minimum of each slot are stored along with the GPS time
+    of the second in which they occurred (``max_time`` and ``min_time``), so
+    that the frame containing an extreme value can be found without
+    rescanning the data. These times are NaN if they are unknown, e.g. for
+    empty statistics or for statistics made from a timeseries without time
+    intervals. Ties go to the earliest time.
+
     This class DOES NOT contain information about the time ranges
     included in the data; that information should go into some containing
     class. This class is intended as a diagnostic report primitive.
     """
 
     def __init__(self,
-                 sum             = None,
-                 sum_sq          = None,
+                 avg             = None,
+                 m2              = None,
                  max             = None,
                  min             = None,
+                 max_time        = None,
+                 min_time        = None,
                  num             = 0,
-                 bitrate         = __default_bitrate__):
+                 bitrate         = __default_bitrate__,
+                 sum             = None,
+                 sum_sq          = None):
         """
         All properties have default values corresponding to an empty statistics
         set; they can be individually overridden.
+
+        For backwards compatibility, raw sums of the samples and their squares
+        can be given as sum and sum_sq instead of avg and m2.
         """
-        # set values of sum, sum_sq, and the histograms, since these depend on
-        # bitrate and hist_num_bins and hence cannot be set above
-        if sum is None:
-            sum        = np.zeros(bitrate)
-        if sum_sq is None:
-            sum_sq     = np.zeros(bitrate)
+        if sum is not None or sum_sq is not None:
+            if avg is not None or m2 is not None:
+                raise ValueError('Provide either avg and m2 or sum and sum_sq')
+            avg, m2 = self.__moments_from_sums__(sum, sum_sq, num, bitrate)
+        # set values of avg, m2, max, and min, since these depend on bitrate
+        # and hence cannot be set above
+        if avg is None:
+            avg        = np.zeros(bitrate)
+        if m2 is None:
+            m2         = np.zeros(bitrate)
         if max is None:
             # lowest possible max, cannot survive
             max        = np.ones(bitrate) * np.finfo(np.float64).min
         if min is None:
             min        = np.ones(bitrate) * \
                 np.finfo(np.float64).max # same for min
+        if max_time is None:
+            max_time   = np.ones(bitrate) * np.nan
+        if min_time is None:
+            min_time   = np.ones(bitrate) * np.nan
 
-        self.sum        = np.array(sum, copy=True).reshape((bitrate,))
-        self.sum_sq     = np.array(sum_sq, copy=True).reshape((bitrate,))
+        self.avg        = np.array(avg, copy=True).reshape((bitrate,))
+        self.m2         = np.array(m2, copy=True).reshape((bitrate,))
         self.max        = np.array(max, copy=True).reshape((bitrate,))
         self.min        = np.array(min, copy=True).reshape((bitrate,))
+        self.max_time   = np.array(max_time, dtype=np.float64,
+                                   copy=True).reshape((bitrate,))
+        self.min_time   = np.array(min_time, dtype=np.float64,
+                                   copy=True).reshape((bitrate,))
         assert np.int64(
             num) == num, 'must provide an integer number of previous seconds'
         self.num        = np.int64(num)
@@ -215,29 +1025,115 @@ class Statistics(AbstData):
 
         self.assert_self_consistent()
 
+    @staticmethod
+    def __moments_from_sums__(sum, sum_sq, num, bitrate):
+        """
+        Convert raw sums of samples and of their squares, as stored by older
+        versions of this class, to means and sums of squared deviations.
+        """
+        sum = np.zeros(bitrate) if sum is None else np.asarray(sum)
+        sum_sq = np.zeros(bitrate) if sum_sq is None else np.asarray(sum_sq)
+        if num == 0:
+            return np.zeros(bitrate), np.zeros(bitrate)
+        avg = sum / num
+        return avg, np.maximum(sum_sq - sum * avg, 0)
+
+    @property
+    def sum(self):
+        'The sum of the samples in each slot.'
+        return self.avg * self.num
+
+    @property
+    def sum_sq(self):
+        'The sum of the squares of the samples in each slot.'
+        return self.m2 + self.avg * self.avg * self.num
+
+    def mean(self):
+        'Return the mean of the samples in each slot.'
+        return self.avg.copy()
+
+    def var(self, ddof=0):
+        """
+        Return the variance of the samples in each slot, normalized by
+        ``num - ddof`` like numpy.var.
+        """
+        return self.m2 / (self.num - ddof)
+
+    def std(self, ddof=0):
+        """
+        Return the standard deviation of the samples in each slot, normalized
+        by ``num - ddof`` like numpy.std.
+        """
+        return np.sqrt(self.var(ddof))
+
+    def __merge_moments__(self, num, avg, m2):
+        """
+        Merge the count, means and sums of squared deviations of another
+        dataset into these statistics in place, using Chan et al.'s parallel
+        update formula.
+        """
+        total = self.num + num
+        if num == 0:
+            return
+        self.__copy_on_write__()
+        delta = avg - self.avg
+        self.avg += delta * (float(num) / total)
+        self.m2 += m2 + delta * delta * (float(self.num) * num / total)
+        self.num = np.int64(total)
+
+    def __merge_extrema__(self, max, max_time, min, min_time):
+        """
+        Merge the maxima and minima of another dataset, along with the times
+        at which they occurred, into these statistics in place.
+        """
+        self.__copy_on_write__()
+        for ours, ours_time, theirs, theirs_time, better in (
+                (self.max, self.max_time, max, max_time, np.greater),
+                (self.min, self.min_time, min, min_time, np.less)):
+            tied = theirs == ours
+            ours_time[tied] = np.fmin(ours_time[tied], theirs_time[tied])
+            replace = better(theirs, ours)
+            ours_time[replace] = theirs_time[replace]
+            ours[replace] = theirs[replace]
+
     def __union__(self, other):
         """
         Take the union of these statistics, representing the same statistics
         taken on the union of the two statistics objects' respective datasets.
         """
         ans         = self.clone()
-        ans.sum     = self.sum      + other.sum
-        ans.sum_sq  = self.sum_sq   + other.sum_sq
-        ans.max     = self.max      + other.max
-        ans.min     = self.min      + other.min
-        ans.num     = self.num      + other.num
+        ans.__merge_moments__(other.num, other.avg, other.m2)
+        ans.__merge_extrema__(other.max, other.max_time,
+                              other.min, other.min_time)
         return ans
 
-    def __clone__(self):
-        self.assert_self_consistent()
-        return type(self)(
-            sum             = self.sum,
-            sum_sq          = self.sum_sq,
-            max             = self.max,
-            min             = self.min,
-            num             = self.num,
-            bitrate         = self.bitrate
-        )
+    @classmethod
+    def __union_all__(cls, instances):
+        """
+        Combine all of the statistics at once. The overall mean is the
+        count-weighted mean of the means, and the overall sum of squared
+        deviations is the sum of each instance's own plus its count times the
+        squared distance of its mean from the overall mean.
+        """
+        first = instances[0]
+        for other in instances[1:]:
+            first.assert_unionable(other)
+        ans = first.clone()
+        total = sum([int(i.num) for i in instances])
+        if total == 0:
+            return ans
+        ans.avg[:] = 0
+        for other in instances:
+            ans.avg += other.avg * (float(other.num) / total)
+        ans.m2[:] = 0
+        for other in instances:
+            delta = other.avg - ans.avg
+            ans.m2 += other.m2 + delta * delta * other.num
+        for other in instances[1:]:
+            ans.__merge_extrema__(other.max, other.max_time,
+                                  other.min, other.min_time)
+        ans.num = np.int64(total)
+        return ans
 
     def assert_unionable(self, other):
         if self.bitrate != other.bitrate:
@@ -250,14 +1146,17 @@ class Statistics(AbstData):
         return True
 
     def assert_self_consistent(self):
-        assert self.sum.shape == (self.bitrate,), \
-            "sum should be vector with length equal to bitrate"
-        assert self.sum_sq.shape == (self.bitrate,), \
-            "sum_sq should be vector with length equal to bitrate"
+        assert self.avg.shape == (self.bitrate,), \
+            "avg should be vector with length equal to bitrate"
+        assert self.m2.shape == (self.bitrate,), \
+            "m2 should be vector with length equal to bitrate"
         assert self.max.shape == (self.bitrate,), \
             "max should be vector with length equal to bitrate"
         assert self.min.shape == (self.bitrate,), \
             "min should be vector with length equal to bitrate"
+        assert self.max_time.shape == self.min_time.shape == (self.bitrate,), \
+            "max_time and min_time should be vectors with length equal to " \
+            "bitrate"
         assert np.int64(self.num) == self.num
         assert np.int64(self.bitrate) == self.bitrate, \
             "bitrate must be an integer"
@@ -266,30 +1165,44 @@ class Statistics(AbstData):
                 'Statistics version ' +
                 self.__version__ +
                 ' does not match lib version')
-        if not ((self.bitrate,) == self.sum.shape ==
-                self.sum_sq.shape == self.max.shape == self.min.shape):
+        if not ((self.bitrate,) == self.avg.shape ==
+                self.m2.shape == self.max.shape == self.min.shape):
             raise ValueError('Statistics fields must be 1-D with length equal '
                              'to bitrate')
         return True
 
     @classmethod
     def __from_dict__(cls, d):
+        # older files store raw sums under 'sum' and 'sum_sq'
+        if 'avg' not in d:
+            return cls(
+                sum     = d['sum'],
+                sum_sq  = d['sum_sq'],
+                max     = d['max'],
+                min     = d['min'],
+                num     = d['num'],
+                bitrate = d['bitrate']
+            )
         return cls(
-            sum     = d['sum'],
-            sum_sq  = d['sum_sq'],
-            max     = d['max'],
-            min     = d['min'],
-            num     = d['num'],
-            bitrate = d['bitrate']
+            avg         = d['avg'],
+            m2          = d['m2'],
+            max         = d['max'],
+            min         = d['min'],
+            max_time    = d.get('max_time'),
+            min_time    = d.get('min_time'),
+            num         = d['num'],
+            bitrate     = d['bitrate']
         )
 
     def __to_dict__(self):
         assert self.num == np.int64(self.num)
         return {
-            'sum':      np.array(self.sum).flatten(),
-            'sum_sq':   np.array(self.sum_sq).flatten(),
+            'avg':      np.array(self.avg).flatten(),
+            'm2':       np.array(self.m2).flatten(),
             'max':      np.array(self.max).flatten(),
             'min':      np.array(self.min).flatten(),
+            'max_time': np.array(self.max_time).flatten(),
+            'min_time': np.array(self.min_time).flatten(),
             'num':      np.int64(self.num),
             'bitrate':  np.int64(self.bitrate),
             'version':  self.__version__,
@@ -298,13 +1211,63 @@ class Statistics(AbstData):
 
     def from_timeseries(self, timeseries):
         self_type = type(self)
+        values = np.asarray(timeseries)
+        avg, m2 = self.__moments__(values)
+        max, max_time, min, min_time = self.__extrema__(
+            values, getattr(timeseries, 'time_intervals', None))
         return self_type(
-            sum     = timeseries.sum(0),
-            sum_sq  = np.power(timeseries, 2).sum(0),
-            max     = np.max(timeseries, 0),
-            min     = np.min(timeseries, 0),
-            num     = timeseries.shape[0],
-            bitrate = timeseries.bitrate)
+            avg         = avg,
+            m2          = m2,
+            max         = max,
+            min         = min,
+            max_time    = max_time,
+            min_time    = min_time,
+            num         = timeseries.shape[0],
+            bitrate     = timeseries.bitrate)
+
+    @staticmethod
+    def __extrema__(values, time_intervals=None):
+        """
+        Return the maximum and minimum of each column of values, along with
+        the GPS times of the seconds (rows) in which they first occur. Rows
+        are mapped to GPS times using time_intervals; without them, the times
+        are NaN.
+        """
+        columns = np.arange(values.shape[1])
+        extrema = []
+        for arg in np.argmax, np.argmin:
+            rows = arg(values, 0)
+            if time_intervals is None or len(values) == 0:
+                times = np.ones(values.shape[1]) * np.nan
+            else:
+                times = time_intervals.times_at_offsets(rows)
+            extrema += [values[rows, columns], times]
+        return extrema
+
+    @staticmethod
+    def __moments__(values):
+        """
+        Return the mean and the sum of squared deviations from the mean of
+        each column of values, computed in two passes.
+        """
+        avg = values.mean(0)
+        deviations = values - avg
+        return avg, np.einsum('ij,ij->j', deviations, deviations)
+
+    def accumulate(self, timeseries):
+        """
+        Fold the samples in timeseries into these statistics in place and
+        return them.
+        """
+        assert self.bitrate == timeseries.bitrate, \
+            'timeseries and statistics must have same bitrate'
+        values = np.asarray(timeseries).reshape((-1, self.bitrate))
+        avg, m2 = self.__moments__(values)
+        self.__merge_moments__(values.shape[0], avg, m2)
+        if len(values) != 0:
+            self.__merge_extrema__(*self.__extrema__(
+                values, getattr(timeseries, 'time_intervals', None)))
+        return self
 
     def __eq__(self, other):
         if self.bitrate != other.bitrate:
@@ -314,15 +1277,322 @@ class Statistics(AbstData):
         if not isinstance(self, type(other)):
             return False
         return (
-            np.array_equal(self.sum,    other.sum)      and
-            np.array_equal(self.sum_sq, other.sum_sq)   and
+            np.array_equal(self.avg,    other.avg)      and
+            np.array_equal(self.m2,     other.m2)       and
             np.array_equal(self.max,    other.max)      and
             np.array_equal(self.min,    other.min)      and
+            _nan_equal(self.max_time, other.max_time)       and
+            _nan_equal(self.min_time, other.min_time)       and
             np.array_equal(self.num,    other.num)
         )
 
+class QuantileSketch(AbstData):
+    """
+    A mergeable sketch of the distribution of each sample slot within a
+    second, from which quantiles (e.g. the median or the 99.9th percentile)
+    can be estimated to within a fixed relative accuracy, in the manner of
+    DDSketch (Masson, Rim & Lee, 2019).
+
+    Each slot's samples are counted in logarithmically spaced buckets: a
+    sample x with min_value < abs(x) is put in bucket
+    ``ceil(log(abs(x) / min_value) / log(gamma))`` of its sign, where
+    ``gamma = (1 + relative_accuracy) / (1 - relative_accuracy)``, and is
+    estimated by a value within relative_accuracy of it. Samples with
+    abs(x) <= min_value all go in a single bucket estimated as zero, and
+    samples beyond the last of the num_buckets buckets of each sign are
+    counted in that last bucket. The counts of all slots are stored together
+    in ``counts``, an array of shape (2 * num_buckets + 1, bitrate) ordered
+    from the most negative bucket to the most positive, in the narrowest
+    integer type that can hold max_count, like the counts of a Histogram.
+    Memory use therefore does not depend on how much data has been folded
+    in.
+
+    The exact maximum and minimum of each slot are kept as well, and
+    quantile estimates are clipped to them. NaNs are ignored.
+    """
+
+    def __init__(self,
+                 counts              = None,
+                 max                 = None,
+                 min                 = None,
+                 relative_accuracy   = 0.02,
+                 min_value           = 1e-3,
+                 num_buckets         = 512,
+                 bitrate             = __default_bitrate__,
+                 max_count           = None):
+        """
+        Initialize an instance of the class. All properties have default
+        values corresponding to an empty sketch; they can be individually
+        overridden. max_count defaults to the largest count in counts.
+        """
+        if not 0 < relative_accuracy < 1:
+            raise ValueError('relative_accuracy must be between 0 and 1')
+        if not min_value > 0:
+            raise ValueError('min_value must be positive')
+        assert np.int64(num_buckets) == num_buckets and num_buckets >= 1, \
+            'num_buckets must be a positive integer'
+        assert np.int64(bitrate) == bitrate, 'bitrate must be an integer'
+        self.relative_accuracy  = np.float64(relative_accuracy)
+        self.min_value          = np.float64(min_value)
+        self.num_buckets        = np.int64(num_buckets)
+        self.bitrate            = np.int64(bitrate)
+        if counts is None:
+            counts = np.zeros(self.shape, dtype=np.uint8)
+        counts = np.asarray(counts)
+        if max_count is None:
+            max_count = counts.max() if counts.size != 0 else 0
+        self.max_count          = np.int64(max_count)
+        self.counts             = _stored_array(
+            counts, dtype=Histogram.__count_dtype__(self.max_count)).reshape(
+            self.shape)
+        if max is None:
+            max = np.ones(bitrate) * np.nan
+        if min is None:
+            min = np.ones(bitrate) * np.nan
+        self.max                = np.array(max, dtype=np.float64,
+                                           copy=True).reshape((bitrate,))
+        self.min                = np.array(min, dtype=np.float64,
+                                           copy=True).reshape((bitrate,))
+
+    @property
+    def shape(self):
+        'The shape of the counts array, (2 * num_buckets + 1, bitrate).'
+        return (2 * int(self.num_buckets) + 1, int(self.bitrate))
+
+    @property
+    def gamma(self):
+        'The ratio of the upper to the lower bound of each bucket.'
+        return ((1 + self.relative_accuracy) /
+                (1 - self.relative_accuracy))
+
+    @property
+    def num(self):
+        'The number of (non-NaN) samples in each slot.'
+        return self.counts.sum(0, dtype=np.int64)
+
+    def bucket_values(self):
+        """
+        Return the value used to estimate the samples in each bucket (i.e.
+        each row of counts).
+        """
+        keys = np.arange(1, self.num_buckets + 1)
+        positive = (self.min_value * 2 * self.gamma**keys /
+                    (self.gamma + 1))
+        return np.concatenate((-positive[::-1], [0.], positive))
+
+    def __bucket_indices__(self, values):
+        """
+        Return the row of counts that each of the values belongs in, along
+        with a boolean array that is False wherever a value is NaN.
+        """
+        counted = ~np.isnan(values)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            keys = np.ceil(np.log(np.abs(values) / self.min_value) /
+                           np.log(self.gamma))
+        keys[~counted] = 0
+        keys = np.clip(keys, 0, self.num_buckets).astype(np.intp)
+        keys[values < 0] *= -1
+        keys += self.num_buckets
+        return keys, counted
+
+    def __add_counts__(self, values):
+        """
+        Add the samples in values, an array of shape (num_sec, bitrate), to
+        the counts and extrema in place.
+        """
+        values = np.asarray(values, dtype=np.float64).reshape(
+            (-1, self.bitrate))
+        if len(values) == 0:
+            return
+        self.__copy_on_write__()
+        rows, counted = self.__bucket_indices__(values)
+        indices = rows * self.bitrate
+        indices += np.arange(self.bitrate)
+        self.max_count = np.int64(self.max_count + values.shape[0])
+        dtype = Histogram.__count_dtype__(self.max_count)
+        if self.counts.dtype != dtype:
+            self.counts = self.counts.astype(dtype, order='C')
+        np.add.at(self.counts.reshape(-1), indices[counted],
+                  self.counts.dtype.type(1))
+        # fmax and fmin ignore NaNs
+        self.max = np.fmax(self.max, np.fmax.reduce(values, 0))
+        self.min = np.fmin(self.min, np.fmin.reduce(values, 0))
+
+    def quantile(self, q):
+        """
+        Estimate the q-th quantile (0 <= q <= 1) of the samples in each slot.
+        Returns an array of length bitrate, or of shape (len(q), bitrate) if
+        q is a sequence; slots without any samples give NaN.
+        """
+        q = np.asarray(q, dtype=np.float64)
+        if np.any((q < 0) | (q > 1)):
+            raise ValueError('Quantiles must be between 0 and 1')
+        cumulative = np.cumsum(self.counts, 0, dtype=np.int64)
+        num = cumulative[-1]
+        values = self.bucket_values()
+        ans = []
+        for quantile in q.reshape(-1):
+            rank = quantile * (num - 1)
+            # the first bucket whose cumulative count exceeds the rank
+            rows = np.minimum((cumulative <= rank).sum(0), len(values) - 1)
+            ans.append(np.clip(values[rows], self.min, self.max))
+        ans = np.array(ans).reshape(q.shape + (int(self.bitrate),))
+        ans[..., num == 0] = np.nan
+        return ans
+
+    def median(self):
+        'Estimate the median of the samples in each slot.'
+        return self.quantile(0.5)
+
+    def from_timeseries(self, timeseries):
+        assert self.bitrate == timeseries.bitrate, \
+            'timeseries and sketch must have same bitrate'
+        ans = type(self)(
+            relative_accuracy   = self.relative_accuracy,
+            min_value           = self.min_value,
+            num_buckets         = self.num_buckets,
+            bitrate             = self.bitrate)
+        ans.__add_counts__(np.asarray(timeseries))
+        return ans
+
+    def accumulate(self, timeseries):
+        """
+        Add the samples in timeseries to this sketch in place and return it.
+        """
+        assert self.bitrate == timeseries.bitrate, \
+            'timeseries and sketch must have same bitrate'
+        self.__add_counts__(np.asarray(timeseries))
+        return self
+
+    def __union__(self, other):
+        """
+        Take the union of these sketches, representing the sketch of the
+        union of the two sketches' respective datasets.
+        """
+        max_count = np.int64(self.max_count + other.max_count)
+        ans = self.__clone_with__(
+            counts  = np.add(self.counts, other.counts,
+                             dtype=Histogram.__count_dtype__(max_count),
+                             order='C'),
+            max     = np.fmax(self.max, other.max),
+            min     = np.fmin(self.min, other.min))
+        ans.max_count = max_count
+        return ans
+
+    @classmethod
+    def __union_all__(cls, instances):
+        """
+        Sum all of the sketches into a single output buffer.
+        """
+        first = instances[0]
+        for other in instances[1:]:
+            first.assert_unionable(other)
+        max_count = np.int64(sum([int(i.max_count) for i in instances]))
+        # the only copies made: the first sketch's arrays, counts in the
+        # final type
+        counts = first.counts.astype(Histogram.__count_dtype__(max_count),
+                                     order='C')
+        maxima, minima = np.array(first.max), np.array(first.min)
+        for other in instances[1:]:
+            counts += other.counts
+            np.fmax(maxima, other.max, out=maxima)
+            np.fmin(minima, other.min, out=minima)
+        ans = first.__clone_with__(counts=counts, max=maxima, min=minima)
+        ans.max_count = max_count
+        return ans
+
+    def __update_hdf5_group__(self, group):
+        """
+        Add this sketch's counts to the ones saved in an open HDF5 group in
+        place, one block of rows at a time.
+        """
+        max_count = np.int64(group['max_count'][()] + self.max_count)
+        self.__add_to_dataset__(group, 'counts', self.counts,
+                                Histogram.__count_dtype__(max_count))
+        self.__replace_dataset__(group, 'max',
+                                 np.fmax(group['max'][()], self.max))
+        self.__replace_dataset__(group, 'min',
+                                 np.fmin(group['min'][()], self.min))
+        self.__replace_dataset__(group, 'max_count', max_count)
+
+    def __assert_hdf5_unionable__(self, group):
+        'Check the buckets of the saved sketch without reading its counts.'
+        self.__assert_hdf5_metadata__(
+            group, ('relative_accuracy', 'min_value', 'num_buckets',
+                    'bitrate'))
+
+    def __same_buckets__(self, other):
+        return (self.relative_accuracy == other.relative_accuracy and
+                self.min_value == other.min_value and
+                self.num_buckets == other.num_buckets)
+
+    def assert_unionable(self, other):
+        if not isinstance(self, type(other)):
+            raise ValueError('Type mismatch: cannot union ' +
+                             str(type(self)) + ' with ' + str(type(other)))
+        if not self.__same_buckets__(other):
+            raise ValueError('Quantile sketches have different buckets')
+        if self.bitrate != other.bitrate:
+            raise ValueError('Quantile sketches have different bitrates')
+        if self.__version__ != other.__version__:
+            raise ValueError('Quantile sketches have different versions')
+        return True
+
+    def assert_self_consistent(self):
+        if self.__version__ != __version__:
+            raise ValueError(
+                'QuantileSketch version ' +
+                self.__version__ +
+                ' does not match lib version')
+        assert self.counts.shape == self.shape, \
+            'counts should have shape (2 * num_buckets + 1, bitrate)'
+        assert self.max.shape == self.min.shape == (self.bitrate,), \
+            'max and min should be vectors with length equal to bitrate'
+        assert np.int64(
+            self.bitrate) == self.bitrate, 'bitrate must be an integer'
+        return True
+
+    @classmethod
+    def __from_dict__(cls, d):
+        return cls(
+            counts              = d['counts'],
+            max                 = d['max'],
+            min                 = d['min'],
+            relative_accuracy   = d['relative_accuracy'],
+            min_value           = d['min_value'],
+            num_buckets         = d['num_buckets'],
+            bitrate             = d['bitrate'],
+            max_count           = d['max_count']
+        )
+
+    def __to_dict__(self):
+        return {
+            'counts': np.array(self.counts),
+            'max': np.array(self.max),
+            'min': np.array(self.min),
+            'relative_accuracy': np.float64(self.relative_accuracy),
+            'min_value': np.float64(self.min_value),
+            'num_buckets': np.int64(self.num_buckets),
+            'bitrate': np.int64(self.bitrate),
+            'max_count': np.int64(self.max_count)
+        }
+
+    def __eq__(self, other):
+        if not isinstance(self, type(other)):
+            return False
+        if not self.__same_buckets__(other) or self.bitrate != other.bitrate:
+            return False
+        if self.__version__ != other.__version__:
+            return False
+        return (np.array_equal(self.counts, other.counts) and
+                _nan_equal(self.max, other.max) and
+                _nan_equal(self.min, other.min))
+
 # TODO: Add a ReportData wrapper for slow channel timeseries, complete with
 # plotting
 
 Factory.add_class(Histogram)
+Factory.add_class(SparseHistogram)
+Factory.add_class(MultiResolutionHistogram)
 Factory.add_class(Statistics)
+Factory.add_class(QuantileSketch)
@@ -0,0 +1,536 @@
+# -*- coding: utf-8 -*-
+
+import os
+import re
+import abc
+import subprocess
+import numpy as np      # >=1.10.4
+from geco_stat.Exceptions import MissingChannelDataException
+
+# The binary reader needs the python bindings that ship with LDAS tools. They
+# are only available in LIGO production environments, so fall back to the
+# framecpp_dump_channel subprocess reader when they are missing.
+try:
+    from LDAStools import frameCPP
+except ImportError:
+    frameCPP = None
+
+
+class AbstFrameReader(object):
+    """
+    The AbstFrameReader defines a backend for pulling the data for a single
+    channel out of a gravitational wave frame file. Backends differ only in
+    how they get at the data; all of them return a flat numpy.ndarray
+    containing every sample of the channel stored in the frame file, in
+    chronological order.
+
+    Backends are selected by name using ``get_frame_reader``, which falls
+    back to the first available backend when no name is given.
+    """
+    __metaclass__  = abc.ABCMeta
+
+    # the name used to request this backend with ``get_frame_reader``
+    name = None
+
+    @staticmethod
+    @abc.abstractmethod
+    def is_available():
+        """
+        Return True if the tools this backend relies on can be used in the
+        current environment.
+        """
+
+    @abc.abstractmethod
+    def read_channel(self, channel_name, path, out=None):
+        """
+        Read every sample of ``channel_name`` from the frame file at ``path``
+        and return it as a flat numpy.ndarray. If ``out`` is provided, it must
+        be an ndarray with exactly as many elements as there are samples in
+        the frame file; the samples are written into it and it is returned,
+        so that no intermediate copy of the data needs to be allocated.
+
+        Raises a MissingChannelDataException if the channel cannot be found
+        in the frame file.
+        """
+
+    @staticmethod
+    def __check_path__(path):
+        """Make sure the frame file exists before trying to read it."""
+        if not os.path.exists(path):
+            raise ValueError('Path does not exist: ' + path)
+
+    @staticmethod
+    def __fill__(out, arrays):
+        """
+        Copy a list of arrays end to end into ``out``, allocating ``out`` if
+        it is None. Returns the filled array.
+        """
+        length = sum([len(a) for a in arrays])
+        if out is None:
+            out = np.empty(length, dtype=np.float64)
+        flat = out.reshape(-1)
+        if len(flat) != length:
+            raise ValueError('output buffer has %d elements, but the frame '
+                             'file contains %d samples' % (len(flat), length))
+        i = 0
+        for a in arrays:
+            flat[i:i+len(a)] = a
+            i += len(a)
+        return out
+
+
+class FrameCppReader(AbstFrameReader):
+    """
+    Read channels directly out of frame files using the frameCPP python
+    bindings. The channel's data vector is decoded (and decompressed, if
+    necessary) by frameCPP itself and handed over as a numpy array, so the
+    data never has to take a detour through a text representation.
+    """
+
+    name = 'framecpp'
+
+    # frame data structures in which a channel might be stored, in the order
+    # in which they should be searched, as (table of contents name, frdata
+    # name) pairs
+    _frdata_types = (('ADC', 'Adc'), ('Proc', 'Proc'), ('Sim', 'Sim'))
+
+    @staticmethod
+    def is_available():
+        return frameCPP is not None
+
+    def read_channel(self, channel_name, path, out=None):
+        self.__check_path__(path)
+        stream = frameCPP.IFrameFStream(path)
+        toc = stream.GetTOC()
+        read_frdata = self.__frdata_reader__(stream, toc, channel_name)
+        # a single frame file can contain several frames; keep references to
+        # the frdata structures until copying is done, since the arrays they
+        # return are views into memory owned by frameCPP.
+        frdata = [read_frdata(i, channel_name)
+                  for i in range(len(toc.GetGTimeS()))]
+        arrays = []
+        for data in frdata:
+            for vect in data.data:
+                arrays.append(vect.GetDataArray())
+        return self.__fill__(out, arrays)
+
+    @classmethod
+    def __frdata_reader__(cls, stream, toc, channel_name):
+        """
+        Find out which type of frame data structure holds this channel and
+        return the stream method used to read it.
+        """
+        for toc_type, frdata_type in cls._frdata_types:
+            if channel_name in getattr(toc, 'Get' + toc_type)():
+                return getattr(stream, 'ReadFr%sData' % frdata_type)
+        raise MissingChannelDataException()
+
+
+class FrameCppDumpReader(AbstFrameReader):
+    """
+    Read channels from frame files by parsing the text output of the
+    ``framecpp_dump_channel`` command line tool. This is slow, since every
+    sample is printed to and parsed from a string, but it only needs
+    ``framecpp_dump_channel`` to be installed.
+
+    By default, the output of ``framecpp_dump_channel`` is parsed as it comes
+    out of the pipe, ``chunk_size`` bytes at a time, and written straight
+    into the output array. This keeps memory usage down to the output array
+    plus one chunk of text, and lets parsing proceed while the subprocess is
+    still writing. Set ``streaming=False`` to read the whole dump into memory
+    before parsing it instead.
+    """
+
+    name = 'framecpp_dump_channel'
+
+    # number of header lines preceding the data in framecpp_dump_channel output
+    _num_header_lines = 6
+
+    def __init__(self, streaming=True, chunk_size=2**20):
+        self.streaming  = streaming
+        self.chunk_size = int(chunk_size)
+
+    @staticmethod
+    def is_available():
+        for directory in os.environ.get('PATH', '').split(os.pathsep):
+            if os.access(os.path.join(directory, 'framecpp_dump_channel'),
+                         os.X_OK):
+                return True
+        return False
+
+    def read_channel(self, channel_name, path, out=None):
+        self.__check_path__(path)
+
+        # set up the processes for acquiring and processing the data
+        command = ["framecpp_dump_channel","--channel",channel_name,path]
+        dump = subprocess.Popen(command, stdout=subprocess.PIPE)
+        if self.streaming:
+            try:
+                ans = self.__parse_stream__(dump.stdout, out,
+                                            self.chunk_size)
+            except BaseException:
+                # don't leave the subprocess hanging if parsing failed
+                if dump.poll() is None:
+                    dump.kill()
+                dump.stdout.close()
+                dump.wait()
+                raise
+            dump.stdout.close()
+            self.__check_exit_status__(dump, command)
+            return ans
+        data_string = dump.communicate()[0]
+
+        # remove headers from the data
+        formatted_data_string = self.__remove_header_and_text__(data_string)
+
+        # if the string is empty, the channel didn't exist.
+        if not formatted_data_string:
+            raise MissingChannelDataException()
+        self.__check_exit_status__(dump, command)
+
+        return self.__fill__(out, [np.fromstring(formatted_data_string,
+                                                 sep=',')])
+
+    @staticmethod
+    def __check_exit_status__(dump, command):
+        """
+        Wait for the framecpp_dump_channel process to finish and make sure
+        that it succeeded, since output that parsed fine may still have been
+        cut short by an error.
+        """
+        if dump.wait() != 0:
+            raise subprocess.CalledProcessError(dump.returncode, command)
+
+    @classmethod
+    def __parse_stream__(cls, stream, out=None, chunk_size=2**20):
+        """
+        Parse framecpp_dump_channel output from a file-like ``stream`` one
+        chunk at a time. Each chunk is cut after its last comma; the complete
+        numbers before the cut are parsed and written into ``out`` and the
+        partial number after it is carried over to the next chunk. If ``out``
+        is None, the parsed chunks are collected and copied into a new array
+        at the end.
+        """
+        for i in range(cls._num_header_lines):
+            if not stream.readline():
+                raise MissingChannelDataException()
+        flat = None if out is None else out.reshape(-1)
+        parsed = []
+        i = 0
+        tail = b''
+        while True:
+            chunk = stream.read(chunk_size)
+            text = tail + chunk
+            if chunk:
+                cut = text.rfind(b',') + 1
+                text, tail = text[:cut], text[cut:]
+            text = text.translate(None, b'Dat: ').strip().rstrip(b',')
+            if text:
+                values = np.fromstring(text, sep=',')
+                if flat is None:
+                    parsed.append(values)
+                elif i + len(values) > len(flat):
+                    raise ValueError('output buffer has %d elements, but the '
+                                     'frame file contains more samples'
+                                     % len(flat))
+                else:
+                    flat[i:i+len(values)] = values
+                i += len(values)
+            if not chunk:
+                break
+        if i == 0:
+            raise MissingChannelDataException()
+        if flat is None:
+            return cls.__fill__(None, parsed)
+        if i != len(flat):
+            raise ValueError('output buffer has %d elements, but the frame '
+                             'file contains %d samples' % (len(flat), i))
+        return out
+
+    @staticmethod
+    def __remove_lines__(string, num_lines):
+        """
+        remove first n lines of a string
+        """
+        i = 0
+        n = 0
+        l = len(string)
+        while n < num_lines:
+            i = string.find(b'\n', i+1)
+            # if a newline isn't found, this means there are no new lines left.
+            if i == -1:
+                return b""
+            # if the string ends on a newline, return empty string.
+            elif i+1 == l:
+                return b""
+            n += 1
+        return string[i+1:]
+
+    @classmethod
+    def __remove_header_and_text__(cls, string):
+        """
+        Delete first 6 lines; all spaces; and the word 'Data:' which precedes
+        the numerical data.
+
+        (This replaces sed and tr in the original implementation with native
+        python.)
+        """
+        return cls.__remove_lines__(string, 6).translate(None,
+                                                         b'Dat: ').strip()
+
+
+# Backends in order of preference.
+__frame_readers__ = [FrameCppReader, FrameCppDumpReader]
+
+
+def get_frame_reader(name=None):
+    """
+    Return an instance of the frame reader backend with the given name. If
+    no name is given, return the fastest backend available in this
+    environment. Available backend names are:
+
+    - ``'framecpp'``: decode the binary frame data with frameCPP
+    - ``'framecpp_dump_channel'``: parse the text output of the
+      ``framecpp_dump_channel`` command line tool
+    """
+    for reader in __frame_readers__:
+        if name is None and reader.is_available() or reader.name == name:
+            return reader()
+    if name is None:
+        raise Exception('No frame reader backend is available. Install the '
+                        'frameCPP python bindings or framecpp_dump_channel.')
+    raise ValueError('Unknown frame reader: %s' % name)
+
+
+class FramePathCache(object):
+    """
+    A persistent, on-disk index mapping frame file GPS start times to frame
+    file paths. There is one index file per observatory and frame type, kept
+    in ``cache_dir`` (``~/.geco_stat/frame_cache`` by default), with one
+    ``<gps_start> <path>`` pair per line.
+
+    Entries can be dropped with ``invalidate``, e.g. after frame files have
+    been moved around.
+    """
+
+    def __init__(self, cache_dir=None):
+        if cache_dir is None:
+            cache_dir = os.path.join(os.path.expanduser('~'), '.geco_stat',
+                                     'frame_cache')
+        self.cache_dir = cache_dir
+
+    def index_path(self, observatory, frame_type):
+        """Get the path of the index file for this observatory/frame type."""
+        return os.path.join(self.cache_dir,
+                            '%s-%s.txt' % (observatory, frame_type))
+
+    def load(self, observatory, frame_type):
+        """
+        Return the cached index for this observatory and frame type as a dict
+        mapping integer GPS start times to paths. Returns an empty dict if
+        nothing has been cached yet.
+        """
+        index = dict()
+        path = self.index_path(observatory, frame_type)
+        if not os.path.exists(path):
+            return index
+        with open(path) as cachefile:
+            for line in cachefile:
+                gps_start, frame_path = line.rstrip('\n').split(' ', 1)
+                index[int(gps_start)] = frame_path
+        return index
+
+    def update(self, observatory, frame_type, index):
+        """
+        Add the entries in ``index`` (GPS start time -> path) to the cached
+        index for this observatory and frame type. The index file is replaced
+        atomically, so a crash can't leave a corrupted cache behind.
+        """
+        merged = self.load(observatory, frame_type)
+        merged.update(index)
+        if not os.path.isdir(self.cache_dir):
+            os.makedirs(self.cache_dir)
+        path = self.index_path(observatory, frame_type)
+        with open(path + '.tmp', 'w') as cachefile:
+            for gps_start in sorted(merged):
+                cachefile.write('%d %s\n' % (gps_start, merged[gps_start]))
+        os.rename(path + '.tmp', path)
+
+    def invalidate(self, observatory=None, frame_type=None):
+        """
+        Delete cached indices. With no arguments, the whole cache is cleared;
+        otherwise, only the indices matching the given observatory and/or
+        frame type are deleted.
+        """
+        if not os.path.isdir(self.cache_dir):
+            return
+        for filename in os.listdir(self.cache_dir):
+            if not filename.endswith('.txt'):
+                continue
+            obs, ftype = filename[:-len('.txt')].split('-', 1)
+            if observatory not in (None, obs):
+                continue
+            if frame_type not in (None, ftype):
+                continue
+            os.remove(os.path.join(self.cache_dir, filename))
+
+
+# frame file names look like <observatory>-<frame type>-<gps start>-<length>.gwf
+_frame_file_name = re.compile(r'^([A-Z]+)-([^-]+)-(\d+)-(\d+)\.gwf$')
+
+
+class AbstFrameLocator(object):
+    """
+    The AbstFrameLocator defines how the frame files covering a
+    TimeIntervalSet are found. All of the frame files needed for a
+    TimeIntervalSet are looked up in one batch by ``locate_frame_files``,
+    which returns an index mapping the GPS start time of each frame file to
+    its path. If a FramePathCache is provided, frame files that have already
+    been located are looked up in the cache instead.
+
+    Subclasses only need to implement ``__find_frame_files__``.
+    """
+    __metaclass__  = abc.ABCMeta
+
+    # length of a single frame file in seconds
+    frame_length = 64
+
+    def __init__(self, cache=None, frame_type=None):
+        self.cache      = cache
+        self.frame_type = frame_type
+
+    @abc.abstractmethod
+    def __find_frame_files__(self, observatory, frame_type, start, end):
+        """
+        Return a dict mapping the GPS start times of all frame files for this
+        observatory and frame type which start in [start, end) to their paths.
+        """
+
+    def get_observatory_and_frame_type(self, channel_name):
+        """
+        Get the observatory and frame type where channel_name is stored. The
+        frame type defaults to raw data, e.g. ``H1_R`` for ``H1:...``.
+        """
+        if not isinstance(channel_name, str):
+            raise ValueError('channel_name must be a string')
+        observatory = channel_name[0]
+        frame_type = self.frame_type
+        if frame_type is None:
+            frame_type = observatory + '1_R'
+        return observatory, frame_type
+
+    def frame_start_times(self, time_intervals):
+        """
+        Return a sorted array of GPS start times of the frame files that
+        cover time_intervals.
+        """
+        bounds = time_intervals.round_to_frame_times().to_ndarray()
+        starts = [np.arange(bounds[2*i], bounds[2*i+1], self.frame_length)
+                  for i in range(0, len(bounds)//2)]
+        if len(starts) == 0:
+            return np.array([], dtype=np.int64)
+        return np.concatenate(starts).astype(np.int64)
+
+    def locate_frame_files(self, channel_name, time_intervals):
+        """
+        Find the frame files containing channel_name that cover
+        time_intervals. Returns a dict mapping the (integer) GPS start time of
+        each frame file to its path. Frame files which can't be found are
+        left out of the returned dict.
+        """
+        observatory, frame_type = self.get_observatory_and_frame_type(
+            channel_name)
+        starts = self.frame_start_times(time_intervals)
+        if self.cache is None:
+            index = dict()
+        else:
+            index = self.cache.load(observatory, frame_type)
+        missing = [s for s in starts
+                   if s not in index or not os.path.exists(index[s])]
+        if missing:
+            found = self.__find_frame_files__(
+                observatory, frame_type, missing[0],
+                missing[-1] + self.frame_length)
+            index.update(found)
+            if self.cache is not None and found:
+                self.cache.update(observatory, frame_type, found)
+        ans = dict()
+        for s in starts:
+            if int(s) in index:
+                ans[int(s)] = index[int(s)]
+        return ans
+
+    @staticmethod
+    def __parse_frame_file_name__(path):
+        """
+        Split a frame file path of the form
+        ``.../<observatory>-<frame type>-<gps start>-<length>.gwf``
+        into its components. Returns None if the path doesn't follow this
+        naming convention.
+        """
+        match = _frame_file_name.match(os.path.basename(path))
+        if match is None:
+            return None
+        return (match.group(1), match.group(2), int(match.group(3)),
+                int(match.group(4)))
+
+
+class GWDataFindLocator(AbstFrameLocator):
+    """
+    Locate frame files with ``gw_data_find``. All frame files needed are
+    requested in a single query, and the results are cached on disk (in the
+    default FramePathCache unless another cache is given), so each frame file
+    only ever has to be looked up once.
+    """
+
+    def __init__(self, cache=None, frame_type=None):
+        if cache is None:
+            cache = FramePathCache()
+        super(GWDataFindLocator, self).__init__(cache, frame_type)
+
+    def __find_frame_files__(self, observatory, frame_type, start, end):
+        dump = subprocess.Popen([
+            'gw_data_find',
+            '-o', observatory,
+            '-t', frame_type,
+            '-s', str(int(start)),
+            '-e', str(int(end)),
+            '-u', 'file'], stdout=subprocess.PIPE)
+        index = dict()
+        for line in dump.communicate()[0].decode().splitlines():
+            if line[0:16] != 'file://localhost':
+                continue
+            frame_path = line[16:]
+            parsed = self.__parse_frame_file_name__(frame_path)
+            if parsed is None or parsed[3] != self.frame_length:
+                continue
+            if start <= parsed[2] < end:
+                index[parsed[2]] = frame_path
+        return index
+
+
+class DirectoryFrameLocator(AbstFrameLocator):
+    """
+    Locate frame files by scanning a local directory tree for files named
+    ``<observatory>-<frame type>-<gps start>-64.gwf``. Useful for working
+    offline with a local copy of some frame files. No cache is used by
+    default, since the directory scan is cheap.
+    """
+
+    def __init__(self, root, cache=None, frame_type=None):
+        self.root = root
+        super(DirectoryFrameLocator, self).__init__(cache, frame_type)
+
+    def __find_frame_files__(self, observatory, frame_type, start, end):
+        index = dict()
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            for filename in filenames:
+                parsed = self.__parse_frame_file_name__(filename)
+                if parsed is None:
+                    continue
+                obs, ftype, gps_start, length = parsed
+                if (obs == observatory and ftype == frame_type and
+                        length == self.frame_length and
+                        start <= gps_start < end):
+                    index[gps_start] = os.path.join(dirpath, filename)
+        return index
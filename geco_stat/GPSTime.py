@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+
+"""
+Conversion between GPS times and UTC dates, done in-process on whole arrays
+of times at once rather than by calling ``lalapps_tconvert`` once per time.
+
+GPS time counts SI seconds since the GPS epoch, 1980-01-06 00:00:00 UTC, and
+does not stop for leap seconds, so GPS - UTC grows by one second every time a
+leap second is inserted. The leap seconds are kept in a LeapSecondTable; an
+embedded table is used by default, and can be replaced with a newer one read
+from an IERS ``leap-seconds.list`` file using ``load_leap_seconds``.
+
+A GPS time that falls on a leap second (23:59:60 UTC) is converted to
+23:59:59 UTC, since datetime objects have no way of representing it.
+"""
+
+import datetime
+import numpy as np      # >=1.10.4
+
+# the GPS epoch as a naive UTC datetime
+GPS_EPOCH = datetime.datetime(1980, 1, 6)
+
+# TAI - UTC at the GPS epoch; GPS - UTC is zero then
+TAI_MINUS_UTC_AT_GPS_EPOCH = 19
+
+# seconds between the NTP epoch (1900-01-01), used by IERS files, and the GPS
+# epoch
+NTP_SECONDS_AT_GPS_EPOCH = 2524953600
+
+# first day (UTC) after each leap second inserted since the GPS epoch
+__leap_second_dates__ = [
+    (1981, 7, 1), (1982, 7, 1), (1983, 7, 1), (1985, 7, 1), (1988, 1, 1),
+    (1990, 1, 1), (1991, 1, 1), (1992, 7, 1), (1993, 7, 1), (1994, 7, 1),
+    (1996, 1, 1), (1997, 7, 1), (1999, 1, 1), (2006, 1, 1), (2009, 1, 1),
+    (2012, 7, 1), (2015, 7, 1), (2017, 1, 1)
+]
+
+# the format used by lalapps_tconvert, e.g. 'Fri Oct 30 00:00:00 GMT 2015'
+UTC_FORMAT = '%a %b %d %H:%M:%S GMT %Y'
+
+# formats accepted when parsing UTC strings, tried in this order
+UTC_PARSE_FORMATS = [
+    '%a %b %d %H:%M:%S GMT %Y',
+    '%b %d %H:%M:%S GMT %Y',
+    '%a %b %d %H:%M:%S UTC %Y',
+    '%b %d %H:%M:%S UTC %Y',
+    '%Y-%m-%d %H:%M:%S.%f',
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%dT%H:%M:%S.%f',
+    '%Y-%m-%dT%H:%M:%S',
+    '%Y-%m-%d'
+]
+
+_weekdays = ['Sun', 'Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat']
+_months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+           'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+
+def __total_seconds__(delta):
+    """timedelta.total_seconds, which python 2.6 lacks, in whole seconds."""
+    return delta.days * 86400 + delta.seconds
+
+
+class LeapSecondTable(object):
+    """
+    A table of the leap seconds inserted since the GPS epoch, used to convert
+    between GPS times and UTC.
+
+    Arguments:
+    leap_dates      the UTC dates (as datetime.datetime instances or
+                    (year, month, day) tuples) of the midnight right after
+                    each leap second, in order. defaults to the embedded
+                    table.
+
+    expires         an optional datetime after which the table may be
+                    missing leap seconds.
+    """
+
+    def __init__(self, leap_dates=None, expires=None):
+        if leap_dates is None:
+            leap_dates = __leap_second_dates__
+        leap_dates = [d if isinstance(d, datetime.datetime)
+                      else datetime.datetime(*d) for d in leap_dates]
+        # seconds since the GPS epoch, ignoring leap seconds, of each date
+        self.utc_thresholds = np.array([
+            __total_seconds__(d - GPS_EPOCH) for d in leap_dates],
+            dtype=np.int64)
+        if np.any(self.utc_thresholds[1:] <= self.utc_thresholds[:-1]):
+            raise ValueError('Leap second dates must be in increasing order')
+        # the GPS time of each leap second itself (the 23:59:60 second)
+        self.gps_leap_times = (self.utc_thresholds +
+                               np.arange(len(self.utc_thresholds)))
+        self.expires = expires
+
+    @classmethod
+    def from_iers_file(cls, filename):
+        """
+        Read the leap second table from an IERS ``leap-seconds.list`` file,
+        as distributed by the IERS, NIST and most operating systems (e.g.
+        /usr/share/zoneinfo/leap-seconds.list). Each data line gives a time in
+        NTP seconds and the value of TAI - UTC starting at that time; the
+        ``#@`` line gives the expiration date of the file.
+        """
+        leap_dates = []
+        expires = None
+        with open(filename) as f:
+            for line in f:
+                if line.startswith('#@'):
+                    expires = GPS_EPOCH + datetime.timedelta(
+                        seconds=int(line[2:].split()[0]) -
+                        NTP_SECONDS_AT_GPS_EPOCH)
+                    continue
+                line = line.split('#')[0].split()
+                if len(line) < 2:
+                    continue
+                ntp_seconds, tai_minus_utc = int(line[0]), int(line[1])
+                if tai_minus_utc > TAI_MINUS_UTC_AT_GPS_EPOCH:
+                    leap_dates.append(GPS_EPOCH + datetime.timedelta(
+                        seconds=ntp_seconds - NTP_SECONDS_AT_GPS_EPOCH))
+        return cls(leap_dates, expires)
+
+    def gps_minus_utc(self, gps_times):
+        """Return the value of GPS - UTC in seconds at each of gps_times."""
+        return np.searchsorted(self.gps_leap_times, gps_times, side='right')
+
+    def gps_to_utc_seconds(self, gps_times):
+        """
+        Convert GPS times to UTC, expressed as seconds since the GPS epoch
+        with leap seconds left out (so that every UTC day is 86400 s long).
+        """
+        gps_times = np.asarray(gps_times)
+        # a leap second counts towards GPS - UTC as soon as it starts, so it
+        # comes out as a repeat of the last second of the day, 23:59:59
+        return gps_times - self.gps_minus_utc(gps_times)
+
+    def utc_seconds_to_gps(self, utc_seconds):
+        """Inverse of gps_to_utc_seconds."""
+        utc_seconds = np.asarray(utc_seconds)
+        return utc_seconds + np.searchsorted(self.utc_thresholds, utc_seconds,
+                                             side='right')
+
+
+__leap_second_table__ = LeapSecondTable()
+
+
+def get_leap_second_table():
+    """Return the LeapSecondTable currently used for conversions."""
+    return __leap_second_table__
+
+
+def load_leap_seconds(table):
+    """
+    Replace the leap second table used for conversions. ``table`` can either
+    be a LeapSecondTable or the path to an IERS ``leap-seconds.list`` file.
+    Returns the new table.
+    """
+    global __leap_second_table__
+    if not isinstance(table, LeapSecondTable):
+        table = LeapSecondTable.from_iers_file(table)
+    __leap_second_table__ = table
+    return table
+
+
+def gps_to_utc(gps_times, table=None):
+    """
+    Convert an array of GPS times to a list of naive UTC datetime.datetime
+    instances.
+    """
+    utc_seconds = (table or __leap_second_table__).gps_to_utc_seconds(
+        np.asarray(gps_times, dtype=np.float64).reshape(-1))
+    return [GPS_EPOCH + datetime.timedelta(seconds=s)
+            for s in utc_seconds.tolist()]
+
+
+def gps_to_utc_strings(gps_times, table=None):
+    """
+    Convert an array of GPS times to a list of UTC strings in the format
+    used by lalapps_tconvert, e.g. 'Fri Oct 30 00:00:00 GMT 2015'. GPS times
+    are rounded down to the second. The calendar arithmetic is done on the
+    whole array at once with numpy.datetime64.
+    """
+    gps_times = np.floor(np.asarray(gps_times, dtype=np.float64).reshape(-1))
+    utc_seconds = (table or __leap_second_table__).gps_to_utc_seconds(
+        gps_times.astype(np.int64))
+    days, seconds = np.divmod(utc_seconds, 86400)
+    dates = np.datetime64('1980-01-06', 'D') + days
+    years = dates.astype('datetime64[Y]')
+    months = dates.astype('datetime64[M]')
+    year = years.astype(np.int64) + 1970
+    month = months.astype(np.int64) - (year - 1970) * 12
+    day = (dates - months).astype(np.int64) + 1
+    weekday = days % 7  # the GPS epoch was a Sunday
+    hour, seconds = np.divmod(seconds, 3600)
+    minute, second = np.divmod(seconds, 60)
+    return ['%s %s %02d %02d:%02d:%02d GMT %d'
+            % (_weekdays[w], _months[m], d, h, mi, s, y)
+            for w, m, d, h, mi, s, y in zip(
+                weekday.tolist(), month.tolist(), day.tolist(), hour.tolist(),
+                minute.tolist(), second.tolist(), year.tolist())]
+
+
+def utc_to_gps(utc_times, table=None):
+    """
+    Convert a list of naive UTC datetime.datetime instances to a numpy array
+    of GPS times. The result has dtype int64 if none of the datetimes has a
+    fractional second, and float64 otherwise.
+    """
+    deltas = [t - GPS_EPOCH for t in utc_times]
+    gps = (table or __leap_second_table__).utc_seconds_to_gps(
+        np.array([__total_seconds__(d) for d in deltas], dtype=np.int64))
+    microseconds = np.array([d.microseconds for d in deltas], dtype=np.int64)
+    if np.any(microseconds != 0):
+        return gps + microseconds / 1e6
+    return gps
+
+
+def parse_utc_string(utc_string):
+    """
+    Parse a UTC date string into a naive datetime.datetime, trying each
+    format in UTC_PARSE_FORMATS in turn.
+    """
+    utc_string = ' '.join(utc_string.split())
+    for fmt in UTC_PARSE_FORMATS:
+        try:
+            return datetime.datetime.strptime(utc_string, fmt)
+        except ValueError:
+            pass
+    raise ValueError('Could not parse UTC time string: %s' % utc_string)
+
+
+def utc_strings_to_gps(utc_strings, table=None):
+    """
+    Convert a list of UTC date strings to a numpy array of GPS times. See
+    parse_utc_string for the accepted formats and utc_to_gps for the dtype of
+    the result.
+    """
+    return utc_to_gps([parse_utc_string(s) for s in utc_strings], table)
@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+
+import os
+import multiprocessing
+from geco_stat._constants import __default_bitrate__
+from geco_stat.Frame import GWDataFindLocator
+from geco_stat.ReportSet import ReportSet
+from geco_stat.Time import TimeIntervalSet
+
+
+def tree_union(instances):
+    """
+    Union a sequence of AbstUnionable instances pairwise, tournament-style,
+    rather than folding them into one ever-growing accumulator from the
+    left. Each instance takes part in only log2(N) unions this way.
+    """
+    reducer = TreeReducer()
+    for instance in instances:
+        reducer.add(instance)
+    return reducer.result()
+
+
+class TreeReducer(object):
+    """
+    Incrementally union AbstUnionable instances as they become available,
+    combining them in a balanced binary tree. Instances are kept on a stack
+    along with their height in the tree; whenever the top two have the same
+    height, they are unioned. At most log2(N) partial results are held in
+    memory at any time.
+    """
+
+    def __init__(self):
+        self._stack = []
+
+    def add(self, instance):
+        """Add a new instance to the reduction."""
+        height = 0
+        while self._stack and self._stack[-1][0] == height:
+            instance = self._stack.pop()[1] + instance
+            height += 1
+        self._stack.append((height, instance))
+
+    def is_empty(self):
+        'Check whether nothing has been added to the reduction yet.'
+        return not self._stack
+
+    def result(self):
+        """Union everything added so far and return the result."""
+        if not self._stack:
+            raise ValueError('Nothing to reduce.')
+        ans = self._stack[-1][1]
+        for height, instance in reversed(self._stack[:-1]):
+            ans = instance + ans
+        return ans
+
+
+def _process_frames(task):
+    """
+    Worker function for ReportSetPipeline. Builds a ReportSet for each frame
+    file in the task and returns their union.
+    """
+    report_class_name, channel_name, frames, bitrate, reader = task
+    return ReportSet.union_all([
+        ReportSet.from_frame_file(report_class_name, channel_name, path,
+                                  TimeIntervalSet([start, end]), bitrate,
+                                  reader)
+        for start, end, path in frames])
+
+
+class ReportSetPipeline(object):
+    """
+    Build a ReportSet for a channel over a long TimeIntervalSet by processing
+    its frame files in parallel and then recombining the results.
+
+    The time intervals are split into frame files, which are located in a
+    single batch by the ``locator`` and handed out to a pool of ``processes``
+    worker processes, ``chunk_size`` frame files at a time. Each worker
+    unions the ReportSets of the frames in its chunk, and the chunk results
+    are unioned in a tree reduction as they come back, so that no process
+    ever has to fold thousands of frames into one accumulator.
+
+    Report classes are looked up by name in the Factory by the workers, so
+    the report class must be added to the Factory when the module that
+    defines it is imported.
+
+    Arguments:
+    report_class    the AbstReport subclass (or its name in the Factory) used
+                    to build the reports.
+
+    channel_name    the name of the channel to analyze.
+
+    bitrate         the bitrate of the channel. defaults to 16384.
+
+    processes       the number of worker processes. defaults to the number
+                    of CPUs. with one process, no pool is used at all.
+
+    chunk_size      the number of frame files each worker processes before
+                    returning a result. defaults to 4.
+
+    reader          the frame reader backend (or its name) used to read the
+                    frame files. defaults to the fastest available one.
+
+    locator         the AbstFrameLocator used to find frame files. defaults
+                    to a GWDataFindLocator.
+
+    Long builds can be checkpointed to an HDF5 file with run_checkpointed,
+    so that a job that gets killed can be restarted without redoing the
+    work it had already finished.
+    """
+
+    def __init__(self,
+                 report_class,
+                 channel_name,
+                 bitrate         = __default_bitrate__,
+                 processes       = None,
+                 chunk_size      = 4,
+                 reader          = None,
+                 locator         = None):
+        if not isinstance(report_class, str):
+            report_class = report_class.__name__
+        self.report_class_name  = report_class
+        self.channel_name       = channel_name
+        self.bitrate            = bitrate
+        if processes is None:
+            processes = multiprocessing.cpu_count()
+        self.processes          = int(processes)
+        self.chunk_size         = int(chunk_size)
+        if self.processes < 1 or self.chunk_size < 1:
+            raise ValueError('processes and chunk_size must be positive')
+        self.reader             = reader
+        if locator is None:
+            locator = GWDataFindLocator()
+        self.locator            = locator
+
+    def tasks(self, time_intervals):
+        """
+        Split time_intervals into frame files, locate them, and group them
+        into worker tasks of chunk_size frames each. time_intervals must
+        start and end on frame file boundaries.
+        """
+        paths = self.locator.locate_frame_files(self.channel_name,
+                                                time_intervals)
+        frames = []
+        for frame in time_intervals.split_into_frame_file_intervals():
+            start, end = frame.to_ndarray()
+            frames.append((start, end, paths.get(int(start))))
+        return [(self.report_class_name, self.channel_name,
+                 frames[i:i+self.chunk_size], self.bitrate, self.reader)
+                for i in range(0, len(frames), self.chunk_size)]
+
+    def imap(self, time_intervals):
+        """
+        Process the frames covering time_intervals and yield one ReportSet
+        per task, in no particular order, as soon as each one is finished.
+        """
+        tasks = self.tasks(time_intervals)
+        if self.processes == 1:
+            for task in tasks:
+                yield _process_frames(task)
+            return
+        pool = multiprocessing.Pool(min(self.processes, len(tasks)) or 1)
+        try:
+            for report_set in pool.imap_unordered(_process_frames, tasks):
+                yield report_set
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+
+    def run(self, time_intervals):
+        """
+        Build a single ReportSet covering time_intervals, which must start
+        and end on frame file boundaries.
+        """
+        return tree_union(self.imap(time_intervals))
+
+    def run_checkpointed(self, time_intervals, filename,
+                         checkpoint_every=4096):
+        """
+        Like run, but save the partial ReportSet to the HDF5 file filename
+        every time at least another checkpoint_every seconds of data have
+        been processed, as well as at the end. If filename already exists,
+        the ReportSet saved in it is picked up where it was left off: only
+        its remaining_times (plus any part of time_intervals it wasn't meant
+        to cover) are processed.
+
+        The saved ReportSet records time_intervals as its intended_times.
+        Each checkpoint is written to a temporary file next to filename,
+        which is then renamed over it, so that a job killed while writing a
+        checkpoint still leaves the previous one intact. Returns the
+        finished ReportSet.
+        """
+        blank = ReportSet(self.report_class_name, self.bitrate,
+                          self.channel_name)
+        reducer = TreeReducer()
+        intended_times = time_intervals
+        remaining_times = time_intervals
+        if os.path.exists(filename):
+            partial = ReportSet.load_hdf5(filename)
+            partial.__assert_compatible__(blank)
+            intended_times = partial.intended_times + time_intervals
+            remaining_times = \
+                partial.time_intervals.complement_with_respect_to(
+                    intended_times)
+            reducer.add(partial)
+        unsaved = 0
+        for report_set in self.imap(remaining_times):
+            reducer.add(report_set)
+            unsaved += report_set.time_intervals.combined_length()
+            if unsaved >= checkpoint_every:
+                self.__checkpoint__(reducer.result(), intended_times,
+                                    filename)
+                unsaved = 0
+        if reducer.is_empty():
+            reducer.add(blank)
+        return self.__checkpoint__(reducer.result(), intended_times, filename)
+
+    @staticmethod
+    def __checkpoint__(report_set, intended_times, filename):
+        """
+        Atomically replace filename with an HDF5 file holding report_set,
+        with the given intended_times, and return the ReportSet saved.
+        """
+        report_set.intended_times = intended_times
+        report_set.assert_self_consistent()
+        temporary = filename + '.tmp'
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        report_set.save_hdf5(temporary)
+        # make sure the data is on disk before the rename makes it visible
+        with open(temporary, 'rb+') as f:
+            os.fsync(f.fileno())
+        # os.rename can't replace an existing file on Windows; os.replace,
+        # which can, is missing from python 2
+        getattr(os, 'replace', os.rename)(temporary, filename)
+        # and that the rename is too, where directories can be opened
+        if hasattr(os, 'O_DIRECTORY'):
+            directory = os.open(os.path.dirname(os.path.abspath(filename)),
+                                os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(directory)
+            finally:
+                os.close(directory)
+        return report_set
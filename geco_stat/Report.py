@@ -7,6 +7,7 @@ from geco_stat._constants import __default_bitrate__
 from geco_stat.Abstract import Factory
 from geco_stat.Data import AbstData
 from geco_stat.Time import TimeIntervalSet
+from geco_stat.Timeseries import Timeseries
 
 # TODO: Make AbstractPlottable
 class AbstReport(AbstData):
@@ -25,7 +26,8 @@ class AbstReport(AbstData):
 
     time_intervals  the time intervals over which the data used to create
                     the report were recorded. defaults to an empty time
-                    interval.
+                    interval. it is kept with share, so its arrays become
+                    read-only (see AbstractDictRepresentable.share).
 
     data            a dictionary containing ReportData objects. defaults to
                     an empty histogram and an empty statistics instance with
@@ -43,7 +45,7 @@ class AbstReport(AbstData):
         if time_intervals is None:
             self.time_intervals = TimeIntervalSet()
         else:
-            self.time_intervals = time_intervals.clone()
+            self.time_intervals = time_intervals.share()
 
         if data is None:
             data = self.__report_data_prototype__(bitrate)
@@ -96,33 +98,152 @@ class AbstReport(AbstData):
         the entire timeseries contained in the ReportSet.
         """
 
+    @classmethod
+    def from_timeseries(cls, timeseries, time_intervals=None, bitrate=None):
+        """
+        Create a new report from a timeseries, filling each of the
+        prototypical report data instances for this report class with the
+        data in the timeseries. The time intervals and bitrate default to
+        those of the timeseries.
+        """
+        if time_intervals is None:
+            time_intervals = timeseries.time_intervals
+        if bitrate is None:
+            bitrate = timeseries.bitrate
+        timeseries = cls.__over_time_intervals__(timeseries, time_intervals)
+        data = cls.__report_data_prototype__(bitrate)
+        for key in data:
+            data[key] = data[key].from_timeseries(timeseries)
+        return cls(
+            bitrate         = bitrate,
+            time_intervals  = time_intervals,
+            data            = data
+        )
+
     def fold_in_timeseries(self, timeseries, time_intervals,
                            bitrate=__default_bitrate__):
         """
         Return a new report containing the current report's data along with
         data gleaned from the timeseries provided as an argument folded in.
+        To fold the timeseries into this report in place instead, use
+        accumulate.
         """
         return self.union(type(self).from_timeseries(
             timeseries, time_intervals, bitrate))
 
-    def __union__(self, other):
-        ans = self.clone()
-        ans.time_intervals  += other.time_intervals
-        for key in ans._data:
-            ans._data[key] += other._data[key]
+    def accumulate(self, timeseries, time_intervals=None):
+        """
+        Fold the data in timeseries, which covers time_intervals, into this
+        report in place and return it. Each report data instance is updated
+        in place with its own accumulate method, so that building a report
+        from many timeseries in a row doesn't allocate (or copy) a new report
+        for each one. The time intervals default to those of the timeseries,
+        and must not overlap with the ones already in this report.
+        """
+        if time_intervals is None:
+            time_intervals = timeseries.time_intervals
+        if self.bitrate != timeseries.bitrate:
+            raise ValueError('Report and timeseries have different bitrates')
+        if time_intervals.combined_length() != np.shape(timeseries)[0]:
+            raise ValueError('time_intervals do not match the length of the '
+                             'timeseries')
+        if self.time_intervals.intersection(
+                time_intervals) != TimeIntervalSet():
+            raise ValueError('Reports have overlapping time intervals.')
+        timeseries = self.__over_time_intervals__(timeseries, time_intervals)
+        for key in self._data:
+            self._data[key].accumulate(timeseries)
+        self.time_intervals = self.time_intervals + time_intervals
+        return self
+
+    @staticmethod
+    def __over_time_intervals__(timeseries, time_intervals):
+        """
+        Return timeseries, or a view of it, whose time_intervals are
+        time_intervals, so that report data that record times (like the
+        times of the extrema in Statistics) record the report's times.
+        """
+        current = getattr(timeseries, 'time_intervals', None)
+        if current is not None and current == time_intervals:
+            return timeseries
+        ans = timeseries.view(Timeseries)
+        ans.time_intervals = time_intervals
+        ans.bitrate = getattr(timeseries, 'bitrate', None)
         return ans
 
-    def __clone__(self):
-        cloned_data = self._data
-        for key in cloned_data:
-            cloned_data[key] = cloned_data[key].clone()
+    def __union__(self, other):
+        data = dict()
+        for key in self._data:
+            data[key] = self._data[key] + other._data[key]
         return type(self)(
             bitrate         = self.bitrate,
-            time_intervals  = self.time_intervals.clone(),
-            data            = cloned_data
+            time_intervals  = self.time_intervals + other.time_intervals,
+            data            = data
+        )
+
+    @classmethod
+    def __union_all__(cls, instances):
+        """
+        Union the time intervals of all reports in one sweep, which also
+        checks that none of them overlap, and then union each type of report
+        data across all reports at once.
+        """
+        first = instances[0]
+        for other in instances[1:]:
+            first.__assert_compatible__(other)
+        time_intervals = TimeIntervalSet.disjoint_union_all(
+            [r.time_intervals for r in instances])
+        data = dict()
+        for key in first._data:
+            data[key] = first._data[key].__union_all__(
+                [r._data[key] for r in instances])
+        return type(first)(
+            bitrate         = first.bitrate,
+            time_intervals  = time_intervals,
+            data            = data
         )
 
+    def __update_hdf5_group__(self, group):
+        """
+        Union each report data instance into the saved one, and then the
+        time intervals.
+        """
+        for key in self._data:
+            self._data[key].__update_hdf5_group__(group['data'][key])
+        self.time_intervals.__update_hdf5_group__(group['time_intervals'])
+
+    def __assert_hdf5_unionable__(self, group):
+        """
+        Check the saved report data with their own __assert_hdf5_unionable__
+        methods, and load only the saved time intervals to check that they
+        don't overlap with this report's.
+        """
+        self.__assert_hdf5_metadata__(group, ('bitrate',))
+        if set(self._data) != set(group['data']):
+            raise ValueError(
+                'AbstData sets do not have matching key sets.')
+        for key in self._data:
+            self._data[key].__assert_hdf5_unionable__(group['data'][key])
+        stored_times = TimeIntervalSet.from_dict(
+            self.__recursively_load_dict_contents_from_group__(
+                group.file, group['time_intervals'].name + '/'))
+        stored_times.assert_unionable(self.time_intervals)
+        if self.time_intervals.intersection(
+                stored_times) != TimeIntervalSet():
+            raise ValueError('Reports have overlapping time intervals.')
+
     def assert_unionable(self, other):
+        self.__assert_compatible__(other)
+        if self.time_intervals.intersection(
+                other.time_intervals) != TimeIntervalSet():
+            raise ValueError('Reports have overlapping time intervals.')
+        return True
+
+    def __assert_compatible__(self, other):
+        """
+        Make sure that these two reports can be unioned, leaving aside
+        whether their time intervals overlap.
+        """
         if self.bitrate != other.bitrate:
             raise ValueError('Reports have different bitrates')
         if self.__version__ != other.__version__:
@@ -133,9 +254,6 @@ class AbstReport(AbstData):
         if set(self._data) != set(other._data):
             raise ValueError(
                 'AbstData sets do not have matching key sets.')
-        if self.time_intervals.intersection(
-                other.time_intervals) != TimeIntervalSet():
-            raise ValueError('Reports have overlapping time intervals.')
         return True
 
     # TODO confirm self data unionability with new class instance
@@ -171,8 +289,7 @@ class AbstReport(AbstData):
     def __from_dict__(cls, d):
         data = dict()
         for key, value in d['data'].items():
-            # FIXME implement this using the Factory pattern used elsewhere.
-            report_data_class = globals()[ value['class'] ]
+            report_data_class = Factory.get_class(value['class'])
             if not issubclass(report_data_class, AbstData):
                 raise ValueError('Cannot reconstruct Report data; class '
                                  'property not a valid AbstData '
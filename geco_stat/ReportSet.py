@@ -8,7 +8,9 @@ from geco_stat.Abstract import Factory
 from geco_stat.Abstract import AbstUnionable
 from geco_stat.Abstract import AbstractPlottable
 from geco_stat.Abstract import HDF5_IO
+from geco_stat.Report import AbstReport
 from geco_stat.Time import TimeIntervalSet
+from geco_stat.Timeseries import Timeseries
 
 # Inherit from HDF5_IO first in order to get an implemented clone method
 class ReportSet(HDF5_IO,
@@ -18,10 +20,20 @@ class ReportSet(HDF5_IO,
     Class for collections of Reports, allowing for more advanced procedures
     that allow the user to distinguish between anomalous and typical time
     ranges in the input data.
+
+    Besides the time intervals it covers, a ReportSet keeps track of the
+    time intervals it is meant to cover eventually, ``intended_times``
+    (which default to the time intervals it covers), so that a partially
+    built ReportSet knows which times remain to be processed (see
+    remaining_times and is_finished).
+
+    The time intervals and reports passed to the constructor are kept with
+    share rather than copied, so their arrays become read-only; their
+    methods keep working, but writing into their arrays directly raises a
+    ValueError (see AbstractDictRepresentable.share).
     """
 
-    # TODO Add notes, full intended time, current work block, and is_finished
-    # method
+    # TODO Add notes and current work block
     def __init__(self,
                  report_class_name,
                  bitrate                 = __default_bitrate__,
@@ -30,25 +42,31 @@ class ReportSet(HDF5_IO,
                  report                  = None,
                  report_anomalies_only   = None,
                  report_sans_anomalies   = None,
-                 missing_times           = None):
+                 missing_times           = None,
+                 intended_times          = None):
 
         if isinstance(report_class_name, str):
             self.report_class_name = report_class_name
-            if not self.get_report_class() is type:
+            if not issubclass(self.get_report_class(), AbstReport):
                 raise ValueError('report_class must be equal to the name of '
-                                 'a ReportData class')
+                                 'an AbstReport subclass')
         else:
             raise ValueError('report_class must be a string')
 
         if time_intervals is None:
             self.time_intervals         = TimeIntervalSet()
         else:
-            self.time_intervals         = time_intervals.clone()
+            self.time_intervals         = time_intervals.share()
 
         if missing_times is None:
             self.missing_times          = TimeIntervalSet()
         else:
-            self.missing_times          = missing_times.clone()
+            self.missing_times          = missing_times.share()
+
+        if intended_times is None:
+            self.intended_times         = self.time_intervals.share()
+        else:
+            self.intended_times         = intended_times.share()
 
         # All or none of the three reports must be provided as arguments,
         # otherwise it would be possible to initialize an inconsistent
@@ -63,9 +81,10 @@ class ReportSet(HDF5_IO,
             self.report_sans_anomalies  = \
                 self.get_report_class()(bitrate=bitrate)
         else:
-            self.report                 = report.clone()
-            self.report_anomalies_only  = report_anomalies_only.clone()
-            self.report_sans_anomalies  = report_sans_anomalies.clone()
+            # copy-on-write, so reports that are only read are not copied
+            self.report                 = report.share()
+            self.report_anomalies_only  = report_anomalies_only.share()
+            self.report_sans_anomalies  = report_sans_anomalies.share()
 
         assert np.int64(bitrate) == bitrate, 'bitrate must be an integer'
         self.bitrate                = np.int64(bitrate)
@@ -81,15 +100,17 @@ class ReportSet(HDF5_IO,
         self argument, which is then either interpreted as an instance of
         ReportSet, or as the class name string itself. In the latter case,
         this function simply returns the Report class corresponding to the
-        class name passed as an argument.
+        class name passed as an argument. The Report class must have been
+        added to the Factory.
         """
         if not isinstance(self, str):
             self = self.report_class_name
-        return globals()[self]
+        return Factory.get_class(self)
 
-    @staticmethod
-    def from_time_and_channel_name(report_class_name, channel_name,
-                                   time_intervals, bitrate=__default_bitrate__):
+    @classmethod
+    def from_time_and_channel_name(cls, report_class_name, channel_name,
+                                   time_intervals, bitrate=__default_bitrate__,
+                                   reader=None, locator=None):
         """
         Each subclass of ReportSet should have its own well-defined
         constructor that rejects initialization data that would lead to an
@@ -98,34 +119,64 @@ class ReportSet(HDF5_IO,
         This can be confirmed by checking at the end of initialization that the
         new instance is unionable with a new blank instance.
 
-        The time_intervals argument must, at the moment, correspond to a single
-        gravitational wave frame file. Future implementations might change this.
+        The timeseries covering time_intervals is loaded with
+        Timeseries.from_time_and_channel_name, using the given frame reader
+        and locator. If no data can be found, the whole of time_intervals is
+        recorded as missing.
         """
-        report_class = globals()[report_class_name]
         try:
             timeseries = Timeseries.from_time_and_channel_name(
-                channel_name, time_intervals)
-            missing_times = TimeIntervalSet()
-            # FIXME: This line is broken. This is a staticmethod, no self.
-            report = report_class.from_timeseries(self, timeseries)
+                channel_name, time_intervals, bitrate, reader, locator)
+        except MissingChannelDataException:
+            timeseries = None
+        return cls.__from_timeseries__(report_class_name, channel_name,
+                                       timeseries, time_intervals, bitrate)
+
+    @classmethod
+    def from_frame_file(cls, report_class_name, channel_name, path,
+                        time_intervals, bitrate=__default_bitrate__,
+                        reader=None):
+        """
+        Like from_time_and_channel_name, but for a time interval covering
+        exactly one frame file whose path is already known. If path is None,
+        or if the channel can't be found in the frame file, the whole of
+        time_intervals is recorded as missing.
+        """
+        timeseries = None
+        if path is not None:
+            try:
+                timeseries = Timeseries.from_frame_file(
+                    channel_name, path, time_intervals, bitrate, reader)
+            except MissingChannelDataException:
+                pass
+        return cls.__from_timeseries__(report_class_name, channel_name,
+                                       timeseries, time_intervals, bitrate)
 
+    @classmethod
+    def __from_timeseries__(cls, report_class_name, channel_name, timeseries,
+                            time_intervals, bitrate=__default_bitrate__):
+        """
+        Build a ReportSet from a timeseries covering time_intervals. A
+        timeseries of None means that the data for time_intervals is missing.
+        """
+        report_class = Factory.get_class(report_class_name)
+        if timeseries is None:
+            missing_times = time_intervals
+            report = report_class(bitrate=bitrate,
+                                  time_intervals=time_intervals)
+            report_sans_anomalies = report
+            report_anomalies_only = report_class(bitrate=bitrate)
+        else:
+            missing_times = TimeIntervalSet()
+            report = report_class.from_timeseries(timeseries, time_intervals,
+                                                  bitrate)
             if report_class.is_anomalous(timeseries):
                 report_anomalies_only = report
-                report_sans_anomalies = report_class(
-                    bitrate=bitrate, time_intervals=time_intervals)
+                report_sans_anomalies = report_class(bitrate=bitrate)
             else:
                 report_sans_anomalies = report
-                report_anomalies_only = report_class(
-                    bitrate=bitrate, time_intervals=time_intervals)
-        except MissingChannelDataException:
-            missing_times = time_intervals
-            report = report_class(
-                bitrate=bitrate,
-                time_intervals=time_intervals)
-            report_anomalies_only = report
-            report_sans_anomalies = report
+                report_anomalies_only = report_class(bitrate=bitrate)
 
-        # FIXME: This line is ALSO broken. This is a staticmethod, no cls.
         return cls(
             report_class_name       = report_class_name,
             bitrate                 = bitrate,
@@ -171,8 +222,14 @@ class ReportSet(HDF5_IO,
                     'key ' +
                     t.__name__ +
                     ' has different version than this ReportSet')
-        if (self.report_anomalies_only + self.report_sans_anomalies !=
-                self.report):
+        # only the time intervals are compared, since floating point report
+        # data summed in a different order need not match bit for bit
+        if (self.report_anomalies_only.time_intervals.intersection(
+                self.report_sans_anomalies.time_intervals) !=
+                TimeIntervalSet() or
+                self.report_anomalies_only.time_intervals +
+                self.report_sans_anomalies.time_intervals !=
+                self.report.time_intervals):
             raise ValueError(
                 'whole report should be union of anomalous and nominal parts')
         if self.missing_times + self.time_intervals != self.time_intervals:
@@ -181,10 +238,39 @@ class ReportSet(HDF5_IO,
         if self.time_intervals != self.report.time_intervals:
             raise ValueError(
                 'time intervals in full Report and ReportSet should match')
+        if not isinstance(self.intended_times, TimeIntervalSet):
+            raise ValueError('intended_times must be an instance of '
+                             'TimeIntervalSet')
+        if self.time_intervals + self.intended_times != self.intended_times:
+            raise ValueError(
+                'time intervals should be subset of intended times')
         assert np.int64(
             self.bitrate) == self.bitrate, 'bitrate must be an integer'
 
+    def remaining_times(self):
+        """
+        Return the intended times that this ReportSet does not cover yet.
+        """
+        return self.time_intervals.complement_with_respect_to(
+            self.intended_times)
+
+    def is_finished(self):
+        'Check whether this ReportSet covers all of its intended times.'
+        return self.time_intervals == self.intended_times
+
     def assert_unionable(self, other):
+        self.__assert_compatible__(other)
+        if self.time_intervals.intersection(
+                other.time_intervals) != TimeIntervalSet([]):
+            raise ValueError('instances of ReportSet cannot cover overlapping '
+                             'time intervals')
+        return True
+
+    def __assert_compatible__(self, other):
+        """
+        Make sure that these two ReportSets can be unioned, leaving aside
+        whether their time intervals overlap.
+        """
         if not isinstance(self, type(other)):
             raise ValueError('instances of ReportSet must be of same type')
         if self.get_report_class() != other.get_report_class():
@@ -197,31 +283,71 @@ class ReportSet(HDF5_IO,
             raise ValueError('instances of ReportSet must have same bitrate')
         if self.__version__ != other.__version__:
             raise ValueError('instances of ReportSet must have same version')
-        if self.time_intervals.intersection(
-                other.time_intervals) == TimeIntervalSet([]):
-            raise ValueError('instances of ReportSet cannot cover overlapping '
-                             'time intervals')
+        return True
 
     def __union__(self, other):
-        ans = self.clone()
+        # every attribute of ans that holds data is replaced below
+        ans = self.share()
         ans.time_intervals          += other.time_intervals
         ans.missing_times           += other.missing_times
+        ans.intended_times          += other.intended_times
         ans.report                  += other.report
         ans.report_anomalies_only   += other.report_anomalies_only
         ans.report_sans_anomalies   += other.report_sans_anomalies
+        return ans
 
-    def __clone__(self):
-        return type(self)(
-            report_class_name       = self.report_class_name,
-            bitrate                 = self.bitrate,
-            channel_name            = self.channel_name,
-            time_intervals          = self.time_intervals,
-            report                  = self.report,
-            report_anomalies_only   = self.report_anomalies_only,
-            report_sans_anomalies   = self.report_sans_anomalies,
-            missing_times           = self.missing_times
+    @classmethod
+    def __union_all__(cls, instances):
+        """
+        Union the time intervals of all ReportSets in one sweep, which also
+        checks that none of them overlap, and then union each of the three
+        reports across all ReportSets at once.
+        """
+        first = instances[0]
+        for other in instances[1:]:
+            first.__assert_compatible__(other)
+        report_class = first.get_report_class()
+        return type(first)(
+            report_class_name       = first.report_class_name,
+            bitrate                 = first.bitrate,
+            channel_name            = first.channel_name,
+            time_intervals          = TimeIntervalSet.disjoint_union_all(
+                [r.time_intervals for r in instances]),
+            report                  = report_class.__union_all__(
+                [r.report for r in instances]),
+            report_anomalies_only   = report_class.__union_all__(
+                [r.report_anomalies_only for r in instances]),
+            report_sans_anomalies   = report_class.__union_all__(
+                [r.report_sans_anomalies for r in instances]),
+            missing_times           = TimeIntervalSet.__union_all__(
+                [r.missing_times for r in instances]),
+            intended_times          = TimeIntervalSet.__union_all__(
+                [r.intended_times for r in instances])
         )
 
+    def __update_hdf5_group__(self, group):
+        """
+        Union each of the reports into the saved ones, and then the time
+        intervals.
+        """
+        for key in ('report', 'report_anomalies_only', 'report_sans_anomalies',
+                    'time_intervals', 'missing_times', 'intended_times'):
+            # older files have no intended_times
+            if key in group:
+                getattr(self, key).__update_hdf5_group__(group[key])
+
+    def __assert_hdf5_unionable__(self, group):
+        """
+        Check each of the saved reports with their own
+        __assert_hdf5_unionable__ methods, which don't read their counts.
+        The saved time intervals are covered by those of the saved report.
+        """
+        self.__assert_hdf5_metadata__(
+            group, ('report_class_name', 'channel_name', 'bitrate'))
+        for key in ('report', 'report_anomalies_only',
+                    'report_sans_anomalies'):
+            getattr(self, key).__assert_hdf5_unionable__(group[key])
+
     @classmethod
     def __from_dict__(cls, d):
         return cls(
@@ -239,7 +365,9 @@ class ReportSet(HDF5_IO,
                 d['report_class_name']).from_dict(
                 d['report_sans_anomalies']),
             missing_times           = TimeIntervalSet.from_dict(
-                d['missing_times'])
+                d['missing_times']),
+            intended_times          = TimeIntervalSet.from_dict(
+                d['intended_times']) if 'intended_times' in d else None
         )
 
     def __to_dict__(self):
@@ -251,14 +379,15 @@ class ReportSet(HDF5_IO,
             'report':                 self.report.to_dict(),
             'report_anomalies_only':  self.report_anomalies_only.to_dict(),
             'report_sans_anomalies':  self.report_sans_anomalies.to_dict(),
-            'missing_times':          self.missing_times.to_dict()
+            'missing_times':          self.missing_times.to_dict(),
+            'intended_times':         self.intended_times.to_dict()
         }
 
     def __eq__(self, other):
         try:
             self.assert_self_consistent()
             other.assert_self_consistent()
-        except ValueError():
+        except ValueError:
             return False
         if not isinstance(self, type(other)):
             return False
@@ -274,6 +403,8 @@ class ReportSet(HDF5_IO,
             return False
         if self.missing_times != other.missing_times:
             return False
+        if self.intended_times != other.intended_times:
+            return False
         if self.report != other.report:
             return False
         if self.report_anomalies_only != other.report_anomalies_only:
@@ -282,3 +413,5 @@ class ReportSet(HDF5_IO,
             return False
         return True
 
+
+Factory.add_class(ReportSet)
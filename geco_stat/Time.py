@@ -1,6 +1,5 @@
 # -*- coding: utf-8 -*-
 
-import bisect
 import subprocess
 import numpy as np      # >=1.10.4
 from geco_stat._version import __version__
@@ -8,8 +7,12 @@ from geco_stat.Abstract import Factory
 from geco_stat.Abstract import AbstUnionable
 from geco_stat.Abstract import AbstractPlottable
 from geco_stat.Abstract import HDF5_IO
+from geco_stat import GPSTime
 from geco_stat.Exceptions import VersionException
 
+# number of nanoseconds in a second
+NS = 10**9
+
 # Inherit from HDF5_IO first in order to get an implemented clone method
 class TimeIntervalSet(HDF5_IO,
                       # AbstractPlottable, TODO Make AbstractPlottable
@@ -31,6 +34,11 @@ class TimeIntervalSet(HDF5_IO,
     These methods do not modify the TimeIntervalSet instance to which they are
     bound. This makes it easy to play around with them without annoying and
     potentially dangerous side-effects.
+
+    Endpoints are stored internally as int64 GPS nanoseconds, so that GPS
+    times with sub-second parts are represented exactly and set algebra never
+    runs out of floating point precision. to_ndarray returns the endpoints in
+    (float) seconds; to_nanoseconds returns the exact integer values.
     """
 
     def __init__(self, intervalSet=None, start=None, end=None):
@@ -54,28 +62,92 @@ class TimeIntervalSet(HDF5_IO,
             that will comprise the new interval set:
 
             [s, e)
+
+        Times are in GPS seconds. Integer times are converted to nanoseconds
+        exactly; floating point times are rounded to the nearest nanosecond.
+        Use from_nanoseconds to initialize from integer GPS nanoseconds.
         """
         if type(intervalSet) == list or type(intervalSet) == np.ndarray:
-            if len(intervalSet) % 2 != 0:
-                raise ValueError('intervalSet set must have even length (equal '
-                                 'starts and ends)')
-            elif not np.array_equal(sorted(intervalSet), intervalSet):
-                raise ValueError('intervalSet must be sorted')
-            else:
-                self._data = np.array([float(x) for x in intervalSet])
-                self.remove_empty_sets()
-                self.assert_self_consistent()
+            self.__set_nanoseconds__(self.__to_nanoseconds__(intervalSet))
         elif (intervalSet is None and start is None and end is None or
                 start == end):
-            self._data = np.array([])
+            self._data = np.array([], dtype=np.int64)
         elif start < end:
-            self._data = np.array([float(start), float(end)])
-            self.remove_empty_sets()
-            self.assert_self_consistent()
+            self.__set_nanoseconds__(self.__to_nanoseconds__([start, end]))
         else:
             raise ValueError('Invalid combination of arguments. '
                              'See documentation.')
 
+    @classmethod
+    def from_nanoseconds(cls, nanoseconds):
+        """
+        Initialize a TimeIntervalSet from a sorted, even-length array of
+        integer GPS nanoseconds, [s1, e1, s2, e2, ... sN, eN].
+        """
+        nanoseconds = np.asarray(nanoseconds)
+        if len(nanoseconds) != 0 and nanoseconds.dtype.kind not in 'iu':
+            raise ValueError('nanoseconds must be integers')
+        ans = cls()
+        ans.__set_nanoseconds__(nanoseconds.astype(np.int64))
+        return ans
+
+    @classmethod
+    def _from_canonical(cls, nanoseconds):
+        """
+        Wrap an int64 array of GPS nanoseconds that is already known to be in
+        canonical form (sorted, of even length, and with no empty or abutting
+        intervals) in a new TimeIntervalSet without checking or copying it.
+        This is the fast path used internally for the results of set algebra,
+        clones, and the like; use from_nanoseconds for anything else.
+        """
+        ans = cls.__new__(cls)
+        ans._data = nanoseconds
+        return ans
+
+    def __set_nanoseconds__(self, nanoseconds):
+        """
+        Check that an int64 array of endpoints has even length and is sorted,
+        then use it as this instance's data.
+        """
+        if len(nanoseconds) % 2 != 0:
+            raise ValueError('intervalSet set must have even length (equal '
+                             'starts and ends)')
+        elif np.any(nanoseconds[1:] < nanoseconds[:-1]):
+            raise ValueError('intervalSet must be sorted')
+        self._data = nanoseconds
+        self.remove_empty_sets()
+        self.assert_self_consistent()
+
+    @staticmethod
+    def __to_nanoseconds__(times):
+        """
+        Convert an array of GPS times in seconds to an int64 array of GPS
+        nanoseconds in a single vectorized pass. Integers are converted
+        exactly. Floats are split into whole and fractional seconds first so
+        that only the fractional part is rounded, which keeps the result
+        exact to the nanosecond for any time that float64 can represent that
+        precisely.
+        """
+        times = np.asarray(times)
+        if times.dtype.kind in 'iub':
+            return times.astype(np.int64) * NS
+        times = times.astype(np.float64)
+        if not np.all(np.isfinite(times)):
+            raise ValueError('Time interval endpoints must be finite')
+        seconds = np.floor(times)
+        fraction = np.round((times - seconds) * NS).astype(np.int64)
+        return seconds.astype(np.int64) * NS + fraction
+
+    @staticmethod
+    def __to_seconds__(nanoseconds):
+        """
+        Convert GPS nanoseconds to float GPS seconds. Whole seconds are
+        converted separately from the remainder so that integer GPS times
+        stay exact.
+        """
+        seconds, remainder = np.divmod(nanoseconds, NS)
+        return seconds.astype(np.float64) + remainder / float(NS)
+
     def __union__(self, other):
         """
         Return the union of the current set of intervals with some other set.
@@ -83,85 +155,123 @@ class TimeIntervalSet(HDF5_IO,
         Returns a new TimeIntervalSet instance without modifying the input
         arguments.
         """
-        if len(other) == 0:
-            return self.clone()
-        elif len(self) == 0:
-            return other.clone()
-        # iteratively union every interval in the other set into this set
-        result = self.clone()
-        for i in range(0, len(other)//2):
-            # this part is (mostly)  shared between set algebra methods
-            start  = other.to_ndarray()[2*i]
-            end    = other.to_ndarray()[2*i + 1]
-            bnds   = result.__left_and_right_bounds__(start, end)
-            left   = bnds[0] % 2
-            right  = bnds[1] % 2
-            npcat  = np.concatenate # give this a shorter name
-            # the conditional responses are unique to each set algebra method
-            if left == 0 and right == 1:
-                result._data = npcat((result.to_ndarray()[0:bnds[0]],
-                                      [start, end],
-                                      result.to_ndarray()[bnds[1]+1:]))
-            elif left == 0 and right == 0:
-                result._data = npcat((result.to_ndarray()[0:bnds[0]],
-                                      [start],
-                                      result.to_ndarray()[bnds[1]+1:]))
-            elif left == 1 and right == 1:
-                result._data = npcat((result.to_ndarray()[0:bnds[0]],
-                                      [end],
-                                      result.to_ndarray()[bnds[1]+1:]))
-            elif left == 1 and right == 0:
-                result._data = npcat((result.to_ndarray()[0:bnds[0]],
-                                      result.to_ndarray()[bnds[1]+1:]))
-            result.remove_empty_sets()
-        return result
+        return self._from_canonical(self.__sweep__(self._data, other._data,
+                                                   np.logical_or))
 
-    def to_ndarray(self):
+    @staticmethod
+    def __sweep__(a, b, operation):
         """
-        Return a numpy.ndarray whose value can be used as an argument to this
-        class's constructor to recreate an equivalent instance. For example,
+        Combine two sorted arrays of interval endpoints, a and b, using a
+        single sweep over all of their endpoints. Every endpoint in either
+        array is a point where membership in a or b can change; at each one,
+        membership in a and b over the stretch of time until the next
+        endpoint is found by binary search (a point is inside an interval set
+        if an odd number of its endpoints are at or before that point). The
+        boolean function ``operation(in_a, in_b)`` then gives membership in
+        the result, and the result's endpoints are the points where that
+        membership changes.
+
+        Since the result only has endpoints where membership changes, it never
+        contains empty intervals or abutting intervals that should have been
+        merged.
+        """
+        points = np.concatenate((a, b))
+        if len(points) == 0:
+            return points
+        points.sort()
+        points = points[np.concatenate(([True], points[1:] != points[:-1]))]
+        in_a = np.searchsorted(a, points, side='right') % 2 == 1
+        in_b = np.searchsorted(b, points, side='right') % 2 == 1
+        inside = operation(in_a, in_b)
+        return points[inside != np.concatenate(([False], inside[:-1]))]
 
-        >>> TimeIntervalSet(numpy.array([0,1])).to_ndarray()
-        array([ 0.,  1.])
+    @classmethod
+    def __union_all__(cls, instances):
         """
-        return self._data
+        Take the union of all of the TimeIntervalSets at once with a single
+        sort and sweep over their intervals.
+        """
+        for other in instances[1:]:
+            instances[0].assert_unionable(other)
+        return cls.__sweep_union__(instances, disjoint=False)
 
-    @staticmethod
-    def __find_frame_file_gps_start_time__(gps_time):
+    @classmethod
+    def disjoint_union_all(cls, instances):
         """
-        Get the GPS Time representing the START time of the frame file
-        containing data for the time represented by the argument, which
-        must also be in GPS Time format.
+        Take the union of a list of TimeIntervalSets which must not overlap
+        with one another; a ValueError is raised if any two of them do. Both
+        the union and the overlap check are done in a single sort and sweep
+        over all of the intervals, rather than by checking every pair of
+        TimeIntervalSets against each other.
+        """
+        instances = list(instances)
+        if len(instances) == 0:
+            raise ValueError('Need at least one instance to union.')
+        for instance in instances:
+            instance.assert_self_consistent()
+        for other in instances[1:]:
+            instances[0].assert_unionable(other)
+        return cls.__sweep_union__(instances, disjoint=True)
 
-        Frame files always start at times that are integer multiples of
-        64, so this is just a convenience function for rounding down to
-        the nearest multiple of 64.
+    @classmethod
+    def __sweep_union__(cls, instances, disjoint=False):
         """
-        ans = np.floor(gps_time / 64.) * 64
-        if ans % 1 != 0:
-            raise ValueError("Out of precision in floats, answer should be "
-                             "an integer")
-        return ans
+        Sort all intervals in the list of TimeIntervalSets by start time, then
+        merge each interval into the previous one if it starts before (or
+        right where) the furthest end time seen so far. If disjoint is True,
+        raise a ValueError if any interval starts strictly before that
+        furthest end time, since this means that two intervals overlap.
+        """
+        data = [i._data for i in instances]
+        starts = np.concatenate([d[0::2] for d in data])
+        ends = np.concatenate([d[1::2] for d in data])
+        return cls._from_canonical(cls.__merge__(starts, ends, disjoint))
 
     @staticmethod
-    def __find_frame_file_gps_end_time__(gps_time):
+    def __merge__(starts, ends, disjoint=False):
         """
-        Get the GPS Time representing the END time of the frame file
-        containing data for the time represented by the argument, which
-        must also be in GPS Time format.
+        Merge the (possibly overlapping and unsorted) intervals with the given
+        start and end times into a sorted array of endpoints. See
+        __sweep_union__.
+        """
+        if len(starts) == 0:
+            return np.array([], dtype=np.int64)
+        order = np.argsort(starts, kind='mergesort')
+        starts = starts[order]
+        furthest_ends = np.maximum.accumulate(ends[order])
+        if disjoint and np.any(starts[1:] < furthest_ends[:-1]):
+            raise ValueError('TimeIntervalSets have overlapping time '
+                             'intervals.')
+        # indices of the intervals which start a new merged interval
+        firsts = np.flatnonzero(np.concatenate((
+            [True], starts[1:] > furthest_ends[:-1])))
+        lasts = np.concatenate((firsts[1:] - 1, [len(starts) - 1]))
+        merged = np.empty(2 * len(firsts), dtype=np.int64)
+        merged[0::2] = starts[firsts]
+        merged[1::2] = furthest_ends[lasts]
+        return merged
 
-        Frame files always start at times that are integer multiples of
-        64, so this is just a convenience function for rounding up to
-        the nearest multiple of 64.
+    def to_ndarray(self):
         """
-        ans = np.ceil(gps_time / 64.) * 64
-        if ans % 1 != 0:
-            raise ValueError("Out of precision in floats, answer should "
-                             "be an integer")
-        return ans
+        Return a numpy.ndarray whose value can be used as an argument to this
+        class's constructor to recreate an equivalent instance. For example,
+
+        >>> TimeIntervalSet(numpy.array([0,1])).to_ndarray()
+        array([ 0.,  1.])
+        """
+        return self.__to_seconds__(self._data)
+
+    def to_nanoseconds(self):
+        """
+        Return the endpoints of this TimeIntervalSet as an int64 numpy.ndarray
+        of GPS nanoseconds. These are the exact values stored internally, and
+        can be used as an argument to from_nanoseconds to recreate an
+        equivalent instance.
+        """
+        return self._data
 
     @staticmethod
-    def tconvert(input_time):
+    def tconvert(input_time, lalapps=False):
         """
         Take either a numerical input (representing gps time) or a string input
         (representing UTC time) and return the opposite. For example:
@@ -178,9 +288,16 @@ class TimeIntervalSet(HDF5_IO,
 
         returns
 
-            'Oct 30 00:00:00 GMT 2015'
+            'Fri Oct 30 00:00:00 GMT 2015'
 
+        The conversion is done in-process by geco_stat.GPSTime. Set lalapps to
+        True to call lalapps_tconvert instead, in which case the string can be
+        in any format lalapps_tconvert understands.
         """
+        if not lalapps:
+            if type(input_time) is str:
+                return int(GPSTime.utc_strings_to_gps([input_time])[0])
+            return GPSTime.gps_to_utc_strings([input_time])[0]
         if type(input_time) is str:
             dump = subprocess.Popen(
                 ["lalapps_tconvert",str(input_time)], stdout=subprocess.PIPE)
@@ -196,18 +313,14 @@ class TimeIntervalSet(HDF5_IO,
         """
         Return a TimeIntervalSet that is a superset of of this TimeIntervalSet
         and which perfectly overlaps with the data contained in a set of frame
-        files. Since frame files start at times that are integer multiples of,
-        this is tantamount to rounding the start times up and the end times
-        down.
+        files. Since frame files start at times that are integer multiples of
+        64, this is tantamount to rounding the start times down and the end
+        times up.
         """
-        cls = type(self)
-        rounded_times = cls()
-        for i in range(0, len(self)//2):
-            rounded_times += cls([
-                cls.__find_frame_file_gps_start_time__(self.to_ndarray()[2*i]),
-                cls.__find_frame_file_gps_end_time__(self.to_ndarray()[2*i+1])
-            ])
-        return rounded_times
+        frame_ns = 64 * NS
+        starts = self._data[0::2] // frame_ns * frame_ns
+        ends = -(-self._data[1::2] // frame_ns) * frame_ns
+        return self._from_canonical(self.__merge__(starts, ends))
 
     def split_into_frame_file_intervals(self):
         """
@@ -224,21 +337,16 @@ class TimeIntervalSet(HDF5_IO,
         """
         if self.round_to_frame_times() != self:
             raise ValueError("Can only split a rounded time interval")
+        frame_ns = 64 * NS
         frame_intervals = []
         for i in range(0, len(self)//2):
-            if int(self.to_ndarray()[2*i]) != self.to_ndarray()[2*i]:
-                raise ValueError("Out of precision in floats, answer should "
-                                 "be an integer")
-            if int(self.to_ndarray()[2*i+1]) != self.to_ndarray()[2*i+1]:
-                raise ValueError("Out of precision in floats, answer should "
-                                 "be an integer")
-            for start_time in range(int(self.to_ndarray()[2*i]),
-                                    int(self.to_ndarray()[2*i+1]), 64):
-                frame_intervals.append(type(self)([start_time, start_time+64]))
+            for start in range(self._data[2*i], self._data[2*i+1], frame_ns):
+                frame_intervals.append(self._from_canonical(
+                    np.array([start, start + frame_ns], dtype=np.int64)))
         return frame_intervals
 
     @classmethod
-    def from_human_readable_strings(cls, readable_string_list):
+    def from_human_readable_strings(cls, readable_string_list, lalapps=False):
         """
         Take an iterable consisting of pairs of strings and return a timeseries
         corresponding to those times. The input iterable should be flat
@@ -248,8 +356,10 @@ class TimeIntervalSet(HDF5_IO,
             ['Oct 30 00:00:00 GMT 2015', 'Oct 30 00:02:00 GMT 2015']
 
         which will return a time interval corresponding to the given time
-        strings. The conversion to GPS is carried out by lalapps_tconvert,
-        so formatting must be comprehensible to that program.
+        strings. The strings are all converted to GPS at once by
+        geco_stat.GPSTime.utc_strings_to_gps, so they must be in one of the
+        formats listed in geco_stat.GPSTime.UTC_PARSE_FORMATS. Set lalapps to
+        True to convert them with lalapps_tconvert instead.
 
         Note that no rounding occurs, so if you are going to use these times
         to find gravitational wave frame files, you should not use the resulting
@@ -257,13 +367,14 @@ class TimeIntervalSet(HDF5_IO,
         gravitational wave frame file start times (like using
         self.round_to_frame_times).
         """
-        times = []
         for s in readable_string_list:
             if not isinstance(s, str):
                 raise ValueError('from_human_readable_strings() must use '
                                  'strings as input')
-            times.append(cls.tconvert(s))
-        return cls(times)
+        if not lalapps:
+            return cls(GPSTime.utc_strings_to_gps(readable_string_list))
+        return cls([cls.tconvert(s, lalapps=True)
+                    for s in readable_string_list])
 
     def intersection(self, other):
         """
@@ -275,34 +386,8 @@ class TimeIntervalSet(HDF5_IO,
         """
         self.assert_self_consistent()
         other.assert_self_consistent()
-        if len(other) == 0 or len(self) == 0:
-            return TimeIntervalSet()
-        result = TimeIntervalSet()
-        for i in range(0, len(other)//2):
-            # this part is (mostly)  shared between set algebra methods
-            start  = other.to_ndarray()[2*i]
-            end    = other.to_ndarray()[2*i + 1]
-            bnds   = self.__left_and_right_bounds__(start, end) # this differs
-            left   = bnds[0] % 2
-            right  = bnds[1] % 2
-            npcat  = np.concatenate # give this a shorter name
-            # the conditional responses are unique to each set algebra method
-            if left == 0 and right == 1:
-                result._data = npcat((result.to_ndarray(),
-                                      self.to_ndarray()[bnds[0]:bnds[1]+1]))
-            elif left == 0 and right == 0:
-                result._data = npcat((result.to_ndarray(),
-                                      self.to_ndarray()[bnds[0]:bnds[1]+1],
-                                      [end]))
-            elif left == 1 and right == 1:
-                result._data = npcat((result.to_ndarray(), [start],
-                                      self.to_ndarray()[bnds[0]:bnds[1]+1]))
-            elif left == 1 and right == 0:
-                result._data = npcat((result.to_ndarray(), [start],
-                                      self.to_ndarray()[bnds[0]:bnds[1]+1],
-                                      [end]))
-            result.remove_empty_sets()
-        return result
+        return self._from_canonical(self.__sweep__(self._data, other._data,
+                                                   np.logical_and))
 
     def complement_with_respect_to(self, other):
         """
@@ -315,61 +400,12 @@ class TimeIntervalSet(HDF5_IO,
         """
         self.assert_self_consistent()
         other.assert_self_consistent()
-        if self.union(other) != other:
+        if len(self.__sweep__(self._data, other._data,
+                              lambda s, o: s & ~o)) != 0:
             raise ValueError('Can only take complement with respect to a '
                              'superset.')
-        if len(self) == 0:
-            return other
-        result = TimeIntervalSet()
-        for i in range(0, len(other)//2):
-            # this part is (mostly)  shared between set algebra methods
-            start  = other.to_ndarray()[2*i]
-            end    = other.to_ndarray()[2*i + 1]
-            bnds   = self.__left_and_right_bounds__(start, end) # this differs
-            left   = bnds[0] % 2
-            right  = bnds[1] % 2
-            npcat  = np.concatenate # give this a shorter name
-            # the conditional responses are unique to each set algebra method
-            if left == 0 and right == 1:
-                result._data = npcat((result.to_ndarray(), [start],
-                                      self.to_ndarray()[bnds[0]:bnds[1]+1],
-                                      [end]))
-            elif left == 0 and right == 0:
-                result._data = npcat((result.to_ndarray(), [start],
-                                      self.to_ndarray()[bnds[0]:bnds[1]+1]))
-            elif left == 1 and right == 1:
-                result._data = npcat((result.to_ndarray(),
-                                      self.to_ndarray()[bnds[0]:bnds[1]+1],
-                                      [end]))
-            elif left == 1 and right == 0:
-                result._data = npcat((result.to_ndarray(),
-                                      self.to_ndarray()[bnds[0]:bnds[1]+1]))
-            result.remove_empty_sets()
-        return result
-
-    def __left_and_right_bounds__(self, a, b):
-        """
-        Used when merging an individual interval [a, b) into an existing
-        TimeIntervalSet S. S must, implicitly, be sorted, of even length, and
-        contain numerical data.
-
-        This function returns a list L of length 2, such that:
-
-            L[0] = index of leftmost value in S greater than or equal to a
-            L[1] = index of rightmost value in S less than or equal to a
-
-        L is then used to determine a merge strategy for the union,
-        intersection, or complement of S with respect to [a, b).
-
-        For the sake of simplicity of implementation, this function only accepts
-        positive even length lists of start and end points. In other words, an
-        error will be raised if the user tries passing an empty TimeIntervalSet.
-        """
-        if len(self.to_ndarray()) == 0:
-            raise ValueError('Cannot use an empty TimeIntervalSet.')
-        l = bisect.bisect_left(self.to_ndarray(), a)
-        r = bisect.bisect_right(self.to_ndarray(), b) - 1
-        return [l, r]
+        return self._from_canonical(self.__sweep__(self._data, other._data,
+                                                   lambda s, o: o & ~s))
 
     def remove_empty_sets(self):
         """
@@ -389,12 +425,14 @@ class TimeIntervalSet(HDF5_IO,
         is empty, and can simply be removed.
         """
         self.assert_self_consistent() # check
-        i = 0
-        while i < len(self.to_ndarray()) - 1:
-            if self.to_ndarray()[i] == self.to_ndarray()[i+1]:
-                self._data = np.delete(self.to_ndarray(), np.s_[i:i+2])
-            else:
-                i += 1           # not a copy, move on to the next one
+        data = self._data
+        if len(data) == 0:
+            return
+        # each run of k equal endpoints is replaced by k % 2 copies of it
+        run_starts = np.concatenate(([True], data[1:] != data[:-1]))
+        run_ids = np.cumsum(run_starts) - 1
+        run_lengths = np.bincount(run_ids)
+        self._data = data[run_starts & (run_lengths[run_ids] % 2 == 1)]
 
     def assert_unionable(self, other):
         if type(self) != type(other):
@@ -406,31 +444,48 @@ class TimeIntervalSet(HDF5_IO,
 
     def assert_self_consistent(self):
         'Check that this instance has form consistent with the class spec'
-        if type(self.to_ndarray()) != np.ndarray:
+        if type(self._data) != np.ndarray:
             raise Exception('TimeIntervalSet corrupted: '
                             'data not a numpy.ndarray')
-        elif not np.array_equal(sorted(self.to_ndarray()), self.to_ndarray()):
+        elif self._data.dtype != np.int64:
+            raise Exception('TimeIntervalSet corrupted: '
+                            'data not int64 nanoseconds')
+        elif np.any(self._data[1:] < self._data[:-1]):
             raise Exception('TimeIntervalSet corrupted: data not sorted')
-        elif len(self.to_ndarray()) % 2 != 0:
+        elif len(self._data) % 2 != 0:
             raise Exception('TimeIntervalSet corrupted: odd number '
                             'of endpoints')
         return True
 
-    def __clone__(self):
-        return type(self)(self.to_ndarray())
-
     def combined_length(self):
         'Get the combined length of all time intervals in this TimeIntervalSet.'
-        if len(self.to_ndarray()) == 0:
+        if len(self._data) == 0:
             return 0
-        starts = self.to_ndarray()[0::2]
-        ends   = self.to_ndarray()[1::2]
-        length = 0
-        for i in range(0, len(starts)):
-            length += ends[i] - starts[i]
-        return length
+        return self.__to_seconds__(np.sum(self._data[1::2] -
+                                          self._data[0::2]))
+
+    def times_at_offsets(self, offsets):
+        """
+        Return the GPS times lying the given numbers of seconds into this
+        TimeIntervalSet, counting only the time covered by its intervals. For
+        example, row i of a Timeseries covering this TimeIntervalSet holds
+        the data for the second starting at times_at_offsets(i).
 
-    def human_readable_dates(self):
+        >>> TimeIntervalSet([0,4,64,68]).times_at_offsets([0, 3, 4, 7])
+        array([  0.,   3.,  64.,  67.])
+        """
+        offsets = self.__to_nanoseconds__(np.asarray(offsets).reshape(-1))
+        starts = self._data[0::2]
+        lengths = self._data[1::2] - starts
+        ends = np.cumsum(lengths)
+        indices = np.searchsorted(ends, offsets, side='right')
+        if np.any(offsets < 0) or np.any(indices >= len(ends)):
+            raise ValueError('Offsets must lie within the combined length of '
+                             'the TimeIntervalSet')
+        return self.__to_seconds__(
+            starts[indices] + offsets - (ends[indices] - lengths[indices]))
+
+    def human_readable_dates(self, lalapps=False):
         """
         Print the contained time intervals in an immediately human-readable
         form, assuming that the time endpoints that comprise this instance
@@ -443,35 +498,44 @@ class TimeIntervalSet(HDF5_IO,
             [Sun Jan 03 03:00:00 GMT 2016, Sun Jan 03 03:00:02 GMT 2016) U
             [Sun Jan 03 03:00:03 GMT 2016, Sun Jan 03 03:00:05 GMT 2016)
 
+        All endpoints are converted at once by geco_stat.GPSTime; set lalapps
+        to True to convert them one at a time with lalapps_tconvert instead.
         """
-        times = [str(int(x)) for x in self.to_ndarray()]
         self.assert_self_consistent()
+        if not lalapps:
+            dates = GPSTime.gps_to_utc_strings(self._data // NS)
+        else:
+            dates = []
+            for time in [str(int(x)) for x in self._data // NS]:
+                dump = subprocess.Popen(
+                    ["lalapps_tconvert",time], stdout=subprocess.PIPE)
+                dates.append(dump.communicate()[0][:-1].decode())
         tstring = ""
-        i = 0
-        for time in times:
-            dump = subprocess.Popen(
-                ["lalapps_tconvert",time], stdout=subprocess.PIPE)
-            if i == 0:
-                tstring += '[' + dump.communicate()[0][:-1] + ', '
-                i = 1
-            else:
-                tstring += dump.communicate()[0][:-1] + ') U\n'
-                i = 0
+        for i in range(0, len(dates)//2):
+            tstring += '[' + dates[2*i] + ', ' + dates[2*i+1] + ') U\n'
         tstring = tstring[:-3] # shave off the last U character and newline
         return tstring
 
     @classmethod
     def __from_dict__(cls, d):
-        return cls(d['data'])
+        # older files store endpoints as float seconds under 'data'
+        if 'data_ns' in d:
+            data = np.asarray(d['data_ns'], dtype=np.int64)
+            # strictly increasing endpoints are canonical; anything else is
+            # checked, and cleared of empty and abutting intervals
+            if len(data) % 2 != 0 or np.any(data[1:] <= data[:-1]):
+                return cls.from_nanoseconds(data)
+            return cls._from_canonical(data)
+        return cls(np.array(d['data']))
 
     def __to_dict__(self):
-        return {'data': np.array(self.to_ndarray())}
+        return {'data_ns': np.array(self._data)}
 
     def __eq__(self, other):
-        return np.array_equal(self.to_ndarray(), other.to_ndarray())
+        return np.array_equal(self._data, other._data)
 
     def __len__(self):
-        return len(self.to_ndarray())
+        return len(self._data)
 
     def __mul__(self, other):
         'Multiplication can be used as a shorthand for intersection.'
@@ -509,7 +573,8 @@ class TimeIntervalSet(HDF5_IO,
 
     def __repr__(self):
         self.assert_self_consistent()
-        return __name__ + '.TimeIntervalSet(' + repr(list(self._data)) + ')'
+        return (__name__ + '.TimeIntervalSet(' +
+                repr(self.to_ndarray().tolist()) + ')')
 
     # TODO this shouldn't circularly Timeseries class... not elegant
     def from_timeseries(self, timeseries):
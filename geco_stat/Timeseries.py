@@ -6,6 +6,9 @@ import numpy as np      # >=1.10.4
 from geco_stat._constants import __default_bitrate__
 from geco_stat.Exceptions import MissingChannelDataException
 from geco_stat.Time import TimeIntervalSet
+from geco_stat.Frame import AbstFrameReader
+from geco_stat.Frame import GWDataFindLocator
+from geco_stat.Frame import get_frame_reader
 
 
 class Timeseries(np.ndarray):
@@ -18,21 +21,72 @@ class Timeseries(np.ndarray):
     def from_time_and_channel_name(
         cls,
         channel_name,
-        time_interval,
-        bitrate=__default_bitrate__
+        time_intervals,
+        bitrate=__default_bitrate__,
+        reader=None,
+        locator=None
     ):
         """
-        Load a timeseries using this channel_name and time_interval.
-
-        The time_interval argument must, at the moment, correspond to a single
-        gravitational wave frame file. Future implementations might change this.
+        Load a timeseries using this channel_name and time_intervals.
+
+        The time_intervals argument can be any TimeIntervalSet whose endpoints
+        are whole GPS seconds. Every frame file covering it is located and
+        read, and the data is assembled into a single array with one row per
+        second in time_intervals. Frame files that are only partially covered
+        by time_intervals are trimmed to fit. The output array is allocated
+        once, and frame files that are fully covered are read directly into
+        it, so no concatenation copies are made.
+
+        All frame files are located up front in a single batch by the
+        ``locator``, an AbstFrameLocator which defaults to a GWDataFindLocator
+        backed by the default on-disk frame path cache. A
+        MissingChannelDataException is raised if any frame file can't be
+        found.
         """
-        frame_path = cls.locate_frame_file(channel_name, time_interval)
-        return cls.from_frame_file(
-            channel_name,
-            frame_path,
-            time_interval,
-            bitrate)
+        if not isinstance(reader, AbstFrameReader):
+            reader = get_frame_reader(reader)
+        if locator is None:
+            locator = GWDataFindLocator()
+        times = time_intervals.to_ndarray()
+        if not np.array_equal(np.floor(times), times):
+            raise ValueError('time_intervals must start and end on whole '
+                             'GPS seconds')
+        ans = np.empty((int(time_intervals.combined_length()),
+                        bitrate)).view(cls)
+        frame_paths = locator.locate_frame_files(channel_name, time_intervals)
+        frame_buffer = None
+        row = 0
+        for frame in (time_intervals.round_to_frame_times()
+                      .split_into_frame_file_intervals()):
+            wanted = time_intervals.intersection(frame)
+            if len(wanted) == 0:
+                continue
+            frame_start = int(frame.to_ndarray()[0])
+            if frame_start not in frame_paths:
+                raise MissingChannelDataException(
+                    'No frame file found starting at %d' % frame_start)
+            frame_path = frame_paths[frame_start]
+            if wanted == frame:
+                num_sec = int(frame.combined_length())
+                reader.read_channel(channel_name, frame_path,
+                                    out=ans[row:row+num_sec])
+                row += num_sec
+                continue
+            # read the whole frame into a reusable buffer and copy out only
+            # the seconds that are wanted
+            if frame_buffer is None:
+                frame_buffer = np.empty((int(frame.combined_length()),
+                                         bitrate))
+            reader.read_channel(channel_name, frame_path, out=frame_buffer)
+            bounds = wanted.to_ndarray()
+            for i in range(0, len(bounds)//2):
+                start = int(bounds[2*i] - frame_start)
+                end = int(bounds[2*i+1] - frame_start)
+                ans[row:row+end-start] = frame_buffer[start:end]
+                row += end - start
+        ans.time_intervals = time_intervals.clone()
+        ans.bitrate = bitrate
+        return ans
 
     @classmethod
     def from_frame_file(
@@ -40,40 +94,30 @@ class Timeseries(np.ndarray):
         channel_name,
         path,
         time_intervals,
-        bitrate=__default_bitrate__
+        bitrate=__default_bitrate__,
+        reader=None
     ):
         """
         Load channel from file path to array.
 
-        If a channel doesn't exist within the
-        frame file located at the specified path, this function will return
-        None. Otherwise, it returns an ndarray with one row for each second of
-        data in the frame file.
-        """
+        If a channel doesn't exist within the frame file located at the
+        specified path, this function will raise a
+        MissingChannelDataException. Otherwise, it returns an ndarray with one
+        row for each second of data in the frame file.
 
-        # make sure path exists
-        if not os.path.exists(path):
-            raise ValueError('Path does not exist: ' + path)
-
-        # set up the processes for acquiring and processing the data
-        dump = subprocess.Popen(
-            ["framecpp_dump_channel","--channel",channel_name,path],
-            stdout=subprocess.PIPE)
-        data_string = dump.communicate()[0]
-        # print(now() + ' Timeseries retrieved, beginning processing.')
-
-        # remove headers from the data
-        formatted_data_string = cls.__remove_header_and_text__(data_string)
-
-        # if the string is empty, the channel didn't exist. return None.
-        if formatted_data_string == '':
-            raise MissingChannelDataException()
+        The ``reader`` argument selects the frame reader backend by name (see
+        ``geco_stat.Frame.get_frame_reader``). By default, the fastest
+        available backend is used.
+        """
+        if not isinstance(reader, AbstFrameReader):
+            reader = get_frame_reader(reader)
 
         # instantiate numpy array and return it; will have number of rows equal
         # to the number of seconds in a frame file and number of columns equal
         # to the bitrate of the channel.
-        ans = np.fromstring(formatted_data_string, sep=',').reshape(
-            (64, bitrate)).view(cls)
+        ans = np.empty((int(time_intervals.combined_length()),
+                        bitrate)).view(cls)
+        reader.read_channel(channel_name, path, out=ans)
         ans.time_intervals = time_intervals
         ans.bitrate = bitrate
         return ans
@@ -121,33 +165,3 @@ class Timeseries(np.ndarray):
             raise Exception('gw_data_find returned faulty ' +
                             'path:\n\t %s' % frame_path)
         return frame_path
-
-    @staticmethod
-    def __remove_lines__(string, num_lines):
-        """
-        remove first n lines of a string
-        """
-        i = 0
-        n = 0
-        l = len(string)
-        while n < num_lines:
-            i = string.find('\n', i+1)
-            # if a newline isn't found, this means there are no new lines left.
-            if i == -1:
-                return ""
-            # if the string ends on a newline, return empty string.
-            elif i+1 == l:
-                return ""
-            n += 1
-        return string[i+1:]
-
-    @classmethod
-    def __remove_header_and_text__(cls, string):
-        """
-        Delete first 6 lines; all spaces; and the word 'Data:' which precedes
-        the numerical data.
-
-        (This replaces sed and tr in the original implementation with native
-        python.)
-        """
-        return cls.__remove_lines__(string, 6).translate(None, 'Dat: ')
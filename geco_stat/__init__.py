@@ -1,7 +1,13 @@
 # -*- coding: utf-8 -*-
 
+import io
 import os
 import abc
+import shutil
+import tempfile
+import subprocess
+import warnings
+import h5py             # >=2.5.0
 import numpy as np      # >=1.10.4
 from geco_stat._version import __version__, __release__
 from geco_stat._constants import __default_bitrate__
@@ -13,10 +19,26 @@ from geco_stat.Report import AbstReport
 from geco_stat.Data import AbstData
 from geco_stat.Data import Statistics
 from geco_stat.Data import Histogram
+from geco_stat.Data import SparseHistogram
+from geco_stat.Data import MultiResolutionHistogram
+from geco_stat.Data import QuantileSketch
 from geco_stat.Time import TimeIntervalSet
 from geco_stat.Timeseries import Timeseries
+from geco_stat.ReportSet import ReportSet
+from geco_stat.Pipeline import ReportSetPipeline
+from geco_stat.Pipeline import tree_union
+from geco_stat import Frame
+from geco_stat import GPSTime
+from geco_stat.Frame import get_frame_reader
+from geco_stat._benchmarks import run_benchmarks
 
 def run_unit_tests():
+    # a simple report class made of a Histogram and Statistics, and a frame
+    # reader and locator serving made-up frame files
+    from geco_stat._benchmarks import BenchmarkReport
+    from geco_stat._benchmarks import SyntheticFrameReader
+    from geco_stat._benchmarks import SyntheticFrameLocator
+
     print('Testing class initializations.')
     Timeseries((16384,))
     TimeIntervalSet()
@@ -32,7 +54,38 @@ def run_unit_tests():
     assert ti([66,69]) + ti([70,72]) == ti([66,69,70,72]), "Union failing"
     assert ti([66,73]) - ti([67,72]) == ti([66,67,72,73]), "Complement failing"
     assert ti([66,73]) - ti([66,73]) == ti(), "Complement failing"
-    # TODO: Add some more arithmetic assertions.
+    assert ti([66,69,72,75]) + ti([69,72]) == ti([66,75]), "Union failing"
+    assert ti([66,69,72,75]) * ti([68,73]) == ti([68,69,72,73]), \
+        "Intersection failing"
+    assert ti([66,69]) * ti([69,72]) == ti(), "Intersection failing"
+    assert ti() + ti([66,69]) == ti([66,69]), "Union failing"
+    assert ti([60,80]) - ti() == ti([60,80]), "Complement failing"
+    try:
+        ti([66,70]) - ti([67,72])
+        raise AssertionError('Should not be able to take complement with '
+                             'respect to a non-superset')
+    except ValueError:
+        pass
+
+    print('Testing union of many instances at once.')
+    assert ti.union_all([ti([0,1]), ti([4,5]), ti([1,2]), ti([3,6])]) == \
+        ti([0,2,3,6]), "Union of many TimeIntervalSets failing"
+    try:
+        ti.disjoint_union_all([ti([0,2]), ti([4,5]), ti([1,3])])
+        raise AssertionError('Should not be able to take disjoint union of '
+                             'overlapping TimeIntervalSets')
+    except ValueError:
+        pass
+
+    print('Testing tree reduction of unionable instances.')
+    assert tree_union([ti([0,1]), ti([4,5]), ti([1,2]), ti([3,4])]) == \
+        ti([0,2,3,5]), "Tree reduction failing"
+
+    try:
+        tree_union([])
+        raise AssertionError('Should not be able to reduce nothing')
+    except ValueError:
+        pass
 
     print('Testing TimeIntervalSet frame time rounding.')
     assert ti([65,124]).round_to_frame_times() == ti([64, 128]), \
@@ -57,6 +110,355 @@ def run_unit_tests():
     except ValueError:
         pass
 
+    print('Testing TimeIntervalSet nanosecond precision.')
+    gps = 1126259462 * 10**9
+    ns = ti.from_nanoseconds([gps + 1, gps + 3, gps + 3, gps + 7])
+    assert np.array_equal(ns.to_nanoseconds(), [gps + 1, gps + 7]), \
+        'Sub-second GPS times are losing precision'
+    assert ns.combined_length() == 6e-9, \
+        'Time interval total length calculations are off'
+    assert ti.from_dict(ns.to_dict()) == ns, 'Round trip through dict failing'
+    old_dict = {'data': np.array([64., 128.]), 'version': ti.__version__,
+                'class': 'TimeIntervalSet'}
+    assert ti.from_dict(old_dict) == ti([64,128]), \
+        'Cannot load float-based TimeIntervalSet dicts'
+    abutting = dict(ns.to_dict(),
+                    data_ns=np.array([0, 1, 1, 1, 1, 2]) * 10**9)
+    assert ti.from_dict(abutting) == ti([0, 2]), \
+        'Loading non-canonical TimeIntervalSet dicts failing'
+    for bad in [0, 1, 3], [0, 2, 1, 3]:
+        try:
+            ti.from_dict(dict(ns.to_dict(), data_ns=np.array(bad) * 10**9))
+            raise AssertionError('Should not be able to load malformed '
+                                 'TimeIntervalSet dicts')
+        except ValueError:
+            pass
+
+    print('Testing GPS to UTC conversion.')
+    assert ti.tconvert('Oct 30 00:00:00 GMT 2015') == 1130198417, \
+        'UTC to GPS conversion failing'
+    assert GPSTime.gps_to_utc_strings([1167264016, 1167264018]) == [
+        'Sat Dec 31 23:59:59 GMT 2016', 'Sun Jan 01 00:00:00 GMT 2017'], \
+        'GPS to UTC conversion failing across a leap second'
+    dates = ['Sun Jan 03 03:00:00 GMT 2016', 'Sun Jan 03 03:00:02 GMT 2016']
+    assert ti.from_human_readable_strings(dates) == \
+        ti([1135825217,1135825219]), 'UTC string parsing failing'
+    assert ti([1135825217,1135825219]).human_readable_dates() == \
+        '[' + ', '.join(dates) + ')', 'Human readable dates failing'
+
+    print('Testing Histogram binning.')
+    hist = Histogram(hist_range=(-1, 1), hist_num_bins=4, bitrate=8)
+    values = np.random.RandomState(0).uniform(-1.5, 1.5, (16, 8))
+    values[0] = [-1, -0.5, 0, 0.5, 1, np.nan, np.inf, -np.inf]
+    series = values.view(Timeseries)
+    series.time_intervals = ti([0,16])
+    series.bitrate = 8
+    assert np.array_equal(hist.from_timeseries(series).hist, np.histogram2d(
+        values.flatten(), np.tile(hist.t_ticks[:-1], 16),
+        bins=[hist.hist_bins, hist.t_ticks])[0]), 'Histogram binning failing'
+    binned = hist.from_timeseries(series) + hist.from_timeseries(series)
+    assert np.array_equal(binned.underflow, 2 * (values < -1).sum(0)) and \
+        np.array_equal(binned.overflow, 2 * (values > 1).sum(0)) and \
+        np.array_equal(binned.nans, 2 * np.isnan(values).sum(0)), \
+        'Histogram out of range counts failing'
+    assert Histogram.from_dict(binned.to_dict()) == binned, \
+        'Round trip of Histogram through dict failing'
+
+    print('Testing adaptive Histogram count types.')
+    full = Histogram(hist=np.ones((4, 8), dtype=np.int64) * 200,
+                     hist_range=(-1, 1), hist_num_bins=4, bitrate=8)
+    assert full.hist.dtype == np.uint8 and (full + full).hist.dtype == \
+        np.uint16 and np.all((full + full).hist == 400), \
+        'Histogram count types are not being promoted'
+    assert Histogram.union_all([full] * 400).hist.dtype == np.uint32, \
+        'Histogram count types are not being promoted'
+
+    print('Testing sparse Histogram storage.')
+    sparse = SparseHistogram(hist_range=(-1, 1), hist_num_bins=4, bitrate=8)
+    sparse = sparse.from_timeseries(series) + sparse.from_timeseries(series)
+    dense = hist.from_timeseries(series) + hist.from_timeseries(series)
+    assert np.array_equal(sparse.hist, dense.hist), 'Sparse binning failing'
+    assert sparse.to_dense() == dense and dense.to_sparse() == sparse, \
+        'Sparse and dense Histogram conversion failing'
+    assert SparseHistogram.from_dict(sparse.to_dict()) == sparse, \
+        'Round trip of SparseHistogram through dict failing'
+
+    print('Testing in-place accumulation.')
+    series = values[1:].view(Timeseries)
+    series.time_intervals = ti([1,16])
+    series.bitrate = 8
+    for empty in hist, Statistics(bitrate=8):
+        folded = empty.from_timeseries(series) + empty.from_timeseries(series)
+        accumulated = empty.clone().accumulate(series).accumulate(series)
+        assert accumulated == folded, 'In-place accumulation failing'
+    # counts are updated through flat views, which only works if they are
+    # kept C-contiguous
+    fortran = Histogram(hist=np.asfortranarray(np.zeros((4, 8), np.int64)),
+                        hist_range=(-1, 1), hist_num_bins=4, bitrate=8)
+    multi = MultiResolutionHistogram(hist_range=(-1, 1), hist_num_bins=4,
+                                     num_levels=3, zoom=2, bitrate=8)
+    multi = MultiResolutionHistogram(
+        hist=np.asfortranarray(multi.hist), hist_range=(-1, 1),
+        hist_num_bins=4, num_levels=3, zoom=2, bitrate=8)
+    sketch = QuantileSketch(bitrate=8)
+    sketch = QuantileSketch(counts=np.asfortranarray(sketch.counts),
+                            bitrate=8)
+    for empty in fortran, multi, sketch:
+        folded = empty.from_timeseries(series) + empty.from_timeseries(series)
+        # empty itself last, since it is modified
+        for start in empty + empty, empty.union_all([empty] * 3), empty:
+            assert start.accumulate(series).accumulate(series) == folded, \
+                'In-place accumulation into Fortran order failing'
+
+    report = BenchmarkReport(bitrate=8)
+    shifted = ti([101, 116])
+    folded = report.fold_in_timeseries(series, shifted, 8)
+    accumulated = report.accumulate(series, shifted)
+    assert accumulated == folded and accumulated.time_intervals == shifted \
+        and np.all(accumulated.statistics.max_time >= 101), \
+        'In-place accumulation of reports failing'
+    try:
+        accumulated.accumulate(series, ti([110, 125]))
+        raise AssertionError('Should not be able to accumulate overlapping '
+                             'time intervals into a report')
+    except ValueError:
+        pass
+
+    print('Testing clones and copy-on-write sharing.')
+    for empty in hist, SparseHistogram(hist_range=(-1, 1), hist_num_bins=4,
+                                       bitrate=8), Statistics(bitrate=8):
+        original = empty.from_timeseries(series)
+        cloned, shared = original.clone(), original.share()
+        assert cloned == original and shared == original, 'Cloning failing'
+        shared.accumulate(series)
+        assert original == cloned and shared != original, \
+            'Copy-on-write failing'
+        original.accumulate(series)
+        assert original == shared, 'Copy-on-write failing'
+    # constructors share their arguments, making the arrays read-only
+    frozen = ti([0, 1])
+    BenchmarkReport(bitrate=8, time_intervals=frozen)
+    assert not frozen.to_nanoseconds().flags.writeable, \
+        'Constructor arguments not shared'
+    assert frozen == ti([0, 1]) and frozen + ti([1, 2]) == ti([0, 2]), \
+        'Shared constructor arguments not usable'
+
+    print('Testing multi-resolution Histograms.')
+    multi = MultiResolutionHistogram(hist_range=(-1, 1), hist_num_bins=4,
+                                     num_levels=3, zoom=2, bitrate=8)
+    multi = multi.from_timeseries(series) + multi.from_timeseries(series)
+    for level, level_hist in enumerate(multi.to_histograms()):
+        single = Histogram(hist_range=multi.level_range(level),
+                           hist_num_bins=4, bitrate=8)
+        single = (single.from_timeseries(series) +
+                  single.from_timeseries(series))
+        assert np.array_equal(level_hist.hist, single.hist), \
+            'Multi-resolution Histogram binning failing'
+    assert MultiResolutionHistogram.from_dict(multi.to_dict()) == multi, \
+        'Round trip of MultiResolutionHistogram through dict failing'
+    assert MultiResolutionHistogram.union_all([multi] * 3) == \
+        multi + multi + multi, 'Union of many Histograms failing'
+
+    print('Testing quantile sketches.')
+    sketch = QuantileSketch(relative_accuracy=0.01, bitrate=8)
+    sketch = sketch.from_timeseries(series) + sketch.from_timeseries(series)
+    exact = np.sort(np.concatenate((values[1:], values[1:])), 0)
+    for q in 0, 0.5, 0.9, 1:
+        expected = exact[int(q * (len(exact) - 1))]
+        assert np.all(np.abs(sketch.quantile(q) - expected) <=
+                      0.01 * np.abs(expected) + 1e-3), \
+            'Quantile sketch estimates out of bounds'
+    assert QuantileSketch.from_dict(sketch.to_dict()) == sketch, \
+        'Round trip of QuantileSketch through dict failing'
+    single = sketch.from_timeseries(series)
+    assert QuantileSketch.union_all([single] * 4) == sketch + sketch and \
+        QuantileSketch.union_all([single]) == single, \
+        'Union of many quantile sketches failing'
+
+    print('Testing Statistics moments.')
+    offset = 1e9 + np.random.RandomState(1).normal(0, 1, (64, 8))
+    parts = []
+    for i in range(0, 64, 16):
+        part = offset[i:i+16].view(Timeseries)
+        part.time_intervals = ti([i,i+16])
+        part.bitrate = 8
+        parts.append(Statistics(bitrate=8).from_timeseries(part))
+    stats = Statistics.union_all(parts)
+    assert np.allclose(stats.mean(), offset.mean(0), rtol=0, atol=1e-6) and \
+        np.allclose(stats.var(), offset.var(0), rtol=1e-6), \
+        'Statistics moments are inaccurate'
+    assert np.allclose((parts[0] + parts[1] + parts[2] + parts[3]).var(1),
+                       offset.var(0, ddof=1), rtol=1e-6), \
+        'Statistics union is inaccurate'
+    argmax = offset.argmax(0)
+    assert np.array_equal(stats.max, offset.max(0)) and \
+        np.array_equal(stats.max_time, argmax) and \
+        np.array_equal(stats.min_time, offset.argmin(0)), \
+        'Statistics extrema or their times are wrong'
+    rows = np.r_[0:32, 48:64]
+    assert np.array_equal((parts[3] + parts[1] + parts[0]).min_time,
+                          rows[offset[rows].argmin(0)]), \
+        'Statistics extrema times are not surviving unions'
+    old_dict = {'sum': np.arange(8.) * 4, 'sum_sq': np.arange(8.)**2 * 4 + 4,
+                'max': np.zeros(8), 'min': np.zeros(8), 'num': 4,
+                'bitrate': 8, 'version': Statistics.__version__,
+                'class': 'Statistics'}
+    assert np.allclose(Statistics.from_dict(old_dict).var(), 1), \
+        'Cannot load sum-based Statistics dicts'
+
+    print('Testing framecpp_dump_channel output parsing.')
+    dump_reader = Frame.FrameCppDumpReader
+    dump = b'1\n2\n3\n4\n5\n6\nData: 1.5, -2, 3e-05\n'
+    assert dump_reader.__remove_header_and_text__(dump) == b'1.5,-2,3e-05', \
+        'Header and text are not being removed from channel dumps'
+    assert dump_reader.__remove_header_and_text__(b'1\n2\n') == b'', \
+        'Dumps of missing channels should come out empty'
+    streamed = np.zeros((1, 3))
+    dump_reader.__parse_stream__(io.BytesIO(dump), streamed, chunk_size=4)
+    assert np.array_equal(streamed, [[1.5, -2, 3e-05]]), \
+        'Streaming parser does not match the buffered parser'
+    if os.name == 'posix':
+        # a stand-in for framecpp_dump_channel printing the dump, then failing
+        dump_dir = tempfile.mkdtemp()
+        saved_path = os.environ.get('PATH', '')
+        try:
+            script = os.path.join(dump_dir, 'framecpp_dump_channel')
+            os.environ['PATH'] = dump_dir + os.pathsep + saved_path
+            for status in 0, 1:
+                with open(script, 'w') as script_file:
+                    script_file.write("#!/bin/sh\nprintf '%s'\nexit %d\n"
+                                      % (dump.decode(), status))
+                os.chmod(script, 0o755)
+                for streaming in True, False:
+                    reader = dump_reader(streaming=streaming)
+                    try:
+                        read = reader.read_channel('H1:FAKE', script)
+                        assert status == 0 and np.array_equal(
+                            read, [1.5, -2, 3e-05]), \
+                            'Reading framecpp_dump_channel output failing'
+                    except subprocess.CalledProcessError:
+                        assert status != 0, 'framecpp_dump_channel failing'
+        finally:
+            os.environ['PATH'] = saved_path
+            shutil.rmtree(dump_dir)
+
+    print('Testing frame file discovery in a local directory tree.')
+    frame_dir = tempfile.mkdtemp()
+    try:
+        for gps_start in (0, 64, 192):
+            open(os.path.join(frame_dir, 'H-H1_R-%d-64.gwf' % gps_start),
+                 'w').close()
+        cache = Frame.FramePathCache(os.path.join(frame_dir, 'cache'))
+        locator = Frame.DirectoryFrameLocator(frame_dir, cache=cache)
+        paths = locator.locate_frame_files('H1:GDS-FAKE', ti([10, 200]))
+        assert sorted(paths) == [0, 64, 192], 'Frame files not found'
+        assert cache.load('H', 'H1_R') == paths, 'Frame paths not cached'
+        cache.invalidate('H')
+        assert cache.load('H', 'H1_R') == {}, 'Frame path cache not cleared'
+    finally:
+        shutil.rmtree(frame_dir)
+
+    print('Testing the ReportSet pipeline.')
+    def assert_report_sets_match(a, b, message):
+        # Statistics are unioned in whatever order the frames come back in,
+        # so they are only compared up to rounding
+        assert a.time_intervals == b.time_intervals and \
+            a.missing_times == b.missing_times, message
+        for key in 'report', 'report_anomalies_only', 'report_sans_anomalies':
+            report_a, report_b = getattr(a, key), getattr(b, key)
+            assert report_a.time_intervals == report_b.time_intervals and \
+                report_a.histogram == report_b.histogram, message
+            for moment in 'avg', 'm2', 'max', 'min', 'num':
+                assert np.allclose(getattr(report_a.statistics, moment),
+                                   getattr(report_b.statistics, moment),
+                                   equal_nan=True), message
+    channel = 'H1:GECO-SYNTHETIC_TIMING'
+    frames = []
+    for start in range(0, 256, 64):
+        timeseries = None
+        if start != 128:
+            timeseries = SyntheticFrameReader.frame_data(start, 8).view(
+                Timeseries)
+            timeseries.time_intervals = ti([start, start + 64])
+            timeseries.bitrate = 8
+        frames.append(ReportSet.__from_timeseries__(
+            'BenchmarkReport', channel, timeseries, ti([start, start + 64]),
+            8))
+    expected = frames[0] + frames[1] + frames[2] + frames[3]
+    assert expected.missing_times == ti([128, 192]) and \
+        expected.report_anomalies_only.time_intervals == ti(), \
+        'ReportSet union failing'
+    assert_report_sets_match(ReportSet.union_all(frames), expected,
+                             'ReportSet union of many instances failing')
+    try:
+        expected + frames[0]
+        raise AssertionError('Should not be able to union ReportSets with '
+                             'overlapping time intervals')
+    except ValueError:
+        pass
+    for processes in 1, 2:
+        pipeline = ReportSetPipeline(
+            BenchmarkReport, channel, bitrate=8, processes=processes,
+            chunk_size=1, reader=SyntheticFrameReader(8),
+            locator=SyntheticFrameLocator(missing=[128]))
+        assert_report_sets_match(pipeline.run(ti([0, 256])), expected,
+                                 'ReportSet pipeline failing')
+
+    print('Testing checkpointed ReportSet pipelines.')
+    try:
+        ReportSet('BenchmarkReport', 8, time_intervals=ti([0, 64]),
+                  intended_times=ti([64, 128]))
+        raise AssertionError('Should not be able to cover times that are '
+                             'not intended')
+    except ValueError:
+        pass
+    class InterruptedReader(SyntheticFrameReader):
+        'Fails on reading its second frame file, like a killed job.'
+        def read_channel(self, channel_name, path, out=None):
+            if self.paths_read:
+                raise RuntimeError('interrupted')
+            return SyntheticFrameReader.read_channel(self, channel_name, path,
+                                                     out)
+    checkpoint_dir = tempfile.mkdtemp()
+    try:
+        checkpoint = os.path.join(checkpoint_dir, 'checkpoint.hdf5')
+        # a temporary file left behind by a job killed while saving
+        open(checkpoint + '.tmp', 'w').close()
+        readers = [InterruptedReader(8), SyntheticFrameReader(8)]
+        for reader in readers:
+            pipeline = ReportSetPipeline(
+                BenchmarkReport, channel, bitrate=8, processes=1,
+                chunk_size=1, reader=reader,
+                locator=SyntheticFrameLocator(missing=[128]))
+            try:
+                finished = pipeline.run_checkpointed(ti([0, 256]), checkpoint,
+                                                     checkpoint_every=64)
+            except RuntimeError:
+                partial = ReportSet.load_hdf5(checkpoint)
+                assert partial.time_intervals == ti([0, 64]) and \
+                    partial.remaining_times() == ti([64, 256]) and \
+                    not partial.is_finished(), 'Checkpointing failing'
+        assert [Frame.AbstFrameLocator.__parse_frame_file_name__(path)[2]
+                for path in readers[1].paths_read] == [64, 192], \
+            'Resuming from a checkpoint reprocesses finished frames'
+        assert finished.is_finished() and \
+            finished.intended_times == ti([0, 256]), \
+            'Resuming from a checkpoint failing'
+        assert_report_sets_match(finished, expected,
+                                 'Resuming from a checkpoint failing')
+        assert_report_sets_match(ReportSet.load_hdf5(checkpoint), expected,
+                                 'Final checkpoint failing')
+        # older files have no intended_times, which default to the times
+        # covered
+        with h5py.File(checkpoint, 'r+') as h5file:
+            del h5file['intended_times']
+        partial = ReportSet.load_hdf5(checkpoint)
+        assert partial.intended_times == partial.time_intervals and \
+            partial.is_finished(), \
+            'Loading files without intended_times failing'
+    finally:
+        shutil.rmtree(checkpoint_dir)
+
     print('Testing HDF5 file saving capabilities.')
     ex = {
         'name': 'stefan',
@@ -77,6 +479,127 @@ def run_unit_tests():
         'geco_statistics_test_hdf5_dict_example.hdf5')
     os.remove('geco_statistics_test_hdf5_dict_example.hdf5')
     np.testing.assert_equal(loaded, ex)
+    for instance in binned, sketch:
+        instance.save_hdf5('geco_statistics_test_hdf5_dict_example.hdf5',
+                           compression='gzip', shuffle=True, fletcher32=True,
+                           chunks=(2, 4))
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            loaded = instance.load_hdf5(
+                'geco_statistics_test_hdf5_dict_example.hdf5', lazy=True)
+        os.remove('geco_statistics_test_hdf5_dict_example.hdf5')
+        assert loaded == instance, 'Round trip through compressed HDF5 failing'
+        assert len(caught) == 1, 'No warning about reading compressed data'
+    AbstReport.__save_dict_to_hdf5__(
+        {'nested': {'histogram': binned.to_dict()}},
+        'geco_statistics_test_hdf5_dict_example.hdf5')
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        loaded = Histogram.load_hdf5(
+            'geco_statistics_test_hdf5_dict_example.hdf5',
+            path='nested/histogram', lazy=True)
+    assert not caught, 'Warning about reading uncompressed data'
+    assert loaded == binned and not loaded.hist.flags.writeable, \
+        'Lazy loading of a nested path from HDF5 failing'
+    assert loaded.accumulate(series) == binned.clone().accumulate(series), \
+        'Modifying lazily loaded data failing'
+    os.remove('geco_statistics_test_hdf5_dict_example.hdf5')
+    for saved, other in (full, full), (ti([0,1]), ti([2,3])):
+        saved.save_hdf5('geco_statistics_test_hdf5_dict_example.hdf5',
+                        compression='lzf')
+        saved.update_hdf5('geco_statistics_test_hdf5_dict_example.hdf5',
+                          other)
+        assert saved.load_hdf5('geco_statistics_test_hdf5_dict_example.hdf5'
+                               ) == saved + other, 'Updating HDF5 file failing'
+        os.remove('geco_statistics_test_hdf5_dict_example.hdf5')
+    # a dataset left behind by an interrupted widening must not get in the way
+    binned.save_hdf5('geco_statistics_test_hdf5_dict_example.hdf5')
+    with h5py.File('geco_statistics_test_hdf5_dict_example.hdf5',
+                   'r+') as h5file:
+        h5file['hist.widened'] = np.zeros(3)
+    wide = binned.clone()
+    wide.__reserve__(2**16)
+    binned.update_hdf5('geco_statistics_test_hdf5_dict_example.hdf5', wide)
+    assert Histogram.load_hdf5('geco_statistics_test_hdf5_dict_example.hdf5'
+                               ) == binned + wide, \
+        'Widening counts in an HDF5 file failing'
+    os.remove('geco_statistics_test_hdf5_dict_example.hdf5')
+    interrupted = ti([2, 3])
+    def interrupt(group):
+        group['data_ns'][...] = 0
+        raise KeyboardInterrupt
+    interrupted.__update_hdf5_group__ = interrupt
+    ti([0, 1]).save_hdf5('geco_statistics_test_hdf5_dict_example.hdf5')
+    try:
+        ti().update_hdf5('geco_statistics_test_hdf5_dict_example.hdf5',
+                         interrupted)
+    except KeyboardInterrupt:
+        pass
+    for attempt in (
+            lambda f: ti.load_hdf5(f),
+            lambda f: ti.load_hdf5(f, lazy=True),
+            lambda f: ti().update_hdf5(f, ti([4, 5]))):
+        try:
+            attempt('geco_statistics_test_hdf5_dict_example.hdf5')
+            raise AssertionError('Should not be able to read a partly '
+                                 'updated HDF5 file')
+        except ValueError:
+            pass
+    os.remove('geco_statistics_test_hdf5_dict_example.hdf5')
+    halves = []
+    for start, end in (1, 8), (8, 16):
+        half = values[start:end].view(Timeseries)
+        half.time_intervals = ti([start, end])
+        half.bitrate = 8
+        halves.append(ReportSet.__from_timeseries__(
+            'BenchmarkReport', 'H1:GECO-TEST', half, half.time_intervals, 8))
+    halves[0].save_hdf5('geco_statistics_test_hdf5_dict_example.hdf5',
+                        compression='lzf')
+    halves[0].update_hdf5('geco_statistics_test_hdf5_dict_example.hdf5',
+                          halves[1])
+    try:
+        halves[0].update_hdf5('geco_statistics_test_hdf5_dict_example.hdf5',
+                              halves[1])
+        raise AssertionError('Should not be able to update an HDF5 file '
+                             'with overlapping time intervals')
+    except ValueError:
+        pass
+    assert ReportSet.load_hdf5('geco_statistics_test_hdf5_dict_example.hdf5'
+                               ) == halves[0] + halves[1], \
+        'Updating ReportSet HDF5 file failing'
+    os.remove('geco_statistics_test_hdf5_dict_example.hdf5')
+    # empty datasets, like missing_times here, have no storage to map
+    halves[0].save_hdf5('geco_statistics_test_hdf5_dict_example.hdf5')
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        loaded = ReportSet.load_hdf5(
+            'geco_statistics_test_hdf5_dict_example.hdf5', lazy=True)
+    assert not caught, 'Warning about reading an uncompressed ReportSet'
+    assert loaded == halves[0], 'Lazy loading of a ReportSet failing'
+    os.remove('geco_statistics_test_hdf5_dict_example.hdf5')
+    ti().save_hdf5('geco_statistics_test_hdf5_dict_example.hdf5',
+                   compression='gzip', chunks=(4,))
+    assert ti.load_hdf5('geco_statistics_test_hdf5_dict_example.hdf5'
+                        ) == ti(), 'Saving empty arrays with chunks failing'
+    ti().update_hdf5('geco_statistics_test_hdf5_dict_example.hdf5',
+                     ti([0, 1]))
+    assert ti.load_hdf5('geco_statistics_test_hdf5_dict_example.hdf5'
+                        ) == ti([0, 1]), 'Updating empty arrays failing'
+    os.remove('geco_statistics_test_hdf5_dict_example.hdf5')
+
+    print('Testing flat buffer serialization.')
+    for instance in binned, sketch, multi, full:
+        loaded = instance.from_buffer(bytes(instance.to_buffer()))
+        assert loaded == instance, 'Round trip through buffer failing'
+    instance.save_buffer('geco_statistics_test_buffer_example.bin')
+    loaded = instance.load_buffer('geco_statistics_test_buffer_example.bin')
+    assert loaded == instance, 'Round trip through buffer file failing'
+    del loaded
+    os.remove('geco_statistics_test_buffer_example.bin')
+    loaded = binned.from_buffer(binned.to_buffer())
+    assert not loaded.hist.flags.writeable, 'Buffer is being copied'
+    assert loaded.accumulate(series) == binned.clone().accumulate(series), \
+        'Modifying data loaded from a buffer failing'
 
     # TODO: Add in tests for creating time intervals from strings
     # TODO: Add in HDF5 save/load tests for all classes
@@ -0,0 +1,479 @@
+# -*- coding: utf-8 -*-
+
+"""
+Timing benchmarks for the performance-sensitive parts of geco_stat. Run them
+all with ``geco_stat.run_benchmarks()`` (or ``make benchmark``).
+"""
+
+import io
+import os
+import pickle
+import shutil
+import tempfile
+import timeit
+import h5py             # >=2.5.0
+import numpy as np      # >=1.10.4
+from geco_stat._constants import __default_bitrate__
+from geco_stat.Abstract import Factory
+from geco_stat.Frame import frameCPP
+from geco_stat.Frame import AbstFrameReader
+from geco_stat.Frame import AbstFrameLocator
+from geco_stat.Frame import FrameCppReader
+from geco_stat.Frame import FrameCppDumpReader
+from geco_stat.Time import TimeIntervalSet
+from geco_stat.Timeseries import Timeseries
+from geco_stat.Data import Histogram
+from geco_stat.Data import MultiResolutionHistogram
+from geco_stat.Data import Statistics
+from geco_stat.Report import AbstReport
+from geco_stat.ReportSet import ReportSet
+
+
+def best_time(func, repeat=3):
+    """
+    Call ``func`` with no arguments ``repeat`` times and return the shortest
+    wall time in seconds.
+    """
+    times = []
+    for i in range(repeat):
+        start = timeit.default_timer()
+        func()
+        times.append(timeit.default_timer() - start)
+    return min(times)
+
+
+def report(name, seconds, baseline=None):
+    """Print a single benchmark result, with speedup relative to baseline."""
+    line = '    %-48s %10.4f s' % (name, seconds)
+    if baseline is not None:
+        line += '  (%.1fx)' % (baseline / seconds)
+    print(line)
+
+
+def synthetic_channel(num_sec=64, bitrate=__default_bitrate__, seed=0):
+    """Return a (num_sec, bitrate) array of fake timing offsets."""
+    rng = np.random.RandomState(seed)
+    return rng.normal(0, 50, (num_sec, bitrate))
+
+
+def write_synthetic_frame_file(path, channel_name, data, gps_start=0,
+                               bitrate=__default_bitrate__):
+    """
+    Write ``data`` to a single-frame GWF file as an FrProcData channel. Needs
+    the frameCPP python bindings.
+    """
+    flat = np.require(data.reshape(-1), dtype=np.float64, requirements=['C'])
+    duration = float(len(flat)) / bitrate
+    frame = frameCPP.FrameH()
+    frame.SetName('geco_stat')
+    frame.SetRun(-1)
+    frame.SetGTime(frameCPP.GPSTime(int(gps_start), 0))
+    frame.SetDt(duration)
+    dims = frameCPP.Dimension(len(flat), 1. / bitrate, 's', 0)
+    vect = frameCPP.FrVect(channel_name, frameCPP.FrVect.FR_VECT_8R, 1, dims,
+                           '')
+    vect.GetDataArray()[:] = flat
+    proc = frameCPP.FrProcData(channel_name, '',
+                               frameCPP.FrProcData.TIME_SERIES,
+                               frameCPP.FrProcData.UNKNOWN_SUB_TYPE,
+                               0., duration, 0., 0., 0., 0.)
+    proc.AppendData(vect)
+    frame.AppendFrProcData(proc)
+    stream = frameCPP.OFrameFStream(path)
+    stream.WriteFrame(frame, 0, 0)
+
+
+def synthetic_dump_channel_output(data):
+    """
+    Format ``data`` the way ``framecpp_dump_channel`` prints a channel: six
+    lines of header followed by the comma-separated samples.
+    """
+    header = b''.join([b'header line\n'] * 6)
+    return header + b'Data: ' + b', '.join(
+        [('%.17g' % x).encode() for x in data.reshape(-1)]) + b'\n'
+
+
+class SyntheticFrameReader(AbstFrameReader):
+    """
+    A frame reader that reads nothing: each frame file holds the
+    synthetic_channel data seeded with the GPS start time in its name. The
+    paths read are recorded in ``paths_read``, when used in this process.
+    """
+
+    name = 'synthetic'
+
+    def __init__(self, bitrate=__default_bitrate__):
+        self.bitrate    = bitrate
+        self.paths_read = []
+
+    @staticmethod
+    def is_available():
+        return True
+
+    @staticmethod
+    def frame_data(start, bitrate=__default_bitrate__):
+        'Return the data of the frame file starting at GPS time start.'
+        return synthetic_channel(AbstFrameLocator.frame_length, bitrate,
+                                 seed=int(start))
+
+    def read_channel(self, channel_name, path, out=None):
+        self.paths_read.append(path)
+        start = AbstFrameLocator.__parse_frame_file_name__(path)[2]
+        return self.__fill__(
+            out, [self.frame_data(start, self.bitrate).reshape(-1)])
+
+
+class SyntheticFrameLocator(AbstFrameLocator):
+    """
+    A frame locator that finds a made-up frame file for every frame, except
+    for those starting at the GPS times in ``missing``, to be read with a
+    SyntheticFrameReader.
+    """
+
+    def __init__(self, missing=(), frame_type=None):
+        super(SyntheticFrameLocator, self).__init__(frame_type=frame_type)
+        self.missing = set([int(start) for start in missing])
+
+    def __find_frame_files__(self, observatory, frame_type, start, end):
+        return dict([
+            (s, '%s-%s-%d-%d.gwf' % (observatory, frame_type, s,
+                                     self.frame_length))
+            for s in range(int(start), int(end), self.frame_length)
+            if s not in self.missing])
+
+
+def bench_frame_readers(bitrate=__default_bitrate__):
+    """
+    Compare the binary frameCPP reader with the framecpp_dump_channel text
+    reader. If the frameCPP bindings are installed, both readers are timed
+    end to end on a synthetic frame file. Otherwise, only the decoding step
+    of each reader is timed, on the same synthetic channel data.
+    """
+    print('Frame readers, one 64s frame at %d Hz:' % bitrate)
+    channel_name = 'H1:GECO-SYNTHETIC_TIMING'
+    data = synthetic_channel(64, bitrate)
+    out = np.empty((64, bitrate))
+    if frameCPP is not None:
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, 'H-H1_R-0-64.gwf')
+            write_synthetic_frame_file(path, channel_name, data,
+                                       bitrate=bitrate)
+            readers = [('framecpp', FrameCppReader())]
+            if FrameCppDumpReader.is_available():
+                readers.insert(0, ('framecpp_dump_channel, streaming',
+                                   FrameCppDumpReader()))
+                readers.insert(0, ('framecpp_dump_channel',
+                                   FrameCppDumpReader(streaming=False)))
+            baseline = None
+            for name, reader in readers:
+                t = best_time(
+                    lambda: reader.read_channel(channel_name, path, out))
+                report(name, t, baseline)
+                baseline = baseline or t
+        finally:
+            shutil.rmtree(tmpdir)
+    else:
+        print('    (frameCPP unavailable; timing decoding step only)')
+        text = synthetic_dump_channel_output(data)
+        raw = data.astype(np.float64).tobytes()
+        t_text = best_time(lambda: FrameCppDumpReader.__fill__(
+            out, [np.fromstring(
+                FrameCppDumpReader.__remove_header_and_text__(text),
+                sep=',')]))
+        report('text parsing (framecpp_dump_channel)', t_text)
+        t_stream = best_time(lambda: FrameCppDumpReader.__parse_stream__(
+            io.BytesIO(text), out))
+        report('streaming text parsing (framecpp_dump_channel)', t_stream,
+               t_text)
+        t_bin = best_time(lambda: FrameCppReader.__fill__(
+            out, [np.frombuffer(raw, dtype=np.float64)]))
+        report('binary vector copy (framecpp)', t_bin, t_text)
+
+
+def synthetic_timeseries(num_sec=64, bitrate=__default_bitrate__, seed=0):
+    """
+    Return a Timeseries of synthetic_channel data starting at GPS time 0.
+    """
+    ans = synthetic_channel(num_sec, bitrate, seed).view(Timeseries)
+    ans.time_intervals = TimeIntervalSet([0, num_sec])
+    ans.bitrate = bitrate
+    return ans
+
+
+def synthetic_time_intervals(num_intervals, seed=0):
+    """
+    Return a TimeIntervalSet of ``num_intervals`` disjoint intervals with
+    random integer GPS start times and lengths.
+    """
+    rng = np.random.RandomState(seed)
+    steps = rng.randint(1, 64, 2 * num_intervals)
+    return TimeIntervalSet(1e9 + np.cumsum(steps))
+
+
+def legacy_loop_union(a, b):
+    """
+    Union two arrays of interval endpoints the way TimeIntervalSet used to:
+    one interval of b at a time, splicing it into a copy of a. Kept here only
+    as a baseline for bench_time_interval_sets.
+    """
+    result = np.array(a, dtype=np.float64)
+    for i in range(0, len(b) // 2):
+        start, end = b[2*i], b[2*i + 1]
+        left = np.searchsorted(result, start, side='left')
+        right = np.searchsorted(result, end, side='right') - 1
+        middle = []
+        if left % 2 == 0:
+            middle.append(start)
+        if right % 2 == 1:
+            middle.append(end)
+        result = np.concatenate((result[:left], middle, result[right+1:]))
+    return result
+
+
+def bench_time_interval_sets(sizes=(10**2, 10**3, 10**4, 10**5),
+                             max_repeated_legacy_size=10**4):
+    """
+    Time union, intersection and complement of two TimeIntervalSets with the
+    given numbers of intervals each. The old interval-by-interval union is
+    timed as a baseline for every size; above ``max_repeated_legacy_size``
+    it is so slow (about 16 s for 10**5 intervals) that it is only run once.
+    """
+    print('TimeIntervalSet algebra:')
+    for size in sizes:
+        a = synthetic_time_intervals(size, seed=1)
+        b = synthetic_time_intervals(size, seed=2)
+        union = a + b
+        repeat = 3 if size <= max_repeated_legacy_size else 1
+        baseline = best_time(lambda: legacy_loop_union(a.to_ndarray(),
+                                                       b.to_ndarray()),
+                             repeat)
+        report('%d intervals, union (legacy loop)' % size, baseline)
+        report('%d intervals, union' % size, best_time(lambda: a + b),
+               baseline)
+        report('%d intervals, intersection' % size,
+               best_time(lambda: a * b))
+        report('%d intervals, complement' % size,
+               best_time(lambda: a.complement_with_respect_to(union)))
+
+
+def bench_time_interval_set_construction(sizes=(10**2, 10**4, 10**6)):
+    """
+    Compare cloning and unioning TimeIntervalSets through the trusted
+    internal constructor with doing so through the validating one, which is
+    what the results of clones and set algebra used to be built with.
+    """
+    print('TimeIntervalSet construction:')
+    cls = TimeIntervalSet
+    for size in sizes:
+        a = synthetic_time_intervals(size, seed=1)
+        b = synthetic_time_intervals(size, seed=2)
+        ns_a, ns_b = a.to_nanoseconds(), b.to_nanoseconds()
+        baseline = best_time(lambda: cls.from_nanoseconds(ns_a.copy()))
+        report('%d intervals, clone (validated)' % size, baseline)
+        report('%d intervals, clone' % size, best_time(a.clone), baseline)
+        baseline = best_time(lambda: cls.from_nanoseconds(
+            cls.__sweep__(ns_a, ns_b, np.logical_or)))
+        report('%d intervals, union (validated)' % size, baseline)
+        report('%d intervals, union' % size, best_time(lambda: a + b),
+               baseline)
+
+
+def legacy_histogram2d(histogram, timeseries):
+    """
+    Bin a timeseries the way Histogram.from_timeseries used to, with
+    np.histogram2d over the samples and a tiled array of their offsets within
+    each second. Kept here only as a baseline for bench_histogram.
+    """
+    hist = np.histogram2d(
+        np.asarray(timeseries).flatten(),
+        np.tile(histogram.t_ticks[:-1], timeseries.shape[0]),
+        bins = [histogram.hist_bins, histogram.t_ticks])[0]
+    return hist.astype(np.int64)
+
+
+def bench_histogram(num_sec=64, bitrate=__default_bitrate__):
+    """
+    Time Histogram.from_timeseries on a frame file's worth of data against
+    the old np.histogram2d implementation, checking that both give the same
+    counts, and time the union of two such histograms with and without
+    narrow count types. Without them, the counts are int64, as they would be
+    for a histogram whose max_count is over 2**32.
+    """
+    print('Histogram.from_timeseries, %ds at %d Hz:' % (num_sec, bitrate))
+    timeseries = synthetic_timeseries(num_sec, bitrate)
+    histogram = Histogram(bitrate=bitrate)
+    assert np.array_equal(histogram.from_timeseries(timeseries).hist,
+                          legacy_histogram2d(histogram, timeseries))
+    baseline = best_time(lambda: legacy_histogram2d(histogram, timeseries))
+    report('np.histogram2d', baseline)
+    report('bin index accumulator',
+           best_time(lambda: histogram.from_timeseries(timeseries)), baseline)
+    frame = histogram.from_timeseries(timeseries)
+    wide = Histogram(hist=frame.hist, hist_range=frame.hist_range,
+                     hist_num_bins=frame.hist_num_bins, bitrate=bitrate,
+                     max_count=2**32, underflow=frame.underflow,
+                     overflow=frame.overflow, nans=frame.nans)
+    assert wide.hist.dtype == np.int64
+    baseline = best_time(lambda: wide + wide)
+    report('union, int64 counts', baseline)
+    report('union, %s counts' % frame.hist.dtype.name,
+           best_time(lambda: frame + frame), baseline)
+
+
+def bench_multi_resolution_histogram(num_sec=64, bitrate=__default_bitrate__,
+                                     num_levels=4, zoom=4):
+    """
+    Time filling a MultiResolutionHistogram against filling one Histogram per
+    zoom level separately.
+    """
+    print('MultiResolutionHistogram.from_timeseries, %d levels, %ds at %d Hz:'
+          % (num_levels, num_sec, bitrate))
+    timeseries = synthetic_timeseries(num_sec, bitrate)
+    multi = MultiResolutionHistogram(num_levels=num_levels, zoom=zoom,
+                                     bitrate=bitrate)
+    singles = [Histogram(hist_range=multi.level_range(level),
+                         hist_num_bins=multi.hist_num_bins, bitrate=bitrate)
+               for level in range(num_levels)]
+    baseline = best_time(
+        lambda: [single.from_timeseries(timeseries) for single in singles])
+    report('one Histogram per level', baseline)
+    report('multi-resolution', best_time(
+        lambda: multi.from_timeseries(timeseries)), baseline)
+
+
+class BenchmarkReport(AbstReport):
+    """A report with a Histogram and Statistics, used by the benchmarks."""
+
+    @classmethod
+    def __report_data_prototype__(cls, bitrate=__default_bitrate__):
+        return {
+            'histogram': Histogram(bitrate=bitrate),
+            'statistics': Statistics(bitrate=bitrate)
+        }
+
+    @staticmethod
+    def is_anomalous(timeseries):
+        return False
+
+Factory.add_class(BenchmarkReport)
+
+
+def synthetic_report_set(num_sec=64, bitrate=__default_bitrate__):
+    """
+    Return a BenchmarkReport ReportSet made from a synthetic_timeseries.
+    """
+    return ReportSet.__from_timeseries__(
+        'BenchmarkReport', 'H1:GECO-SYNTHETIC_TIMING',
+        synthetic_timeseries(num_sec, bitrate), TimeIntervalSet([0, num_sec]),
+        bitrate)
+
+
+def bench_clone(bitrate=__default_bitrate__):
+    """
+    Time cloning a full ReportSet through to_dict and from_dict, the way
+    clone used to work, against the structural clone and the copy-on-write
+    share.
+    """
+    print('ReportSet.clone, one 64s frame at %d Hz:' % bitrate)
+    report_set = synthetic_report_set(64, bitrate)
+    baseline = best_time(
+        lambda: report_set.from_dict(report_set.to_dict()))
+    report('to_dict and from_dict', baseline)
+    report('clone', best_time(report_set.clone), baseline)
+    report('share (copy-on-write)', best_time(report_set.share), baseline)
+
+
+def legacy_save_hdf5(dic, filename, path='/', h5file=None):
+    """
+    Save a to_dict dictionary to an HDF5 file the way HDF5_IO used to: each
+    item is written contiguously and uncompressed and then read straight back
+    and compared with the original. Kept here only as a baseline for
+    bench_hdf5.
+    """
+    if h5file is None:
+        with h5py.File(filename, 'w') as h5file:
+            return legacy_save_hdf5(dic, filename, path, h5file)
+    for key, item in dic.items():
+        if isinstance(item, dict):
+            legacy_save_hdf5(item, filename, path + key + '/', h5file)
+            continue
+        h5file[path + key] = item
+        stored = h5file[path + key][()]
+        if isinstance(stored, bytes):
+            stored = stored.decode()
+        # unlike np.array_equal, this treats NaNs as equal
+        np.testing.assert_array_equal(stored, item)
+
+
+def bench_hdf5(bitrate=__default_bitrate__):
+    """
+    Time saving a full ReportSet to HDF5 and compare the sizes of the files,
+    with the old write-and-read-back path and with the new one using a few
+    different storage options.
+    """
+    print('ReportSet.save_hdf5, one 64s frame at %d Hz:' % bitrate)
+    report_set = synthetic_report_set(64, bitrate)
+    tmpdir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmpdir, 'report_set.hdf5')
+
+        def save(func):
+            if os.path.exists(path):
+                os.remove(path)
+            func()
+
+        baseline = best_time(lambda: save(
+            lambda: legacy_save_hdf5(report_set.to_dict(), path)))
+        report('write and read back, %.1f MB' % (os.path.getsize(path) / 1e6),
+               baseline)
+        for name, options in [
+                ('contiguous', dict()),
+                ('fletcher32', dict(fletcher32=True)),
+                ('lzf + shuffle', dict(compression='lzf', shuffle=True)),
+                ('gzip + shuffle', dict(compression='gzip', shuffle=True))]:
+            t = best_time(lambda: save(
+                lambda: report_set.save_hdf5(path, **options)))
+            report('%s, %.1f MB' % (name, os.path.getsize(path) / 1e6), t,
+                   baseline)
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+def bench_buffer(bitrate=__default_bitrate__):
+    """
+    Time sending a full ReportSet to another process (a pickle round trip)
+    and loading it from a file, through a flat buffer made by to_buffer
+    against the usual routes, pickle and HDF5.
+    """
+    print('ReportSet.to_buffer, one 64s frame at %d Hz:' % bitrate)
+    report_set = synthetic_report_set(64, bitrate)
+    baseline = best_time(lambda: pickle.loads(pickle.dumps(report_set, -1)))
+    report('pickle', baseline)
+    report('to_buffer, pickle and from_buffer', best_time(
+        lambda: report_set.from_buffer(pickle.loads(pickle.dumps(
+            report_set.to_buffer(), -1)))), baseline)
+    tmpdir = tempfile.mkdtemp()
+    try:
+        hdf5_path = os.path.join(tmpdir, 'report_set.hdf5')
+        buffer_path = os.path.join(tmpdir, 'report_set.bin')
+        report_set.save_hdf5(hdf5_path)
+        report_set.save_buffer(buffer_path)
+        baseline = best_time(lambda: report_set.load_hdf5(hdf5_path))
+        report('load_hdf5', baseline)
+        report('load_buffer (memory-mapped)', best_time(
+            lambda: report_set.load_buffer(buffer_path)), baseline)
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+def run_benchmarks():
+    """Run every benchmark and print the results."""
+    bench_frame_readers()
+    bench_time_interval_sets()
+    bench_time_interval_set_construction()
+    bench_histogram()
+    bench_multi_resolution_histogram()
+    bench_clone()
+    bench_hdf5()
+    bench_buffer()